@@ -2,6 +2,7 @@
 
 from typing import Annotated
 from fastapi import Depends
+from sqlalchemy import inspect, text
 from sqlmodel import SQLModel, create_engine, Session
 
 sqlite_file_name = "database.db"
@@ -15,6 +16,25 @@ def create_db_and_tables():
     Creates the database and all tables based on SQLModel metadata.
     """
     SQLModel.metadata.create_all(engine)
+    add_missing_columns()
+
+def add_missing_columns():
+    """
+    Adds nullable columns that were added to a model after its table was created.
+    create_all() only creates missing tables, so an existing database.db would otherwise
+    fail on queries that select the new columns.
+    """
+    inspector = inspect(engine)
+    with engine.begin() as connection:
+        for table in SQLModel.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing or not column.nullable:
+                    continue
+                column_type = column.type.compile(dialect=engine.dialect)
+                connection.execute(text(f'ALTER TABLE "{table.name}" ADD COLUMN "{column.name}" {column_type}'))
 
 def get_session():
     """
@@ -0,0 +1,104 @@
+# /configs/executor.py
+import asyncio
+import functools
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from dotenv import load_dotenv
+from fastapi import HTTPException, status
+from loguru import logger
+
+load_dotenv()
+
+# ระยะห่างของการตรวจว่าคิวว่างแล้วหรือยัง (run_when_available)
+_WAIT_POLL_SECONDS = 0.1
+
+
+class InferenceExecutor:
+    """
+    Thread pool สำหรับงาน ML ที่ block (YOLO, EasyOCR, pyzbar) ไม่ให้รันบน event loop
+    - max_workers: จำนวนงานที่รันพร้อมกัน
+    - max_queue_size: จำนวนงานที่รอคิวได้ เมื่อเต็มจะตอบ 503 พร้อม Retry-After
+    - max_wait: เวลาที่ run_when_available รอคิวได้นานที่สุด (วินาที) ก่อนตอบ 503
+    """
+
+    def __init__(self, max_workers: int, max_queue_size: int, retry_after: int, max_wait: float = 120.0):
+        self.max_workers = max_workers
+        self.max_queue_size = max_queue_size
+        self.retry_after = retry_after
+        self.max_wait = max_wait
+
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="inference"
+        )
+        self._slots = threading.BoundedSemaphore(max_workers + max_queue_size)
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.rejected = 0
+
+    def _reject(self) -> HTTPException:
+        self.rejected += 1
+        logger.warning("Inference queue is full, rejecting request.")
+        return HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="The inference queue is full. Please retry later.",
+            headers={"Retry-After": str(self.retry_after)},
+        )
+
+    async def run(self, func, *args, **kwargs):
+        """รัน func ใน thread pool แล้วรอผลแบบ async (ไม่ block request อื่น)"""
+        if not self._slots.acquire(blocking=False):
+            raise self._reject()
+        return await self._submit(func, *args, **kwargs)
+
+    async def run_when_available(self, func, *args, **kwargs):
+        """
+        เหมือน run แต่เมื่อคิวเต็มจะรอจนมีที่ว่าง (ไม่เกิน max_wait วินาที) แทนการตอบ 503 ทันที
+        ใช้กับชุดถัดๆ ไปของ request ที่เริ่มประมวลผลไปแล้ว เพื่อไม่ให้งานที่ทำไปครึ่งทางล้มเหลว
+        """
+        deadline = time.monotonic() + self.max_wait
+        while not self._slots.acquire(blocking=False):
+            if time.monotonic() >= deadline:
+                raise self._reject()
+            await asyncio.sleep(_WAIT_POLL_SECONDS)
+        return await self._submit(func, *args, **kwargs)
+
+    async def _submit(self, func, *args, **kwargs):
+        # ต้องได้ slot มาแล้วก่อนเรียก
+        with self._lock:
+            self.in_flight += 1
+        try:
+            future = self._executor.submit(functools.partial(func, *args, **kwargs))
+        except BaseException:
+            self._release()
+            raise
+        # คืน slot เมื่องานใน thread เสร็จจริง แม้ client จะยกเลิก request ไปก่อน
+        future.add_done_callback(lambda _: self._release())
+        return await asyncio.wrap_future(future)
+
+    def _release(self) -> None:
+        with self._lock:
+            self.in_flight -= 1
+        self._slots.release()
+
+    def stats(self) -> dict:
+        return {
+            "in_flight": self.in_flight,
+            "queued": max(0, self.in_flight - self.max_workers),
+            "max_workers": self.max_workers,
+            "max_queue_size": self.max_queue_size,
+            "rejected": self.rejected,
+        }
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+inference_executor = InferenceExecutor(
+    max_workers=int(os.getenv("INFERENCE_POOL_SIZE", str(min(4, os.cpu_count() or 1)))),
+    max_queue_size=int(os.getenv("INFERENCE_QUEUE_SIZE", "32")),
+    retry_after=int(os.getenv("INFERENCE_RETRY_AFTER", "5")),
+    max_wait=float(os.getenv("INFERENCE_MAX_WAIT", "120")),
+)
@@ -1,13 +1,36 @@
 # /configs/firebase.py
 
+import asyncio
+import io
 import os
+import random
+from urllib.parse import quote
+from concurrent.futures import ThreadPoolExecutor
+from typing import BinaryIO
+
 import firebase_admin
+import requests
+from dotenv import load_dotenv
 from firebase_admin import credentials, storage
 from fastapi import HTTPException, status
+from google.api_core import exceptions as api_exceptions
+from google.resumable_media.common import InvalidResponse
 
 # นำ logger เข้ามาใช้งาน
 from loguru import logger
 
+load_dotenv()
+
+# อัปโหลดใน thread pool แยกจาก inference executor (งาน I/O ไม่ต้องแย่งที่กับงาน ML)
+_io_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv("STORAGE_IO_WORKERS", "4")), thread_name_prefix="storage-io"
+)
+# ขนาด chunk ของ resumable upload (ต้องเป็นผลคูณของ 256 KB) ไฟล์ที่เล็กกว่านี้อัปโหลดในครั้งเดียว
+UPLOAD_CHUNK_SIZE = int(os.getenv("STORAGE_UPLOAD_CHUNK_MB", "8")) * 1024 * 1024
+UPLOAD_RETRIES = int(os.getenv("STORAGE_UPLOAD_RETRIES", "3"))
+UPLOAD_BACKOFF_SECONDS = float(os.getenv("STORAGE_UPLOAD_BACKOFF", "1"))
+_TRANSIENT_STATUS = {408, 429, 500, 502, 503, 504}
+
 def initialize_firebase():
     """
     อ่านค่าจาก Environment และเริ่มต้นการเชื่อมต่อ Firebase
@@ -29,23 +52,77 @@ def initialize_firebase():
     logger.success("Firebase initialized successfully.")
 
 
-async def upload_file_to_storage(file_bytes: bytes, destination_path: str, content_type: str) -> str:
+def content_disposition(filename: str) -> str:
+    """Content-Disposition ให้ browser บันทึกไฟล์เป็น filename (รองรับชื่อภาษาไทยผ่าน filename*)"""
+    fallback = filename.encode("ascii", "replace").decode("ascii").replace("?", "_").replace('"', "_")
+    return f"attachment; filename=\"{fallback}\"; filename*=UTF-8''{quote(filename)}"
+
+
+def _upload_blocking(
+    file_obj: BinaryIO, start: int, destination_path: str, content_type: str, filename: str | None = None
+) -> str:
+    """อัปโหลดหนึ่งครั้ง (รันใน storage I/O executor) ไฟล์ที่ใหญ่กว่า chunk_size ใช้ resumable upload ทีละ chunk"""
+    bucket = storage.bucket()
+    blob = bucket.blob(destination_path, chunk_size=UPLOAD_CHUNK_SIZE)
+    if filename:
+        blob.content_disposition = content_disposition(filename)
+    # ส่งขนาดไฟล์ไปด้วย ไฟล์เล็กจะอัปโหลดครั้งเดียว ไฟล์ใหญ่ใช้ resumable upload
+    size = file_obj.seek(0, io.SEEK_END) - start
+    file_obj.seek(start)
+    blob.upload_from_file(file_obj, size=size, content_type=content_type)
+    blob.make_public()
+    return blob.public_url
+
+
+def _is_transient(error: Exception) -> bool:
+    """ข้อผิดพลาดที่ลองใหม่แล้วมีโอกาสสำเร็จ (เครือข่าย / 408 / 429 / 5xx)"""
+    if isinstance(error, (ConnectionError, TimeoutError, requests.exceptions.ConnectionError, requests.exceptions.Timeout)):
+        return True
+    if isinstance(error, InvalidResponse):
+        return error.response.status_code in _TRANSIENT_STATUS
+    return isinstance(error, api_exceptions.GoogleAPICallError) and error.code in _TRANSIENT_STATUS
+
+
+async def upload_file_to_storage(
+    file_bytes: bytes | BinaryIO, destination_path: str, content_type: str, filename: str | None = None
+) -> str:
     """
     ฟังก์ชันสำหรับอัปโหลดไฟล์ขึ้น Firebase Storage
+    - file_bytes: ข้อมูลไฟล์ หรือไฟล์ที่เปิดอยู่ (เช่น SpooledTemporaryFile) ซึ่งจะถูกอ่านทีละ chunk จากตำแหน่งปัจจุบัน
+      โดยไม่ต้องอ่านทั้งไฟล์เข้าหน่วยความจำ
     - destination_path: คือ path เต็มที่ต้องการเก็บใน bucket เช่น 'reports/report-123.xlsx'
+    - filename: ชื่อไฟล์ตอนดาวน์โหลด (Content-Disposition) เมื่อ destination_path ไม่ใช่ชื่อที่อ่านรู้เรื่อง
+    การอัปโหลดรันใน storage I/O executor จึงไม่ block event loop
+    ข้อผิดพลาดชั่วคราวจะลองใหม่สูงสุด UPLOAD_RETRIES ครั้ง โดยรอนานขึ้นแบบ exponential backoff
     """
-    try:
-        bucket = storage.bucket()
-        blob = bucket.blob(destination_path)
-
-        blob.upload_from_string(file_bytes, content_type=content_type)
-        blob.make_public()
-        logger.info(f"File uploaded to '{destination_path}' in Firebase Storage.")
-        return blob.public_url
-
-    except Exception as e:
-        logger.error(f"Error uploading to Firebase: {e}")
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Failed to upload file to Firebase Storage: {e}"
-        )
+    file_obj = io.BytesIO(file_bytes) if isinstance(file_bytes, (bytes, bytearray)) else file_bytes
+    start = file_obj.tell()
+    loop = asyncio.get_running_loop()
+
+    for attempt in range(UPLOAD_RETRIES + 1):
+        try:
+            public_url = await loop.run_in_executor(
+                _io_executor, _upload_blocking, file_obj, start, destination_path, content_type, filename
+            )
+            logger.info(f"File uploaded to '{destination_path}' in Firebase Storage.")
+            return public_url
+
+        except Exception as e:
+            if attempt < UPLOAD_RETRIES and _is_transient(e):
+                delay = UPLOAD_BACKOFF_SECONDS * 2**attempt * random.uniform(0.5, 1.5)
+                logger.warning(
+                    f"Upload of '{destination_path}' failed ({e}), retrying in {delay:.1f}s "
+                    f"({attempt + 1}/{UPLOAD_RETRIES})."
+                )
+                await asyncio.sleep(delay)
+                continue
+            logger.error(f"Error uploading to Firebase: {e}")
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Failed to upload file to Firebase Storage: {e}"
+            )
+
+
+def close_storage_executor() -> None:
+    """ปิด thread ของ storage I/O executor (รออัปโหลดที่ค้างอยู่ให้เสร็จ)"""
+    _io_executor.shutdown(wait=True)
@@ -0,0 +1,274 @@
+# /configs/ocr_jobs.py
+import asyncio
+import json
+import os
+import uuid
+from datetime import datetime, timezone
+from typing import Awaitable, BinaryIO, Callable
+
+from dotenv import load_dotenv
+from fastapi import HTTPException, status
+from loguru import logger
+from sqlmodel import Session, select
+
+from .database import engine
+from ..models import OcrJob, OcrJobResult
+
+load_dotenv()
+
+FINISHED_STATUSES = ("completed", "failed")
+
+
+class OcrJobProgress:
+    """
+    ตัวรายงานความคืบหน้าของงาน OCR หนึ่งงาน เรียกได้จากทุก thread (รวมถึง inference executor)
+    ทุกการเรียกเขียนลง SQLite ทันที แล้วปลุก client ที่กำลัง stream ผลของงานนี้
+    """
+
+    def __init__(self, manager: "OcrJobManager", job_id: str, stored_hashes: set[str]):
+        self.manager = manager
+        self.job_id = job_id
+        # ภาพที่มีผลอยู่แล้ว (งานที่ถูกรันต่อหลัง restart) ไม่ต้องส่งผลซ้ำ
+        self._stored_hashes = stored_hashes
+        # ZIP ที่ดาวน์โหลดแล้ว ใช้ซ้ำเมื่องานถูกลองใหม่หลัง executor เต็ม (ปิดเมื่องานจบ)
+        self.zip_file: BinaryIO | None = None
+
+    def stage(self, stage: str) -> None:
+        self.manager.update(self.job_id, stage=stage)
+
+    def progress(self, total: int | None = None, processed: int | None = None, skipped: int | None = None) -> None:
+        values = {"total": total, "processed": processed, "skipped": skipped}
+        self.manager.update(self.job_id, **{key: value for key, value in values.items() if value is not None})
+
+    def results(self, rows: list[dict]) -> None:
+        new_rows = [row for row in rows if row.get("image_hash") not in self._stored_hashes]
+        if not new_rows:
+            return
+        self._stored_hashes.update(row.get("image_hash") for row in new_rows)
+        with Session(engine) as session:
+            session.add_all(
+                OcrJobResult(
+                    job_id=self.job_id,
+                    image_hash=row.get("image_hash", "-"),
+                    row_json=json.dumps(row, ensure_ascii=False),
+                )
+                for row in new_rows
+            )
+            session.commit()
+        self.manager.notify(self.job_id)
+
+    def close(self) -> None:
+        if self.zip_file is not None:
+            self.zip_file.close()
+            self.zip_file = None
+
+
+class OcrJobManager:
+    """
+    คิวงาน OCR แบบ background
+    - submit() บันทึกงานลง SQLite แล้วคืน job id ทันที งานจริงรันใน worker (asyncio task) ตามลำดับคิว
+    - งานที่ยังไม่เสร็จตอนปิดเซิร์ฟเวอร์ (queued / running) ถูกนำกลับเข้าคิวเมื่อ start() ครั้งถัดไป
+      (สลิปที่ประมวลผลไปแล้วได้ผลจาก ocr_cache จึงไม่ต้อง OCR ซ้ำ)
+    - งานที่ล้มเหลวจน process ตายซ้ำเกิน max_attempts ครั้งจะถูกปิดเป็น failed
+    - inference executor เต็ม (503): รอ retry_after วินาทีในสถานะ waiting แล้วลองใหม่ ไม่เกิน max_busy_retries ครั้ง
+    """
+
+    def __init__(
+        self, num_workers: int = 1, max_attempts: int = 3, retry_after: float = 5.0, max_busy_retries: int = 60
+    ):
+        self.num_workers = max(1, num_workers)
+        self.max_attempts = max(1, max_attempts)
+        self.retry_after = retry_after
+        self.max_busy_retries = max(0, max_busy_retries)
+
+        self._runner: Callable[[OcrJob, OcrJobProgress], Awaitable[tuple[str, str | None]]] | None = None
+        self._queue: asyncio.Queue[str] | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._workers: list[asyncio.Task] = []
+        self._events: dict[str, asyncio.Event] = {}
+
+    async def start(self, runner: Callable[[OcrJob, OcrJobProgress], Awaitable[tuple[str, str | None]]]) -> None:
+        """เริ่ม worker แล้วนำงานที่ค้างอยู่ใน SQLite กลับเข้าคิว (runner คืนค่า (ข้อความสรุป, excel_url))"""
+        self._runner = runner
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue()
+
+        with Session(engine) as session:
+            unfinished = session.exec(
+                select(OcrJob)
+                .where(OcrJob.status.in_(["queued", "running"]))
+                .order_by(OcrJob.created_at)
+            ).all()
+            for job in unfinished:
+                if job.attempts >= self.max_attempts:
+                    job.status = "failed"
+                    job.error = f"Gave up after {job.attempts} attempts."
+                    job.finished_at = datetime.now(timezone.utc)
+                else:
+                    job.status = "queued"
+                    job.stage = "queued"
+                session.add(job)
+            session.commit()
+            resumed = [job.job_id for job in unfinished if job.status == "queued"]
+
+        for job_id in resumed:
+            self._queue.put_nowait(job_id)
+        if resumed:
+            logger.info(f"Resumed {len(resumed)} unfinished OCR jobs.")
+
+        self._workers = [
+            asyncio.create_task(self._worker(), name=f"ocr-job-worker-{i}") for i in range(self.num_workers)
+        ]
+
+    async def stop(self) -> None:
+        """หยุด worker งานที่กำลังรันยังอยู่ในสถานะ running และจะถูกรันใหม่เมื่อ start() ครั้งถัดไป"""
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        self._loop = None
+
+    def submit(self, case_id: str, evidence_id: int, firebase_url: str, export_format: str = "xlsx") -> OcrJob:
+        if self._queue is None:
+            raise RuntimeError("The OCR job manager has not been started.")
+        job = OcrJob(
+            job_id=uuid.uuid4().hex,
+            case_id=case_id,
+            evidence_id=evidence_id,
+            firebase_url=firebase_url,
+            export_format=export_format,
+            created_at=datetime.now(timezone.utc),
+        )
+        with Session(engine) as session:
+            session.add(job)
+            session.commit()
+            session.refresh(job)
+        self._queue.put_nowait(job.job_id)
+        logger.info(f"Queued OCR job {job.job_id} for case {case_id}, evidence {evidence_id}.")
+        return job
+
+    def get(self, job_id: str) -> OcrJob | None:
+        with Session(engine) as session:
+            return session.get(OcrJob, job_id)
+
+    def results_after(self, job_id: str, after_id: int = 0, limit: int = 500) -> list[OcrJobResult]:
+        with Session(engine) as session:
+            return session.exec(
+                select(OcrJobResult)
+                .where(OcrJobResult.job_id == job_id, OcrJobResult.id > after_id)
+                .order_by(OcrJobResult.id)
+                .limit(limit)
+            ).all()
+
+    def update(self, job_id: str, **values) -> None:
+        with Session(engine) as session:
+            job = session.get(OcrJob, job_id)
+            if job is None:
+                return
+            for key, value in values.items():
+                setattr(job, key, value)
+            session.add(job)
+            session.commit()
+        self.notify(job_id)
+
+    def notify(self, job_id: str) -> None:
+        """ปลุก client ที่รอผลของงานนี้ (เรียกได้จากทุก thread)"""
+        loop = self._loop
+        if loop is not None and not loop.is_closed():
+            loop.call_soon_threadsafe(self._set_event, job_id)
+
+    def _set_event(self, job_id: str) -> None:
+        event = self._events.pop(job_id, None)
+        if event is not None:
+            event.set()
+
+    async def wait_for_update(self, job_id: str, timeout: float = 1.0) -> None:
+        """รอจนงานมีความคืบหน้า หรือครบ timeout (กันกรณีงานถูกอัปเดตจาก process อื่น)"""
+        event = self._events.setdefault(job_id, asyncio.Event())
+        try:
+            await asyncio.wait_for(event.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    @staticmethod
+    def eta_seconds(job: OcrJob) -> float | None:
+        """เวลาที่คาดว่าจะเหลือ จากความเร็วเฉลี่ยต่อสลิปตั้งแต่เริ่มงาน"""
+        done = job.processed + job.skipped
+        if job.status != "running" or job.started_at is None or not job.total or not done:
+            return None
+        elapsed = (datetime.now(timezone.utc) - job.started_at).total_seconds()
+        return max(0.0, elapsed / done * (job.total - done))
+
+    async def _worker(self) -> None:
+        while True:
+            job_id = await self._queue.get()
+            try:
+                await self._run(job_id)
+            except Exception as e:
+                logger.error(f"OCR job {job_id} crashed: {e}")
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job_id: str) -> None:
+        job = self.get(job_id)
+        if job is None or job.status in FINISHED_STATUSES:
+            return
+        with Session(engine) as session:
+            stored_hashes = set(
+                session.exec(select(OcrJobResult.image_hash).where(OcrJobResult.job_id == job_id)).all()
+            )
+        self.update(
+            job_id,
+            status="running",
+            stage="downloading",
+            processed=0,
+            skipped=0,
+            error=None,
+            attempts=job.attempts + 1,
+            started_at=datetime.now(timezone.utc),
+        )
+        job = self.get(job_id)
+        progress = OcrJobProgress(self, job_id, stored_hashes)
+
+        busy_retries = 0
+        try:
+            while True:
+                try:
+                    message, excel_url = await self._runner(job, progress)
+                except HTTPException as e:
+                    if e.status_code == status.HTTP_503_SERVICE_UNAVAILABLE and busy_retries < self.max_busy_retries:
+                        # inference executor เต็ม: รอแล้วลองใหม่ (ใช้ ZIP ที่ดาวน์โหลดไว้แล้ว) แทนที่จะให้งานล้มเหลว
+                        busy_retries += 1
+                        self.update(job_id, stage="waiting")
+                        await asyncio.sleep(self.retry_after)
+                        continue
+                    if e.status_code == status.HTTP_503_SERVICE_UNAVAILABLE:
+                        self._finish(job_id, "failed", error=f"{e.detail} (gave up after {busy_retries} retries)")
+                    else:
+                        self._finish(job_id, "failed", error=str(e.detail))
+                except Exception as e:
+                    logger.error(f"OCR job {job_id} failed: {e}")
+                    self._finish(job_id, "failed", error=str(e))
+                else:
+                    self._finish(job_id, "completed", message=message, excel_url=excel_url)
+                return
+        finally:
+            progress.close()
+
+    def _finish(self, job_id: str, job_status: str, **values) -> None:
+        self.update(job_id, status=job_status, stage="done", finished_at=datetime.now(timezone.utc), **values)
+        logger.info(f"OCR job {job_id} {job_status}.")
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.num_workers,
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+        }
+
+
+ocr_jobs = OcrJobManager(
+    num_workers=int(os.getenv("OCR_JOB_WORKERS", "1")),
+    max_attempts=int(os.getenv("OCR_JOB_MAX_ATTEMPTS", "3")),
+    retry_after=float(os.getenv("INFERENCE_RETRY_AFTER", "5")),
+    max_busy_retries=int(os.getenv("OCR_JOB_BUSY_RETRIES", "60")),
+)
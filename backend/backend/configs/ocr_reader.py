@@ -0,0 +1,160 @@
+# /configs/ocr_reader.py
+import os
+import threading
+import time
+
+from dotenv import load_dotenv
+from loguru import logger
+
+from ..ml.batch_ocr import readtext_batched
+from ..ml.ocr_pool import OcrProcessPool
+from ..ml.roi_ocr import load_templates, read_slip_with_template
+
+load_dotenv()
+
+OCR_LANGUAGES = ["th", "en"]
+
+_reader = None
+_reader_device = None
+_reader_load_seconds = None
+_lock = threading.Lock()
+_warm_up_thread: threading.Thread | None = None
+_pool: OcrProcessPool | None = None
+
+
+def _use_gpu() -> bool:
+    """เลือก device จาก OCR_DEVICE (auto | cpu | cuda) auto = ใช้ GPU เมื่อมี CUDA เท่านั้น"""
+    device = os.getenv("OCR_DEVICE", "auto").lower()
+    if device == "cpu":
+        return False
+
+    import torch
+
+    if device == "cuda" and not torch.cuda.is_available():
+        logger.warning("OCR_DEVICE=cuda but CUDA is not available, falling back to CPU.")
+    return torch.cuda.is_available()
+
+
+def get_ocr_reader():
+    """
+    คืน easyocr.Reader ของ process นี้ (สร้างครั้งแรกที่ถูกเรียก แล้วใช้ซ้ำ)
+    การ import easyocr/torch และโหลด weight ของ detector/recognizer เกิดที่นี่ ไม่ใช่ตอน import router
+    """
+    global _reader, _reader_device, _reader_load_seconds
+    if _reader is not None:
+        return _reader
+
+    with _lock:
+        if _reader is None:
+            start = time.perf_counter()
+            import easyocr
+
+            gpu = _use_gpu()
+            reader = easyocr.Reader(OCR_LANGUAGES, gpu=gpu)
+            _reader_device = "cuda" if gpu else "cpu"
+            _reader_load_seconds = time.perf_counter() - start
+            _reader = reader
+            logger.info(
+                f"EasyOCR reader loaded on {_reader_device} in {_reader_load_seconds:.2f}s."
+            )
+    return _reader
+
+
+def get_ocr_pool() -> OcrProcessPool | None:
+    """
+    คืน OcrProcessPool เมื่อ OCR_MODE=process (สร้างครั้งแรกที่ถูกเรียก) หรือ None เมื่อ OCR รันใน process นี้
+    - OCR_PROCESS_WORKERS: จำนวน worker process (แต่ละตัวมี easyocr.Reader ของตัวเอง)
+    - OCR_PROCESS_THREADS: จำนวน torch thread ต่อ worker (ค่าเริ่มต้น = จำนวน core / จำนวน worker)
+    """
+    global _pool
+    if os.getenv("OCR_MODE", "thread") != "process":
+        return None
+    if _pool is None:
+        with _lock:
+            if _pool is None:
+                num_workers = int(os.getenv("OCR_PROCESS_WORKERS", "2"))
+                default_threads = max(1, (os.cpu_count() or 1) // num_workers)
+                _pool = OcrProcessPool(
+                    num_workers=num_workers,
+                    torch_threads=int(os.getenv("OCR_PROCESS_THREADS", str(default_threads))),
+                )
+                logger.info(
+                    f"OCR process pool started with {_pool.num_workers} workers "
+                    f"x {_pool.torch_threads} torch threads."
+                )
+    return _pool
+
+
+def ocr_workers() -> int:
+    """จำนวน OCR ที่รันพร้อมกันได้ (ใช้กำหนดจำนวนภาพที่ต้องเตรียมไว้ให้ทุก worker มีงาน)"""
+    pool = get_ocr_pool()
+    return pool.num_workers if pool else 1
+
+
+def ocr_readtext_batched(images: list) -> tuple[list[str], list[dict]]:
+    """OCR หลายภาพแบบ batch ใน process นี้ หรือกระจายไปยัง worker process เมื่อ OCR_MODE=process"""
+    pool = get_ocr_pool()
+    if pool is not None:
+        return pool.readtext_batched(images)
+    return readtext_batched(get_ocr_reader(), images)
+
+
+def ocr_read_templates(items: list[tuple]) -> list[tuple[dict | None, str, float]]:
+    """
+    OCR เฉพาะบริเวณตาม template ของธนาคาร (ไม่รัน text detector)
+    items คือ list ของ (ภาพขาวดำ, ชื่อธนาคาร) คืนค่า (field หรือ None, ข้อความดิบ, เวลา) ตามลำดับเดิม
+    """
+    pool = get_ocr_pool()
+    if pool is not None:
+        return pool.read_templates(items)
+    templates = load_templates()
+    return [read_slip_with_template(get_ocr_reader(), gray, templates[bank]) for gray, bank in items]
+
+
+def close_ocr_pool() -> None:
+    global _pool
+    with _lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.close()
+
+
+def warm_up_ocr_reader(background: bool = True) -> None:
+    """
+    โหลด reader และรัน OCR กับภาพว่างหนึ่งครั้ง เพื่อให้ request แรกไม่ต้องรอโหลดโมเดล
+    เมื่อ OCR_MODE=process จะโหลด reader ในทุก worker แทน
+    background=True จะทำใน thread แยก ไม่ทำให้ startup ช้าลง
+    """
+    global _warm_up_thread
+
+    def _warm_up():
+        import numpy as np
+
+        try:
+            pool = get_ocr_pool()
+            if pool is not None:
+                pool.warm_up()
+                return
+            get_ocr_reader().readtext(np.full((64, 256, 3), 255, dtype=np.uint8), detail=0)
+            logger.info("EasyOCR reader warmed up.")
+        except Exception as e:
+            logger.error(f"EasyOCR warm-up failed: {e}")
+
+    if not background:
+        _warm_up()
+        return
+    if _warm_up_thread is None or not _warm_up_thread.is_alive():
+        _warm_up_thread = threading.Thread(target=_warm_up, name="ocr-warm-up", daemon=True)
+        _warm_up_thread.start()
+
+
+def ocr_reader_stats() -> dict:
+    if _pool is not None:
+        return {**_pool.stats(), "languages": OCR_LANGUAGES}
+    return {
+        "mode": "thread",
+        "loaded": _reader is not None,
+        "device": _reader_device,
+        "load_seconds": _reader_load_seconds,
+        "languages": OCR_LANGUAGES,
+    }
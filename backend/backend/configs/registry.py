@@ -1,5 +1,369 @@
 # app/core/registry.py
+import functools
+import os
+import threading
+import time
 
-# สร้าง Dictionary กลางสำหรับเก็บโมเดลที่โหลดแล้ว
-# ไฟล์นี้จะทำหน้าที่เป็น "ที่เก็บของส่วนกลาง" เท่านั้น
-models = {}
\ No newline at end of file
+from dotenv import load_dotenv
+from loguru import logger
+
+from ..ml.batching import MicroBatchingPredictionService
+from ..ml.prediction import create_prediction_service
+from ..ml.process_pool import ProcessPoolPredictionService
+from ..ml.result_cache import CachedPredictionService, ClassificationCache
+
+load_dotenv()
+
+
+def load_classifier(model_path: str, engine: str | None = None):
+    """
+    โหลดโมเดล YOLO ด้วย engine ที่เลือก (ค่าเริ่มต้นจาก YOLO_ENGINE):
+    torch, onnx, openvino, onnx-int8 (ต้องตั้ง YOLO_INT8_CALIBRATION_DIR) หรือ onnx-int8-dynamic
+    - INFERENCE_MODE=thread (ค่าเริ่มต้น): โมเดลอยู่ใน process หลัก
+    - INFERENCE_MODE=process: โมเดลอยู่ใน worker process จำนวน INFERENCE_PROCESS_WORKERS ตัว
+    แล้วครอบด้วย micro-batching ถ้าตั้งค่า YOLO_BATCH_SIZE มากกว่า 1
+    และ cache ผลลัพธ์ตาม hash ของภาพ ถ้าตั้งค่า YOLO_CACHE_SIZE มากกว่า 0
+    """
+    engine = engine or os.getenv("YOLO_ENGINE", "torch")
+    export_dir = os.getenv("YOLO_EXPORT_DIR") or None
+    calibration_dir = os.getenv("YOLO_INT8_CALIBRATION_DIR") or None
+
+    if os.getenv("INFERENCE_MODE", "thread") == "process":
+        num_workers = int(os.getenv("INFERENCE_PROCESS_WORKERS", "2"))
+        default_threads = max(1, (os.cpu_count() or 1) // num_workers)
+        service = ProcessPoolPredictionService(
+            model_path,
+            engine=engine,
+            export_dir=export_dir,
+            num_workers=num_workers,
+            torch_threads=int(os.getenv("INFERENCE_PROCESS_THREADS", str(default_threads))),
+            calibration_dir=calibration_dir,
+            max_restarts=int(os.getenv("INFERENCE_PROCESS_MAX_RESTARTS", "5")),
+        )
+    else:
+        service = create_prediction_service(
+            model_path,
+            engine=engine,
+            export_dir=export_dir,
+            calibration_dir=calibration_dir,
+        )
+
+    fingerprint = service.result_fingerprint
+    batch_size = int(os.getenv("YOLO_BATCH_SIZE", "16"))
+    if batch_size > 1:
+        service = MicroBatchingPredictionService(
+            service,
+            max_batch_size=batch_size,
+            max_wait_ms=float(os.getenv("YOLO_BATCH_WAIT_MS", "10")),
+        )
+    cache_size = int(os.getenv("YOLO_CACHE_SIZE", "10000"))
+    if cache_size > 0:
+        service = CachedPredictionService(
+            service,
+            ClassificationCache(
+                model_key=model_path,
+                model_fingerprint=fingerprint,
+                max_entries=cache_size,
+                persistent=os.getenv("YOLO_CACHE_PERSIST", "1") == "1",
+            ),
+        )
+    return service
+
+
+def _rss_bytes() -> int:
+    """หน่วยความจำ (RSS) ของ process นี้ อ่านจาก /proc (คืน 0 ถ้าไม่ใช่ Linux)"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return 0
+
+
+def _available_memory_bytes() -> int | None:
+    """หน่วยความจำที่ยังว่างของเครื่อง (MemAvailable) หรือ None ถ้าอ่านไม่ได้"""
+    try:
+        with open("/proc/meminfo") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+def _close_service(service) -> None:
+    # ปิดทุกชั้นของ service (cache -> batcher -> model/process pool)
+    while service is not None:
+        if hasattr(service, "close"):
+            service.close()
+        service = getattr(service, "service", None)
+
+
+class _Generation:
+    """service หนึ่งชุดที่โหลดจากไฟล์โมเดลเวอร์ชันหนึ่ง พร้อมตัวนับ request ที่กำลังใช้งาน"""
+
+    def __init__(self, service):
+        self.service = service
+        self.in_flight = 0
+        self.retired = False
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        with self._lock:
+            self.in_flight += 1
+
+    def release(self) -> None:
+        with self._lock:
+            self.in_flight -= 1
+            should_close = self.retired and self.in_flight == 0
+        if should_close:
+            _close_service(self.service)
+
+    def retire(self) -> None:
+        # ปิดทันทีถ้าไม่มี request ใช้อยู่ ไม่เช่นนั้น request สุดท้ายจะเป็นคนปิด
+        with self._lock:
+            self.retired = True
+            should_close = self.in_flight == 0
+        if should_close:
+            _close_service(self.service)
+
+
+class ManagedModel:
+    """
+    ตัวแทนของโมเดลหนึ่งตัวใน registry (router เรียก predict_classify ได้เหมือนเดิม)
+    - โหลดเมื่อถูกใช้งานครั้งแรก หรือโหลดทันทีพร้อม warm-up
+    - เมื่อไฟล์โมเดลเปลี่ยน จะโหลดชุดใหม่แล้วสลับแบบ atomic โดย request เดิมยังใช้ชุดเก่าจนจบ
+    - ถูก unload ได้เมื่อไม่ได้ใช้งานนานและหน่วยความจำเครื่องเหลือน้อย
+    """
+
+    def __init__(self, name: str, model_path: str, loader=load_classifier, warm_up: bool = True):
+        self.name = name
+        self.model_path = model_path
+        self.loader = loader
+        self.warm_up = warm_up
+
+        self._generation: _Generation | None = None
+        # _load_lock กันการโหลดซ้ำซ้อน (ถือนานระหว่างโหลด)
+        # _swap_lock ถือสั้นๆ ตอนหยิบ/สลับ generation เพื่อไม่ให้ request ได้ชุดที่ถูกปิดไปแล้ว
+        self._load_lock = threading.Lock()
+        self._swap_lock = threading.Lock()
+        self._mtime = self._read_mtime()
+        self._pending_mtime: float | None = None
+
+        self.loads = 0
+        self.reloads = 0
+        self.unloads = 0
+        self.load_time_s: float | None = None
+        self.warmup_time_s: float | None = None
+        self.memory_bytes: int | None = None
+        self.last_used = 0.0
+
+    def _read_mtime(self) -> float | None:
+        try:
+            return os.path.getmtime(self.model_path)
+        except OSError:
+            return None
+
+    @property
+    def loaded(self) -> bool:
+        return self._generation is not None
+
+    def _build(self, warm_up: bool) -> _Generation:
+        rss_before = _rss_bytes()
+        start = time.perf_counter()
+        service = self.loader(self.model_path)
+        self.load_time_s = time.perf_counter() - start
+        if warm_up and hasattr(service, "warm_up"):
+            start = time.perf_counter()
+            service.warm_up()
+            self.warmup_time_s = time.perf_counter() - start
+        self.memory_bytes = max(0, _rss_bytes() - rss_before)
+        self.loads += 1
+        logger.info(
+            f"Model '{self.name}' loaded in {self.load_time_s:.2f}s "
+            f"(+{self.memory_bytes / 1024 / 1024:.1f} MB)."
+        )
+        return _Generation(service)
+
+    def load(self) -> None:
+        with self._load_lock:
+            if self._generation is None:
+                self._mtime = self._read_mtime()
+                generation = self._build(warm_up=self.warm_up)
+                with self._swap_lock:
+                    self._generation = generation
+
+    def reload(self) -> None:
+        """โหลดชุดใหม่ให้เสร็จก่อน แล้วค่อยสลับ ชุดเก่าจะถูกปิดเมื่อ request ที่ค้างอยู่จบ"""
+        with self._load_lock:
+            mtime = self._read_mtime()
+            # warm-up ชุดใหม่ก่อนสลับเสมอ เพื่อไม่ให้ request แรกหลังสลับต้องรอ
+            new_generation = self._build(warm_up=True)
+            with self._swap_lock:
+                old_generation, self._generation = self._generation, new_generation
+            self._mtime = mtime
+            self.reloads += 1
+        if old_generation is not None:
+            old_generation.retire()
+        logger.info(f"Model '{self.name}' reloaded from '{self.model_path}'.")
+
+    def unload(self) -> None:
+        with self._load_lock, self._swap_lock:
+            old_generation, self._generation = self._generation, None
+        if old_generation is not None:
+            old_generation.retire()
+            self.unloads += 1
+            self.memory_bytes = None
+            logger.info(f"Model '{self.name}' unloaded.")
+
+    def _acquire(self) -> _Generation | None:
+        with self._swap_lock:
+            generation = self._generation
+            if generation is not None:
+                generation.acquire()
+            return generation
+
+    def _call(self, method: str, *args):
+        generation = self._acquire()
+        while generation is None:
+            self.load()
+            generation = self._acquire()
+        try:
+            self.last_used = time.monotonic()
+            return getattr(generation.service, method)(*args)
+        finally:
+            generation.release()
+
+    def predict_classify(self, image_bytes: bytes) -> tuple[str, float]:
+        return self._call("predict_classify", image_bytes)
+
+    def predict_classify_batch(self, images: list[bytes]) -> list[tuple[str, float]]:
+        return self._call("predict_classify_batch", images)
+
+    def check_for_update(self) -> bool:
+        """คืน True ถ้าไฟล์โมเดลเปลี่ยนและเขียนเสร็จแล้ว (mtime คงที่สองรอบติดกัน)"""
+        mtime = self._read_mtime()
+        if mtime is None or mtime == self._mtime:
+            self._pending_mtime = None
+            return False
+        if self._pending_mtime != mtime:
+            # ไฟล์อาจกำลังถูกคัดลอกอยู่ รอดูรอบถัดไปก่อน
+            self._pending_mtime = mtime
+            return False
+        self._pending_mtime = None
+        return True
+
+    def stats(self) -> dict:
+        generation = self._generation
+        stats = {
+            "loaded": generation is not None,
+            "model_path": self.model_path,
+            "loads": self.loads,
+            "reloads": self.reloads,
+            "unloads": self.unloads,
+            "load_time_s": self.load_time_s,
+            "warmup_time_s": self.warmup_time_s,
+            "memory_mb": self.memory_bytes / 1024 / 1024 if self.memory_bytes is not None else None,
+            "idle_s": time.monotonic() - self.last_used if self.last_used else None,
+        }
+        if generation is not None:
+            stats["in_flight"] = generation.in_flight
+            if hasattr(generation.service, "stats"):
+                stats.update(generation.service.stats())
+        return stats
+
+    def close(self) -> None:
+        self.unload()
+
+
+class ModelRegistry:
+    """
+    ที่เก็บโมเดลส่วนกลาง (ใช้งานแบบ dict ได้: models.get(name), models.items())
+    มี background thread คอยตรวจไฟล์โมเดลที่เปลี่ยนและ unload โมเดลที่ไม่ได้ใช้เมื่อหน่วยความจำเหลือน้อย
+    """
+
+    def __init__(self):
+        self._models: dict[str, ManagedModel] = {}
+        self._monitor: threading.Thread | None = None
+        self._stopped = threading.Event()
+
+        self.check_interval = float(os.getenv("MODEL_RELOAD_CHECK_SECONDS", "5"))
+        self.idle_unload_after = float(os.getenv("MODEL_IDLE_UNLOAD_SECONDS", "0"))
+        self.min_free_memory = int(os.getenv("MODEL_MIN_FREE_MEMORY_MB", "1024")) * 1024 * 1024
+
+    def register(
+        self,
+        name: str,
+        model_path: str,
+        eager: bool = False,
+        engine: str | None = None,
+        loader=load_classifier,
+    ) -> ManagedModel:
+        if engine:
+            loader = functools.partial(loader, engine=engine)
+        managed = ManagedModel(name, model_path, loader=loader, warm_up=eager)
+        self._models[name] = managed
+        if eager:
+            managed.load()
+        self._start_monitor()
+        return managed
+
+    def get(self, name: str, default=None) -> ManagedModel | None:
+        return self._models.get(name, default)
+
+    def __getitem__(self, name: str) -> ManagedModel:
+        return self._models[name]
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._models
+
+    def items(self):
+        return self._models.items()
+
+    def values(self):
+        return self._models.values()
+
+    def _start_monitor(self) -> None:
+        if self._monitor is not None or self.check_interval <= 0:
+            return
+        self._stopped.clear()
+        self._monitor = threading.Thread(target=self._watch, name="model-registry-monitor", daemon=True)
+        self._monitor.start()
+
+    def _under_memory_pressure(self) -> bool:
+        available = _available_memory_bytes()
+        return available is not None and available < self.min_free_memory
+
+    def _watch(self) -> None:
+        while not self._stopped.wait(self.check_interval):
+            for managed in list(self._models.values()):
+                try:
+                    if managed.loaded and managed.check_for_update():
+                        managed.reload()
+                    elif (
+                        managed.loaded
+                        and self.idle_unload_after > 0
+                        and time.monotonic() - managed.last_used > self.idle_unload_after
+                        and self._under_memory_pressure()
+                    ):
+                        managed.unload()
+                except Exception as e:
+                    logger.error(f"Model registry monitor failed for '{managed.name}': {e}")
+
+    def close(self) -> None:
+        self._stopped.set()
+        if self._monitor is not None:
+            self._monitor.join()
+            self._monitor = None
+        for managed in self._models.values():
+            managed.close()
+        self._models.clear()
+
+
+# Registry กลางสำหรับเก็บโมเดลที่โหลดแล้ว (ทุก router ใช้ตัวนี้ร่วมกัน)
+models = ModelRegistry()
+
+
+def close_models() -> None:
+    """ปิด background thread / worker process ของทุกโมเดลตอน shutdown"""
+    models.close()
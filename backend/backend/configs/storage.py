@@ -0,0 +1,217 @@
+# /configs/storage.py
+import asyncio
+import hashlib
+import io
+import os
+import shutil
+import tempfile
+from abc import ABC, abstractmethod
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import BinaryIO
+
+import requests
+from dotenv import load_dotenv
+from fastapi import HTTPException, status
+from firebase_admin import storage
+from loguru import logger
+from sqlmodel import Session, select
+
+from .database import engine
+from .firebase import upload_file_to_storage
+from ..models import StoredObject
+
+load_dotenv()
+
+_READ_CHUNK = 1024 * 1024
+# ไฟล์ที่ดาวน์โหลดมาเก็บในหน่วยความจำถึงขนาดนี้ แล้วย้ายไปไฟล์ชั่วคราวบนดิสก์
+_DOWNLOAD_SPOOL_SIZE = 64 * 1024 * 1024
+
+
+def _content_hash(file_obj: BinaryIO) -> tuple[str, int]:
+    """SHA-256 และขนาดของไฟล์ตั้งแต่ตำแหน่งปัจจุบัน (อ่านทีละช่วง แล้วคืนตำแหน่งเดิม)"""
+    start = file_obj.tell()
+    digest = hashlib.sha256()
+    size = 0
+    while chunk := file_obj.read(_READ_CHUNK):
+        digest.update(chunk)
+        size += len(chunk)
+    file_obj.seek(start)
+    return digest.hexdigest(), size
+
+
+def _download(url: str) -> BinaryIO:
+    output = tempfile.SpooledTemporaryFile(max_size=_DOWNLOAD_SPOOL_SIZE)
+    try:
+        with requests.get(url, stream=True, timeout=60) as response:
+            response.raise_for_status()
+            for chunk in response.iter_content(_READ_CHUNK):
+                output.write(chunk)
+    except BaseException:
+        output.close()
+        raise
+    output.seek(0)
+    return output
+
+
+class ObjectStorage(ABC):
+    """
+    ที่เก็บไฟล์ผลลัพธ์ (ZIP, Excel) แบบเลือก backend ได้ด้วย STORAGE_BACKEND
+    ไฟล์ถูกเก็บด้วยชื่อจาก SHA-256 ของเนื้อหา (objects/ab/abcd....zip) และจดไว้ในตาราง storedobject
+    ไฟล์ที่เนื้อหาเหมือนกันจึงถูกเก็บและอัปโหลดเพียงครั้งเดียว การ put ครั้งต่อไปคืน URL เดิมทันที
+    ตอนดาวน์โหลดไฟล์ได้ชื่อเดิมของการอัปโหลดครั้งแรก (Content-Disposition) ไม่ใช่ชื่อจาก hash
+    backend แต่ละแบบต้อง implement _exists, _upload และ _url
+    """
+
+    name = "base"
+
+    async def put(self, file_bytes: bytes | BinaryIO, filename: str, content_type: str) -> str:
+        """เก็บไฟล์ (bytes หรือไฟล์ที่เปิดอยู่ อ่านจากตำแหน่งปัจจุบัน) แล้วคืน URL สำหรับดาวน์โหลด"""
+        file_obj = io.BytesIO(file_bytes) if isinstance(file_bytes, (bytes, bytearray)) else file_bytes
+        content_hash, size = await asyncio.to_thread(_content_hash, file_obj)
+
+        stored = await asyncio.to_thread(self._lookup, content_hash)
+        if stored is not None:
+            logger.info(f"'{filename}' is identical to stored object '{stored.key}', skipping upload.")
+            return stored.url
+
+        extension = Path(filename).suffix.lower()
+        key = f"objects/{content_hash[:2]}/{content_hash}{extension}"
+        if await self._exists(key):
+            url = self._url(key)
+            logger.info(f"'{filename}' already exists in {self.name} storage as '{key}'.")
+        else:
+            url = await self._upload(file_obj, key, content_type, Path(filename).name)
+            logger.info(f"Stored '{filename}' ({size} bytes) in {self.name} storage as '{key}'.")
+
+        await asyncio.to_thread(
+            self._record,
+            StoredObject(
+                backend=self.name,
+                content_hash=content_hash,
+                key=key,
+                url=url,
+                size=size,
+                content_type=content_type,
+                filename=filename,
+                created_at=datetime.now(timezone.utc),
+            ),
+        )
+        return url
+
+    async def open_url(self, url: str) -> BinaryIO:
+        """เปิดไฟล์จาก URL เป็นไฟล์ชั่วคราว (ดาวน์โหลดทีละช่วง ไม่ต้องเก็บทั้งไฟล์เป็น bytes) ผู้เรียกต้องปิดไฟล์เอง"""
+        try:
+            return await asyncio.to_thread(_download, url)
+        except requests.exceptions.RequestException as e:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Could not download file: {e}")
+
+    def _lookup(self, content_hash: str) -> StoredObject | None:
+        with Session(engine) as session:
+            return session.get(StoredObject, (self.name, content_hash))
+
+    def _record(self, stored: StoredObject) -> None:
+        with Session(engine) as session:
+            session.merge(stored)
+            session.commit()
+
+    @abstractmethod
+    async def _exists(self, key: str) -> bool:
+        """มีไฟล์ key อยู่ใน backend แล้วหรือไม่"""
+
+    @abstractmethod
+    async def _upload(self, file_obj: BinaryIO, key: str, content_type: str, filename: str) -> str:
+        """อัปโหลดไฟล์เป็น key (ให้ดาวน์โหลดได้ในชื่อ filename) แล้วคืน URL"""
+
+    @abstractmethod
+    def _url(self, key: str) -> str:
+        """URL สำหรับดาวน์โหลดไฟล์ key"""
+
+
+class FirebaseStorage(ObjectStorage):
+    """เก็บไฟล์ใน Firebase Storage (bucket จาก FIREBASE_STORAGE_BUCKET) และเปิดเป็น public URL"""
+
+    name = "firebase"
+
+    async def _exists(self, key: str) -> bool:
+        return await asyncio.to_thread(lambda: storage.bucket().blob(key).exists())
+
+    async def _upload(self, file_obj: BinaryIO, key: str, content_type: str, filename: str) -> str:
+        return await upload_file_to_storage(file_obj, key, content_type, filename=filename)
+
+    def _url(self, key: str) -> str:
+        return storage.bucket().blob(key).public_url
+
+
+class LocalStorage(ObjectStorage):
+    """
+    เก็บไฟล์ในโฟลเดอร์ local (STORAGE_LOCAL_DIR) สำหรับรันและวัดผลโดยไม่ต้องต่อ Firebase
+    ไฟล์ถูกเปิดให้ดาวน์โหลดที่ {STORAGE_PUBLIC_URL}/storage/... (route ใน main.py ส่งไฟล์พร้อมชื่อเดิมจาก stored_file)
+    """
+
+    name = "local"
+
+    def __init__(self, root: str, public_url: str):
+        self.root = Path(root)
+        self.public_url = public_url.rstrip("/")
+
+    async def _exists(self, key: str) -> bool:
+        return (self.root / key).is_file()
+
+    async def _upload(self, file_obj: BinaryIO, key: str, content_type: str, filename: str) -> str:
+        # ชื่อเดิมถูกจดในตาราง storedobject และส่งเป็น Content-Disposition ตอนดาวน์โหลด
+        def write() -> None:
+            path = self.root / key
+            path.parent.mkdir(parents=True, exist_ok=True)
+            # เขียนลงไฟล์ชั่วคราวก่อนแล้วค่อยเปลี่ยนชื่อ กันไฟล์ครึ่งๆ กลางๆ ถ้าเขียนไม่สำเร็จ
+            partial = path.with_name(path.name + ".part")
+            with open(partial, "wb") as output:
+                shutil.copyfileobj(file_obj, output, _READ_CHUNK)
+            os.replace(partial, path)
+
+        await asyncio.to_thread(write)
+        return self._url(key)
+
+    def _url(self, key: str) -> str:
+        return f"{self.public_url}/storage/{key}"
+
+    def _path(self, key: str) -> Path | None:
+        path = (self.root / key).resolve()
+        if path.is_relative_to(self.root.resolve()) and path.is_file():
+            return path
+        return None
+
+    def stored_file(self, key: str) -> tuple[Path, StoredObject | None] | None:
+        """path ของไฟล์ key และรายการใน storedobject (ชื่อไฟล์ / content type เดิม) หรือ None ถ้าไม่มีไฟล์"""
+        path = self._path(key)
+        if path is None:
+            return None
+        with Session(engine) as session:
+            stored = session.exec(
+                select(StoredObject).where(StoredObject.backend == self.name, StoredObject.key == key)
+            ).first()
+        return path, stored
+
+    async def open_url(self, url: str) -> BinaryIO:
+        # ไฟล์ของ backend นี้เปิดจากดิสก์ได้โดยตรง ไม่ต้องผ่าน HTTP
+        prefix = f"{self.public_url}/storage/"
+        if url.startswith(prefix):
+            path = self._path(url[len(prefix):])
+            if path is not None:
+                return open(path, "rb")
+        return await super().open_url(url)
+
+
+def create_object_storage() -> ObjectStorage:
+    backend = os.getenv("STORAGE_BACKEND", "firebase")
+    if backend == "local":
+        return LocalStorage(
+            root=os.getenv("STORAGE_LOCAL_DIR", "storage"),
+            public_url=os.getenv("STORAGE_PUBLIC_URL", "http://localhost:8000"),
+        )
+    if backend != "firebase":
+        raise ValueError(f"Unknown STORAGE_BACKEND '{backend}', use 'firebase' or 'local'.")
+    return FirebaseStorage()
+
+
+object_storage = create_object_storage()
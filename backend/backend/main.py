@@ -1,24 +1,24 @@
 # /main.py
+import asyncio
 import os
+from pathlib import Path
 from dotenv import load_dotenv
 
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import FileResponse
 
 from .configs.logging_config import setup_logging
 from . import routers
 
 from .configs.database import create_db_and_tables
-from .configs.firebase import initialize_firebase
-from .ml.prediction import YoloPredictionService  # หรือ Service อื่นๆ
+from .configs.firebase import initialize_firebase, close_storage_executor
+from .configs.storage import LocalStorage, object_storage
 
-from .configs.registry import models
-
-from fastapi import FastAPI, File, UploadFile
-import torch
-import easyocr
-import numpy as np
-from PIL import Image   
+from .configs.registry import models, close_models
+from .configs.ocr_reader import warm_up_ocr_reader, close_ocr_pool
+from .configs.ocr_jobs import ocr_jobs
+from .ml.ocr_text_store import ocr_text_store
 
 app = FastAPI()
 
@@ -41,12 +41,20 @@ def on_startup():
     It creates the database and tables.
     """
     create_db_and_tables()
-    initialize_firebase()
+    # STORAGE_BACKEND=local ไม่ต้องต่อ Firebase
+    if not isinstance(object_storage, LocalStorage):
+        initialize_firebase()
+
+    # lazy = โหลดเมื่อถูกใช้งานครั้งแรก, eager = โหลดและ warm-up ตอน startup
+    eager = os.getenv("MODEL_LOAD_MODE", "lazy") == "eager"
 
     slip_classifier_path = os.getenv("YOLO_SLIP_CLASSIFIER_PATH")
     if slip_classifier_path:
-        models["slip_classifier"] = YoloPredictionService(
-            model_path=slip_classifier_path
+        models.register(
+            "slip_classifier",
+            slip_classifier_path,
+            eager=eager,
+            engine=os.getenv("YOLO_SLIP_CLASSIFIER_ENGINE"),
         )
 
     # เพิ่มโมเดลสำหรับตรวจสอบภาพผิดกฎหมาย
@@ -55,10 +63,48 @@ def on_startup():
         "./backend/ml/bestYOLOillegalImageClassified4.pt",
     )
     if illegal_image_classifier_path:
-        models["illegal_image_classifier"] = YoloPredictionService(
-            model_path=illegal_image_classifier_path
+        models.register(
+            "illegal_image_classifier",
+            illegal_image_classifier_path,
+            eager=eager,
+            engine=os.getenv("YOLO_ILLEGAL_IMAGE_CLASSIFIER_ENGINE"),
         )
 
+    # โหลด EasyOCR ล่วงหน้าใน background (ค่าเริ่มต้นคือโหลดเมื่อมี request OCR แรก)
+    if os.getenv("OCR_WARM_UP", "0") == "1":
+        warm_up_ocr_reader()
+
+
+@app.on_event("startup")
+async def start_ocr_jobs():
+    """
+    เริ่ม worker ของงาน OCR แบบ background และรันต่องานที่ค้างอยู่ใน database
+    """
+    from .routers.v1.ocr import run_ocr_job
+
+    await ocr_jobs.start(run_ocr_job)
+
+
+@app.on_event("shutdown")
+async def stop_ocr_jobs():
+    """
+    หยุด worker ของงาน OCR (งานที่ยังไม่เสร็จจะถูกรันต่อเมื่อเริ่มเซิร์ฟเวอร์ครั้งถัดไป)
+    """
+    await ocr_jobs.stop()
+
+
+@app.on_event("shutdown")
+def on_shutdown():
+    """
+    ปิด background thread และ worker process ของโมเดลทั้งหมด
+    """
+    close_models()
+    close_ocr_pool()
+    # เขียนข้อความ OCR ที่ยังค้างในคิวลง database ให้ครบ
+    ocr_text_store.close()
+    # รออัปโหลดไฟล์ที่ค้างอยู่ให้เสร็จ
+    close_storage_executor()
+
 
 # --- Middleware ---
 origins = [
@@ -78,6 +124,21 @@ app.add_middleware(
 # Include all your routers here
 app.include_router(routers.router)
 
+# ไฟล์ของ local storage (STORAGE_BACKEND=local)
+if isinstance(object_storage, LocalStorage):
+    object_storage.root.mkdir(parents=True, exist_ok=True)
+
+    @app.get("/storage/{key:path}", include_in_schema=False)
+    async def read_stored_object(key: str):
+        """ส่งไฟล์ที่เก็บด้วยชื่อจาก hash กลับในชื่อเดิมของไฟล์ (Content-Disposition)"""
+        found = await asyncio.to_thread(object_storage.stored_file, key)
+        if found is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="File not found.")
+        path, stored = found
+        if stored is None:
+            return FileResponse(path)
+        return FileResponse(path, media_type=stored.content_type, filename=Path(stored.filename).name)
+
 
 # --- Root Endpoint ---
 @app.get("/")
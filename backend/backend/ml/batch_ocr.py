@@ -0,0 +1,86 @@
+# app/ml/batch_ocr.py
+import os
+import time
+
+import numpy as np
+from dotenv import load_dotenv
+from loguru import logger
+
+load_dotenv()
+
+# จำนวนภาพต่อหนึ่งรอบของ text detector (ภาพใน batch ต้องมีขนาดเท่ากัน)
+OCR_BATCH_SIZE = int(os.getenv("OCR_BATCH_SIZE", "8"))
+# จำนวนกล่องข้อความต่อหนึ่งรอบของ recognizer
+OCR_RECOGNIZER_BATCH_SIZE = int(os.getenv("OCR_RECOGNIZER_BATCH_SIZE", "16"))
+# ภาพที่ขนาดต่างกันไม่เกินค่านี้ (pixel) ถูกจัดไว้ bucket เดียวกันแล้วย่อ/ขยายให้เท่ากัน
+_SHAPE_STEP = 32
+
+
+def shape_buckets(images: list[np.ndarray], batch_size: int) -> list[list[int]]:
+    """
+    จัดกลุ่ม index ของภาพตามขนาด (ปัดเป็นช่วงละ _SHAPE_STEP pixel) แล้วแบ่งเป็น batch ละไม่เกิน batch_size
+    สลิปจากแอปธนาคารเดียวกันมักมีขนาดเท่ากัน จึงรวม batch ได้เต็ม
+    """
+    buckets: dict[tuple[int, int], list[int]] = {}
+    for index, image in enumerate(images):
+        height, width = image.shape[:2]
+        key = (round(height / _SHAPE_STEP), round(width / _SHAPE_STEP))
+        buckets.setdefault(key, []).append(index)
+
+    batches = []
+    for indices in buckets.values():
+        for start in range(0, len(indices), batch_size):
+            batches.append(indices[start : start + batch_size])
+    return batches
+
+
+def readtext_bucket(reader, batch: list[np.ndarray], recognizer_batch_size: int) -> tuple[list[str], dict]:
+    """OCR ภาพหนึ่ง batch (ขนาดใกล้กัน) คืนค่า (ข้อความของแต่ละภาพ, เวลาที่ใช้)"""
+    height, width = batch[0].shape[:2]
+    same_shape = all(image.shape[:2] == (height, width) for image in batch)
+
+    start = time.perf_counter()
+    results = reader.readtext_batched(
+        batch,
+        n_width=None if same_shape else width,
+        n_height=None if same_shape else height,
+        batch_size=recognizer_batch_size,
+        detail=0,
+    )
+    elapsed = time.perf_counter() - start
+
+    timing = {"shape": f"{width}x{height}", "images": len(batch), "seconds": elapsed}
+    return [" ".join(words) for words in results], timing
+
+
+def log_batch_timing(timing: dict) -> None:
+    logger.info(
+        f"OCR batch of {timing['images']} images ({timing['shape']}) took {timing['seconds']:.2f}s "
+        f"({timing['seconds'] / timing['images']:.2f}s/image)."
+    )
+
+
+def readtext_batched(
+    reader,
+    images: list[np.ndarray],
+    batch_size: int | None = None,
+    recognizer_batch_size: int | None = None,
+) -> tuple[list[str], list[dict]]:
+    """
+    OCR หลายภาพด้วย EasyOCR แบบ batch (detector รันทีละ batch ของภาพขนาดใกล้กัน)
+    คืนค่า (ข้อความของแต่ละภาพตามลำดับเดิม, เวลาที่ใช้ของแต่ละ batch)
+    """
+    batch_size = max(1, batch_size or OCR_BATCH_SIZE)
+    recognizer_batch_size = max(1, recognizer_batch_size or OCR_RECOGNIZER_BATCH_SIZE)
+
+    texts = [""] * len(images)
+    timings = []
+    for indices in shape_buckets(images, batch_size):
+        batch_texts, timing = readtext_bucket(
+            reader, [images[i] for i in indices], recognizer_batch_size
+        )
+        for index, text in zip(indices, batch_texts):
+            texts[index] = text
+        timings.append(timing)
+        log_batch_timing(timing)
+    return texts, timings
@@ -0,0 +1,136 @@
+# app/ml/batching.py
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+from loguru import logger
+
+
+class MicroBatchingPredictionService:
+    """
+    ครอบ YoloPredictionService เพื่อรวมภาพจากทุก request เข้าเป็น batch เดียว
+    - รอจนได้ภาพครบ max_batch_size หรือรอนานสุด max_wait_ms แล้วจึงเรียกโมเดลหนึ่งครั้ง
+    - ผลลัพธ์ของแต่ละภาพจะถูกส่งกลับไปยังผู้เรียกผ่าน Future ของภาพนั้น
+    """
+
+    def __init__(self, service, max_batch_size: int = 16, max_wait_ms: float = 10.0):
+        self.service = service
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+
+        self._queue: deque[tuple[bytes, Future]] = deque()
+        self._condition = threading.Condition()
+        self._closed = False
+
+        self.batches_run = 0
+        self.images_processed = 0
+        self.max_queue_depth = 0
+
+        self._worker = threading.Thread(
+            target=self._run, name="yolo-micro-batcher", daemon=True
+        )
+        self._worker.start()
+
+    @property
+    def queue_depth(self) -> int:
+        """จำนวนภาพที่รออยู่ในคิว (ยังไม่ถูกส่งเข้าโมเดล)"""
+        return len(self._queue)
+
+    def submit(self, image_bytes: bytes) -> Future:
+        """ส่งภาพเข้าคิวและคืน Future ที่จะได้ผล (ชื่อคลาส, confidence)"""
+        future: Future = Future()
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("MicroBatchingPredictionService is closed.")
+            self._queue.append((image_bytes, future))
+            self.max_queue_depth = max(self.max_queue_depth, len(self._queue))
+            self._condition.notify()
+        return future
+
+    def predict_classify(self, image_bytes: bytes) -> tuple[str, float]:
+        return self.submit(image_bytes).result()
+
+    def predict_classify_batch(self, images: list[bytes]) -> list[tuple[str, float]]:
+        futures = [self.submit(image_bytes) for image_bytes in images]
+        return [future.result() for future in futures]
+
+    def warm_up(self) -> None:
+        if hasattr(self.service, "warm_up"):
+            self.service.warm_up()
+
+    def stats(self) -> dict:
+        inner = self.service.stats() if hasattr(self.service, "stats") else {}
+        return {
+            **inner,
+            "queue_depth": self.queue_depth,
+            "max_queue_depth": self.max_queue_depth,
+            "batches_run": self.batches_run,
+            "images_processed": self.images_processed,
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000.0,
+        }
+
+    def close(self) -> None:
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        self._worker.join()
+
+    def _next_batch(self) -> list[tuple[bytes, Future]] | None:
+        with self._condition:
+            while not self._queue and not self._closed:
+                self._condition.wait()
+            if not self._queue:
+                return None
+
+            # รอภาพเพิ่มจนเต็ม batch หรือจนหมดเวลา
+            deadline = time.monotonic() + self.max_wait
+            while len(self._queue) < self.max_batch_size and not self._closed:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._condition.wait(remaining)
+
+            size = min(len(self._queue), self.max_batch_size)
+            return [self._queue.popleft() for _ in range(size)]
+
+    def _run(self) -> None:
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                return
+
+            images = [image_bytes for image_bytes, _ in batch]
+            try:
+                if hasattr(self.service, "submit_batch"):
+                    # service ที่รันแบบ async (เช่น process pool) ส่งต่อได้ทันทีโดยไม่ต้องรอผล
+                    # ทำให้หลาย batch ทำงานพร้อมกันได้ใน worker หลายตัว
+                    batch_future = self.service.submit_batch(images)
+                    batch_future.add_done_callback(
+                        lambda done, batch=batch: self._deliver(batch, done)
+                    )
+                else:
+                    predictions = self.service.predict_classify_batch(images)
+                    for (_, future), prediction in zip(batch, predictions):
+                        future.set_result(prediction)
+            except Exception as e:
+                # ถ้าทั้ง batch ล้มเหลว ให้ลองทีละภาพเพื่อไม่ให้ภาพเสียภาพเดียวทำให้ภาพอื่นล้มตาม
+                logger.warning(f"Batch of {len(batch)} failed ({e}), retrying one by one.")
+                for image_bytes, future in batch:
+                    try:
+                        future.set_result(self.service.predict_classify(image_bytes))
+                    except Exception as item_error:
+                        future.set_exception(item_error)
+
+            self.batches_run += 1
+            self.images_processed += len(batch)
+
+    @staticmethod
+    def _deliver(batch: list[tuple[bytes, Future]], batch_future: Future) -> None:
+        error = batch_future.exception()
+        for index, (_, future) in enumerate(batch):
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(batch_future.result()[index])
@@ -0,0 +1,141 @@
+# app/ml/ocr_cache.py
+import json
+import os
+import threading
+from collections import OrderedDict
+
+from dotenv import load_dotenv
+from sqlalchemy.dialects.sqlite import insert
+from sqlmodel import Session, select
+
+from ..configs.database import engine
+from ..models import OcrCacheEntry
+
+load_dotenv()
+
+# SQLite จำกัดจำนวนตัวแปรต่อ query จึงแบ่ง lookup เป็นชุด
+_SQLITE_CHUNK = 500
+
+
+class OcrResultCache:
+    """
+    Cache ผลการประมวลผลสลิปตาม SHA-256 ของภาพ (ภาพเดียวกันที่ถูกส่งมาในหลาย ZIP / หลายคดี)
+    เก็บ 2 ชั้นเหมือน ClassificationCache: LRU ในหน่วยความจำ + ตาราง SQLite
+    แต่ละรายการคือ dict: source, qr_text, ocr_text, row (ไม่รวมชื่อไฟล์), parser_version, detector_version
+    """
+
+    def __init__(self, max_entries: int = 10_000, persistent: bool = True):
+        self.max_entries = max_entries
+        self.persistent = persistent
+
+        self._memory: OrderedDict[str, dict] = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    def _remember(self, key: str, entry: dict) -> None:
+        # ต้องถือ self._lock อยู่แล้วเมื่อเรียกฟังก์ชันนี้
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def get_many(self, keys: list[str]) -> dict[str, dict]:
+        if not self.enabled:
+            return {}
+        found: dict[str, dict] = {}
+        with self._lock:
+            for key in keys:
+                if key in self._memory:
+                    self._memory.move_to_end(key)
+                    found[key] = self._memory[key]
+            self.memory_hits += len(found)
+
+        missing = [key for key in dict.fromkeys(keys) if key not in found]
+        if self.persistent and missing:
+            disk_found = {}
+            with Session(engine) as session:
+                for i in range(0, len(missing), _SQLITE_CHUNK):
+                    rows = session.exec(
+                        select(OcrCacheEntry).where(
+                            OcrCacheEntry.image_hash.in_(missing[i : i + _SQLITE_CHUNK])
+                        )
+                    ).all()
+                    for row in rows:
+                        disk_found[row.image_hash] = {
+                            "source": row.source,
+                            "qr_text": row.qr_text,
+                            "ocr_text": row.ocr_text,
+                            "row": json.loads(row.row_json) if row.row_json else None,
+                            "parser_version": row.parser_version,
+                            "detector_version": row.detector_version,
+                        }
+            with self._lock:
+                for key, entry in disk_found.items():
+                    self._remember(key, entry)
+                self.disk_hits += len(disk_found)
+            found.update(disk_found)
+
+        with self._lock:
+            self.misses += len([key for key in keys if key not in found])
+        return found
+
+    def put_many(self, entries: dict[str, dict]) -> None:
+        if not entries or not self.enabled:
+            return
+        with self._lock:
+            for key, entry in entries.items():
+                self._remember(key, entry)
+
+        if self.persistent:
+            rows = [
+                {
+                    "image_hash": key,
+                    "source": entry["source"],
+                    "qr_text": entry.get("qr_text"),
+                    "ocr_text": entry.get("ocr_text"),
+                    "row_json": json.dumps(entry["row"], ensure_ascii=False) if entry.get("row") else None,
+                    "parser_version": entry["parser_version"],
+                    "detector_version": entry.get("detector_version"),
+                }
+                for key, entry in entries.items()
+            ]
+            statement = insert(OcrCacheEntry)
+            statement = statement.on_conflict_do_update(
+                index_elements=["image_hash"],
+                set_={
+                    "source": statement.excluded.source,
+                    "qr_text": statement.excluded.qr_text,
+                    "ocr_text": statement.excluded.ocr_text,
+                    "row_json": statement.excluded.row_json,
+                    "parser_version": statement.excluded.parser_version,
+                    "detector_version": statement.excluded.detector_version,
+                },
+            )
+            with Session(engine) as session:
+                session.exec(statement, params=rows)
+                session.commit()
+
+    def stats(self) -> dict:
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "cache_memory_hits": self.memory_hits,
+            "cache_disk_hits": self.disk_hits,
+            "cache_misses": self.misses,
+            "cache_hit_rate": (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0,
+            "cache_memory_entries": len(self._memory),
+        }
+
+
+# OCR_CACHE_SIZE=0 ปิด cache, OCR_CACHE_PERSIST=1 เก็บลง SQLite ด้วย (อยู่รอดข้ามการ restart)
+ocr_cache = OcrResultCache(
+    max_entries=int(os.getenv("OCR_CACHE_SIZE", "10000")),
+    persistent=os.getenv("OCR_CACHE_PERSIST", "1") == "1",
+)
@@ -0,0 +1,164 @@
+# app/ml/ocr_pool.py
+import multiprocessing as mp
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import numpy as np
+from loguru import logger
+
+from .batch_ocr import (
+    OCR_BATCH_SIZE,
+    OCR_RECOGNIZER_BATCH_SIZE,
+    log_batch_timing,
+    readtext_bucket,
+    shape_buckets,
+)
+from .roi_ocr import load_templates, read_slip_with_template
+
+
+def _init_worker(torch_threads: int) -> None:
+    # ต้องตั้งก่อน import torch ครั้งแรกใน process นี้ เพื่อไม่ให้ worker แย่ง core กัน
+    os.environ["OMP_NUM_THREADS"] = str(torch_threads)
+    os.environ["MKL_NUM_THREADS"] = str(torch_threads)
+
+    import torch
+
+    torch.set_num_threads(torch_threads)
+
+
+def _ocr_batch(batch: list[np.ndarray], recognizer_batch_size: int) -> tuple[list[str], dict]:
+    """รันใน worker process: ใช้ easyocr.Reader ของ process นั้น (โหลดครั้งแรกที่มีงานเข้ามา)"""
+    from ..configs.ocr_reader import get_ocr_reader
+
+    return readtext_bucket(get_ocr_reader(), batch, recognizer_batch_size)
+
+
+def _read_template(gray: np.ndarray, bank: str) -> tuple[dict | None, str, float]:
+    """รันใน worker process: OCR เฉพาะบริเวณตาม template ของธนาคาร"""
+    from ..configs.ocr_reader import get_ocr_reader
+
+    return read_slip_with_template(get_ocr_reader(), gray, load_templates()[bank])
+
+
+def _warm_up_worker() -> int:
+    from ..configs.ocr_reader import get_ocr_reader
+
+    get_ocr_reader()
+    return os.getpid()
+
+
+class OcrProcessPool:
+    """
+    กระจาย OCR ไปยัง worker process หลายตัว แต่ละตัวมี easyocr.Reader ของตัวเอง
+    - ภาพถูกจัด bucket ตามขนาดใน process หลัก แล้วส่งไปทีละ batch (ndarray ถูก pickle ไป
+      ซึ่งใช้เวลาน้อยมากเมื่อเทียบกับเวลา OCR หลายวินาทีต่อภาพ)
+    - ผลลัพธ์ถูกรวมกลับตามลำดับภาพเดิม
+    - ควรตั้ง workers * torch_threads ไม่เกินจำนวน core
+    """
+
+    def __init__(self, num_workers: int = 2, torch_threads: int = 1):
+        self.num_workers = max(1, num_workers)
+        self.torch_threads = max(1, torch_threads)
+        self._lock = threading.Lock()
+        self._executor = self._create_executor()
+
+        self.batches_run = 0
+        self.images_processed = 0
+        self.restarts = 0
+
+    def _create_executor(self) -> ProcessPoolExecutor:
+        # spawn แทน fork เพราะ fork หลังโหลด torch/threads แล้วไม่ปลอดภัย
+        return ProcessPoolExecutor(
+            max_workers=self.num_workers,
+            mp_context=mp.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(self.torch_threads,),
+        )
+
+    def warm_up(self) -> None:
+        """โหลด Reader ในทุก worker (แต่ละ process โหลดครั้งเดียว)"""
+        with self._lock:
+            executor = self._executor
+        try:
+            pids = {
+                future.result()
+                for future in [executor.submit(_warm_up_worker) for _ in range(self.num_workers * 2)]
+            }
+        except BrokenProcessPool:
+            self._restart(executor)
+            raise RuntimeError("An OCR worker process crashed during warm-up.")
+        logger.info(f"EasyOCR reader loaded in {len(pids)} worker processes.")
+
+    def readtext_batched(
+        self,
+        images: list[np.ndarray],
+        batch_size: int | None = None,
+        recognizer_batch_size: int | None = None,
+    ) -> tuple[list[str], list[dict]]:
+        """เหมือน batch_ocr.readtext_batched แต่ batch ต่างๆ รันพร้อมกันใน worker หลายตัว"""
+        batch_size = max(1, batch_size or OCR_BATCH_SIZE)
+        recognizer_batch_size = max(1, recognizer_batch_size or OCR_RECOGNIZER_BATCH_SIZE)
+
+        with self._lock:
+            executor = self._executor
+        batches = shape_buckets(images, batch_size)
+        try:
+            futures = [
+                executor.submit(_ocr_batch, [images[i] for i in indices], recognizer_batch_size)
+                for indices in batches
+            ]
+            results = [future.result() for future in futures]
+        except BrokenProcessPool:
+            # worker ตาย (เช่น หน่วยความจำไม่พอ) สร้าง pool ใหม่ไว้สำหรับงานถัดไป
+            self._restart(executor)
+            raise RuntimeError("An OCR worker process crashed.")
+
+        texts = [""] * len(images)
+        timings = []
+        for indices, (batch_texts, timing) in zip(batches, results):
+            for index, text in zip(indices, batch_texts):
+                texts[index] = text
+            timings.append(timing)
+            log_batch_timing(timing)
+
+        self.batches_run += len(batches)
+        self.images_processed += len(images)
+        return texts, timings
+
+    def read_templates(self, items: list[tuple[np.ndarray, str]]) -> list[tuple[dict | None, str, float]]:
+        """OCR เฉพาะบริเวณตาม template ของสลิปหลายใบพร้อมกันใน worker หลายตัว (ผลเรียงตามลำดับเดิม)"""
+        with self._lock:
+            executor = self._executor
+        try:
+            futures = [executor.submit(_read_template, gray, bank) for gray, bank in items]
+            results = [future.result() for future in futures]
+        except BrokenProcessPool:
+            self._restart(executor)
+            raise RuntimeError("An OCR worker process crashed.")
+        self.images_processed += len(items)
+        return results
+
+    def _restart(self, broken: ProcessPoolExecutor) -> None:
+        with self._lock:
+            if self._executor is not broken:
+                return
+            logger.warning("OCR process pool is broken, restarting workers.")
+            self.restarts += 1
+            self._executor = self._create_executor()
+        broken.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> dict:
+        return {
+            "mode": "process",
+            "workers": self.num_workers,
+            "torch_threads": self.torch_threads,
+            "batches_run": self.batches_run,
+            "images_processed": self.images_processed,
+            "worker_restarts": self.restarts,
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            self._executor.shutdown(wait=True, cancel_futures=True)
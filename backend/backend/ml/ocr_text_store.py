@@ -0,0 +1,163 @@
+# app/ml/ocr_text_store.py
+import os
+import queue
+import threading
+from datetime import datetime, timezone
+from typing import Iterator
+
+from dotenv import load_dotenv
+from loguru import logger
+from sqlalchemy import func
+from sqlalchemy.dialects.sqlite import insert
+from sqlmodel import Session, select
+
+from ..configs.database import engine
+from ..models import OcrCacheEntry, OcrText
+
+load_dotenv()
+
+_STOP = object()
+
+
+class OcrTextStore:
+    """
+    เก็บข้อความ OCR ดิบของสลิปลงตาราง SQLite (ocrtext) แทนการเขียนไฟล์ .txt ทีละไฟล์ใต้ ocr_results/case_*
+    - append() แค่ใส่ลงคิว ไม่ block งาน OCR
+    - writer thread รวมข้อความเป็นชุด (batch_size แถว หรือทุก flush_interval วินาที) แล้ว insert ครั้งเดียว
+    - ข้อความของภาพเดิม (case_id, image_hash, filename เดิม) ถูกเก็บครั้งเดียว
+    - iter_texts() อ่านทั้งคดีทีละชุดตามลำดับ id สำหรับแยกข้อมูลใหม่
+    """
+
+    def __init__(self, batch_size: int = 500, flush_interval: float = 1.0, enabled: bool = True):
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.enabled = enabled
+
+        self._queue: queue.Queue = queue.Queue()
+        self._thread: threading.Thread | None = None
+        self._lock = threading.Lock()
+
+        self.written = 0
+        self.batches = 0
+
+    def _ensure_writer(self) -> None:
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="ocr-text-writer", daemon=True)
+                self._thread.start()
+
+    def append(
+        self, case_id: str | None, image_hash: str, filename: str, text: str, qr_text: str | None = None
+    ) -> None:
+        """เพิ่มข้อความ OCR (และข้อความใน QR ถ้ามี) ของสลิปหนึ่งใบเข้าคิวเขียน (case_id None = uncategorized)"""
+        if not self.enabled or not text:
+            return
+        self._ensure_writer()
+        self._queue.put({
+            "case_id": str(case_id) if case_id else "uncategorized",
+            "image_hash": image_hash,
+            "filename": filename,
+            "text": text,
+            "qr_text": qr_text,
+            "created_at": datetime.now(timezone.utc),
+        })
+
+    def _run(self) -> None:
+        stop = False
+        while not stop:
+            try:
+                item = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+            batch = []
+            taken = 1
+            if item is _STOP:
+                stop = True
+            else:
+                batch.append(item)
+            # รวมรายการที่รออยู่แล้วทั้งหมด (ไม่เกิน batch_size) ลงชุดเดียว
+            while not stop and len(batch) < self.batch_size:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                taken += 1
+                if item is _STOP:
+                    stop = True
+                else:
+                    batch.append(item)
+            try:
+                if batch:
+                    self._write(batch)
+            except Exception as e:
+                logger.error(f"Could not save {len(batch)} OCR texts: {e}")
+            finally:
+                for _ in range(taken):
+                    self._queue.task_done()
+
+    def _write(self, batch: list[dict]) -> None:
+        statement = insert(OcrText).on_conflict_do_nothing(
+            index_elements=["case_id", "image_hash", "filename"]
+        )
+        with Session(engine) as session:
+            session.exec(statement, params=batch)
+            session.commit()
+        self.written += len(batch)
+        self.batches += 1
+
+    def flush(self) -> None:
+        """รอจนทุกข้อความที่อยู่ในคิวถูกเขียนลง database แล้ว"""
+        if self._thread is not None and self._thread.is_alive():
+            self._queue.join()
+
+    def close(self) -> None:
+        """เขียนข้อความที่ค้างอยู่ให้หมดแล้วหยุด writer thread"""
+        if self._thread is not None and self._thread.is_alive():
+            self._queue.put(_STOP)
+            self._thread.join()
+        self._thread = None
+
+    def iter_texts(self, case_id: str, batch_size: int = 1000) -> Iterator[dict]:
+        """
+        อ่านข้อความ OCR ทั้งคดีทีละชุด (keyset ตาม id จึงเร็วเท่ากันทุกชุด)
+        คืน dict: filename, text, qr_text, image_hash ตามลำดับที่บันทึก (ใช้กับ create_excel_from_ocr ได้ทันที)
+        ข้อความที่บันทึกก่อนมีคอลัมน์ qr_text ใช้ qr_text จาก ocr_cache ของภาพเดียวกันแทน
+        """
+        self.flush()
+        last_id = 0
+        while True:
+            with Session(engine) as session:
+                rows = session.exec(
+                    select(
+                        OcrText.id,
+                        OcrText.filename,
+                        OcrText.text,
+                        func.coalesce(OcrText.qr_text, OcrCacheEntry.qr_text),
+                        OcrText.image_hash,
+                    )
+                    .outerjoin(OcrCacheEntry, OcrCacheEntry.image_hash == OcrText.image_hash)
+                    .where(OcrText.case_id == case_id, OcrText.id > last_id)
+                    .order_by(OcrText.id)
+                    .limit(batch_size)
+                ).all()
+            if not rows:
+                return
+            for row_id, filename, text, qr_text, key in rows:
+                yield {"filename": filename, "text": text, "qr_text": qr_text, "image_hash": key}
+            last_id = rows[-1][0]
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "texts_written": self.written,
+            "write_batches": self.batches,
+            "pending": self._queue.qsize(),
+        }
+
+
+# OCR_TEXT_STORE=0 ปิดการเก็บข้อความ OCR ดิบ
+ocr_text_store = OcrTextStore(
+    batch_size=int(os.getenv("OCR_TEXT_BATCH_SIZE", "500")),
+    flush_interval=float(os.getenv("OCR_TEXT_FLUSH_SECONDS", "1")),
+    enabled=os.getenv("OCR_TEXT_STORE", "1") == "1",
+)
@@ -1,25 +1,162 @@
 # app/ml/prediction.py
+import hashlib
 import io
+import os
+import shutil
+import numpy as np
 from PIL import Image
 from ultralytics import YOLO
 import logging
 
+# engine ที่รองรับ: torch (ultralytics eager), onnx (ONNX Runtime), openvino
+SUPPORTED_ENGINES = ("torch", "onnx", "openvino")
+# engine INT8 (ONNX Runtime) อยู่ใน quantization.py: static ต้องมีภาพสำหรับ calibrate
+INT8_ENGINES = ("onnx-int8", "onnx-int8-dynamic")
+
+
+def model_fingerprint(model_path: str) -> str:
+    """
+    คำนวณ SHA-256 ของไฟล์โมเดล ใช้ระบุเวอร์ชันของโมเดล (เปลี่ยนไฟล์ = fingerprint ใหม่)
+    """
+    digest = hashlib.sha256()
+    with open(model_path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def result_fingerprint(
+    fingerprint: str, engine: str, calibration_dir: str | None = None
+) -> str:
+    """
+    fingerprint ของผลการจำแนก ใช้เป็น key ของ ClassificationCache
+    ไฟล์ .pt เดียวกันที่รันด้วย engine ต่างกันให้ผลต่างกันได้ จึงต้องแยกตาม engine ด้วย
+    INT8 แบบ static ขึ้นกับชุดภาพ calibrate ด้วย (calibrate ใหม่ = fingerprint ใหม่)
+    """
+    if engine == "onnx-int8":
+        from .quantization import calibration_digest
+
+        engine = f"{engine}-{calibration_digest(calibration_dir)}"
+    return f"{fingerprint}:{engine}"
+
+
+def export_model(
+    model_path: str,
+    engine: str,
+    export_dir: str | None = None,
+    fingerprint: str | None = None,
+) -> str:
+    """
+    แปลงไฟล์ .pt เป็น ONNX หรือ OpenVINO เพียงครั้งเดียว แล้วเก็บไฟล์ที่แปลงแล้วไว้ใช้ซ้ำ
+    ชื่อไฟล์ที่ cache จะมี fingerprint ของ .pt อยู่ด้วย เมื่อไฟล์ .pt เปลี่ยนจะ export ใหม่อัตโนมัติ
+    """
+    if engine not in ("onnx", "openvino"):
+        raise ValueError(f"Unsupported export engine '{engine}'.")
+
+    logger = logging.getLogger(__name__)
+    fingerprint = fingerprint or model_fingerprint(model_path)
+    export_dir = export_dir or os.path.dirname(os.path.abspath(model_path))
+    stem = os.path.splitext(os.path.basename(model_path))[0]
+    suffix = ".onnx" if engine == "onnx" else "_openvino_model"
+    cached_path = os.path.join(export_dir, f"{stem}-{fingerprint[:12]}{suffix}")
+
+    if os.path.exists(cached_path):
+        logger.info(f"Using cached {engine} export '{cached_path}'.")
+        return cached_path
+
+    logger.info(f"Exporting '{model_path}' to {engine}, this runs only once per model file.")
+    # dynamic=True เพื่อให้รับ batch ได้หลายขนาด (ใช้ร่วมกับ micro-batching)
+    exported_path = YOLO(model_path).export(format=engine, dynamic=True)
+    os.makedirs(export_dir, exist_ok=True)
+    shutil.move(str(exported_path), cached_path)
+    logger.info(f"Exported {engine} model cached at '{cached_path}'.")
+    return cached_path
+
 
 class YoloPredictionService:
-    def __init__(self, model_path: str):
+    def __init__(
+        self, model_path: str, engine: str = "torch", export_dir: str | None = None
+    ):
+        if engine not in SUPPORTED_ENGINES:
+            raise ValueError(
+                f"Unsupported YOLO engine '{engine}'. Choose one of {SUPPORTED_ENGINES}."
+            )
+        self.model_path = model_path
+        self.engine = engine
+        self.fingerprint = model_fingerprint(model_path)
+        self.result_fingerprint = result_fingerprint(self.fingerprint, engine)
+
         self.model = YOLO(model_path)
+        # ขนาดภาพที่ใช้ตอน train ต้องส่งให้ทุก engine เอง
+        # (โมเดลที่ export แล้วจะใช้ค่าเริ่มต้น 640 ทำให้ผลไม่ตรงกับ .pt)
+        self.imgsz = self.model.overrides.get("imgsz", 224)
+        if engine != "torch":
+            engine_path = export_model(
+                model_path, engine, export_dir=export_dir, fingerprint=self.fingerprint
+            )
+            # ชื่อคลาสถูกฝังอยู่ใน metadata ของไฟล์ที่ export จึงได้ผลเหมือนกับ .pt
+            self.model = YOLO(engine_path, task="classify")
+
         logger = logging.getLogger(__name__)
-        logger.info(f"YOLO model '{model_path}' loaded successfully.")
+        logger.info(f"YOLO model '{model_path}' loaded successfully ({engine} engine).")
+
+    def warm_up(self) -> None:
+        """รันภาพว่าง 1 ภาพเพื่อให้ runtime จัดเตรียม memory/kernel ก่อนรับ request จริง"""
+        self.predict_classify_arrays([np.zeros((self.imgsz, self.imgsz, 3), dtype=np.uint8)])
 
     def predict_classify(self, image_bytes: bytes) -> tuple[str, float]:
         """
         ทำนายผลแบบ Classification (คืนค่าเป็นชื่อคลาสและ confidence score)
         """
+        return self.predict_classify_batch([image_bytes])[0]
+
+    def predict_classify_batch(self, images: list[bytes]) -> list[tuple[str, float]]:
+        """
+        ทำนายผลแบบ Classification หลายภาพในการเรียกโมเดลครั้งเดียว
+        คืนค่าเป็น list ของ (ชื่อคลาส, confidence) เรียงตามลำดับภาพที่ส่งเข้ามา
+        """
+        if not images:
+            return []
+        pil_images = [Image.open(io.BytesIO(image_bytes)) for image_bytes in images]
+        return self._predict(pil_images)
+
+    def predict_classify_arrays(self, arrays: list) -> list[tuple[str, float]]:
+        """
+        เหมือน predict_classify_batch แต่รับภาพที่ decode แล้วเป็น numpy array (BGR, HxWx3)
+        """
+        if not arrays:
+            return []
+        return self._predict(arrays)
+
+    def _predict(self, sources: list) -> list[tuple[str, float]]:
         logger = logging.getLogger(__name__)
-        logger.info("Running YOLO classification prediction.")
-        image = Image.open(io.BytesIO(image_bytes))
-        results = self.model(image)
-        probs = results[0].probs
-        class_name = self.model.names[probs.top1]
-        confidence = probs.top1conf.item()
-        return class_name, confidence
+        logger.info(f"Running YOLO classification prediction on {len(sources)} image(s).")
+        results = self.model(sources, imgsz=self.imgsz, verbose=False)
+        predictions = []
+        for result in results:
+            probs = result.probs
+            class_name = self.model.names[probs.top1]
+            confidence = probs.top1conf.item()
+            predictions.append((class_name, confidence))
+        return predictions
+
+
+def create_prediction_service(
+    model_path: str,
+    engine: str = "torch",
+    export_dir: str | None = None,
+    calibration_dir: str | None = None,
+) -> YoloPredictionService:
+    """
+    สร้าง prediction service ตามชื่อ engine (รวมถึง engine INT8)
+    """
+    if engine in INT8_ENGINES:
+        from .quantization import QuantizedYoloPredictionService
+
+        return QuantizedYoloPredictionService(
+            model_path,
+            mode="dynamic" if engine == "onnx-int8-dynamic" else "static",
+            calibration_dir=calibration_dir,
+            export_dir=export_dir,
+        )
+    return YoloPredictionService(model_path, engine=engine, export_dir=export_dir)
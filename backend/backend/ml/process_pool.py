@@ -0,0 +1,341 @@
+# app/ml/process_pool.py
+import io
+import itertools
+import multiprocessing as mp
+import threading
+import time
+from concurrent.futures import Future
+from multiprocessing import shared_memory
+
+import numpy as np
+from loguru import logger
+from PIL import Image
+
+from .prediction import create_prediction_service, model_fingerprint, result_fingerprint
+
+# จำนวนครั้งที่ส่งงานเดิมซ้ำเมื่อ worker ตายระหว่างประมวลผล
+_MAX_ATTEMPTS = 2
+# รอก่อน restart worker ที่ตาย: 1, 2, 4, ... วินาที (สูงสุด 60 วินาที)
+_RESTART_BACKOFF_BASE = 1.0
+_RESTART_BACKOFF_MAX = 60.0
+
+
+def decode_image(image_bytes: bytes) -> np.ndarray:
+    """decode ภาพเป็น array BGR (HxWx3) แบบเดียวกับที่ ultralytics ทำกับภาพ PIL"""
+    with Image.open(io.BytesIO(image_bytes)) as image:
+        return np.asarray(image.convert("RGB"))[:, :, ::-1]
+
+
+def _worker_main(
+    worker_index: int,
+    model_path: str,
+    engine: str,
+    export_dir: str | None,
+    calibration_dir: str | None,
+    torch_threads: int,
+    task_queue,
+    result_queue,
+) -> None:
+    """loop ของ worker process: โหลดโมเดลครั้งเดียว แล้วรับงานจาก task_queue ไปเรื่อยๆ"""
+    import torch
+
+    torch.set_num_threads(torch_threads)
+    service = create_prediction_service(
+        model_path, engine=engine, export_dir=export_dir, calibration_dir=calibration_dir
+    )
+    # ส่งขนาดภาพของโมเดลกลับไปด้วย process หลักจะได้ไม่ต้องโหลดโมเดลเองเพื่ออ่านค่า
+    result_queue.put(("ready", worker_index, service.imgsz))
+
+    while True:
+        task = task_queue.get()
+        if task is None:
+            return
+        task_id, shm_name, layout = task
+        # track=False: shared memory เป็นของ process หลัก worker แค่แนบเข้าไปอ่าน
+        shm = shared_memory.SharedMemory(name=shm_name, track=False)
+        arrays = []
+        try:
+            arrays = [
+                np.ndarray(shape, dtype=np.uint8, buffer=shm.buf, offset=offset)
+                for offset, shape in layout
+            ]
+            result_queue.put((task_id, service.predict_classify_arrays(arrays), None))
+        except Exception as e:
+            result_queue.put((task_id, None, f"{type(e).__name__}: {e}"))
+        finally:
+            del arrays
+            shm.close()
+
+
+class _PendingTask:
+    def __init__(self, future: Future, shm: shared_memory.SharedMemory, layout: list):
+        self.future = future
+        self.shm = shm
+        self.layout = layout
+        self.worker_index = -1
+        self.attempts = 0
+
+
+class ProcessPoolPredictionService:
+    """
+    รัน YOLO ใน worker process หลายตัว (หลบ GIL) แต่ละ process โหลดโมเดลครั้งเดียว
+    - ภาพที่ decode แล้วถูกส่งผ่าน multiprocessing.shared_memory แทนการ pickle bytes
+    - worker ที่ตายจะถูก restart อัตโนมัติ (เว้นระยะแบบ exponential backoff) และงานที่ค้างอยู่จะถูกส่งซ้ำ
+    - worker ที่ตายติดกันเกิน max_restarts ครั้งจะถูกปลดออก ถ้าปลดหมดทุกตัว pool จะตอบ error แทนการ restart วนไปเรื่อยๆ
+    """
+
+    def __init__(
+        self,
+        model_path: str,
+        engine: str = "torch",
+        export_dir: str | None = None,
+        num_workers: int = 2,
+        torch_threads: int = 1,
+        calibration_dir: str | None = None,
+        max_restarts: int = 5,
+    ):
+        self.model_path = model_path
+        self.engine = engine
+        self.export_dir = export_dir
+        self.calibration_dir = calibration_dir
+        self.num_workers = max(1, num_workers)
+        self.torch_threads = max(1, torch_threads)
+        self.max_restarts = max(0, max_restarts)
+        self.fingerprint = model_fingerprint(model_path)
+        self.result_fingerprint = result_fingerprint(self.fingerprint, engine, calibration_dir)
+
+        # spawn แทน fork เพราะ fork หลังโหลด torch/threads แล้วไม่ปลอดภัย
+        self._context = mp.get_context("spawn")
+        self._result_queue = self._context.Queue()
+        self._task_queues = [self._context.Queue() for _ in range(self.num_workers)]
+        self._processes: list = [None] * self.num_workers
+        self._pending: dict[int, _PendingTask] = {}
+        self._task_ids = itertools.count()
+        self._lock = threading.Lock()
+        self._closed = threading.Event()
+        # จำนวนครั้งที่ restart ติดกันโดยยังไม่มีงานสำเร็จ และเวลาที่จะ restart ได้ (ต่อ worker)
+        self._restart_counts = [0] * self.num_workers
+        self._restart_at: list[float | None] = [None] * self.num_workers
+        self._retired: set[int] = set()
+        self._failure: str | None = None
+        # ขนาดภาพของโมเดล ได้จากข้อความ "ready" ของ worker ตัวแรก
+        self.imgsz: int | None = None
+        self._ready = threading.Event()
+
+        self.restarts = 0
+        self.batches_run = 0
+
+        for index in range(self.num_workers):
+            self._start_worker(index)
+
+        self._collector = threading.Thread(
+            target=self._collect_results, name="yolo-pool-collector", daemon=True
+        )
+        self._collector.start()
+        self._supervisor = threading.Thread(
+            target=self._supervise, name="yolo-pool-supervisor", daemon=True
+        )
+        self._supervisor.start()
+
+    def _start_worker(self, index: int) -> None:
+        process = self._context.Process(
+            target=_worker_main,
+            args=(
+                index,
+                self.model_path,
+                self.engine,
+                self.export_dir,
+                self.calibration_dir,
+                self.torch_threads,
+                self._task_queues[index],
+                self._result_queue,
+            ),
+            name=f"yolo-worker-{index}",
+            daemon=True,
+        )
+        process.start()
+        self._processes[index] = process
+
+    def submit_batch(self, images: list[bytes]) -> Future:
+        """decode ภาพ, คัดลอกลง shared memory ก้อนเดียว แล้วส่งให้ worker ที่งานน้อยที่สุด"""
+        return self._submit_arrays([decode_image(image_bytes) for image_bytes in images])
+
+    def warm_up(self) -> None:
+        """ส่งภาพว่างขนาด imgsz ของโมเดลให้ worker ทุกตัว เพื่อให้ทุก process พร้อมก่อนรับ request จริง"""
+        while not self._ready.wait(1.0):
+            if self._closed.is_set() or self._failure:
+                raise RuntimeError(self._failure or "ProcessPoolPredictionService is closed.")
+        blank = np.zeros((self.imgsz, self.imgsz, 3), dtype=np.uint8)
+        futures = [
+            self._submit_arrays([blank], worker_index=index) for index in range(self.num_workers)
+        ]
+        for future in futures:
+            future.result()
+
+    def _submit_arrays(self, arrays: list[np.ndarray], worker_index: int | None = None) -> Future:
+        future: Future = Future()
+        if not arrays:
+            future.set_result([])
+            return future
+
+        layout = []
+        offset = 0
+        for array in arrays:
+            layout.append((offset, array.shape))
+            offset += array.nbytes
+        shm = shared_memory.SharedMemory(create=True, size=offset)
+        for array, (start, shape) in zip(arrays, layout):
+            np.ndarray(shape, dtype=np.uint8, buffer=shm.buf, offset=start)[:] = array
+
+        task = _PendingTask(future, shm, layout)
+        with self._lock:
+            if self._closed.is_set() or self._failure:
+                shm.close()
+                shm.unlink()
+                raise RuntimeError(self._failure or "ProcessPoolPredictionService is closed.")
+            task_id = next(self._task_ids)
+            self._pending[task_id] = task
+            self._dispatch(task_id, task, worker_index)
+        return future
+
+    def _dispatch(self, task_id: int, task: _PendingTask, worker_index: int | None = None) -> None:
+        # ต้องถือ self._lock อยู่แล้วเมื่อเรียกฟังก์ชันนี้
+        if worker_index is None or worker_index in self._retired:
+            load = [0] * self.num_workers
+            for pending in self._pending.values():
+                if pending.worker_index >= 0:
+                    load[pending.worker_index] += 1
+            # เลือก worker ที่ยังทำงานอยู่ก่อน worker ที่รอ restart
+            worker_index = min(
+                (index for index in range(self.num_workers) if index not in self._retired),
+                key=lambda index: (not self._processes[index].is_alive(), load[index]),
+            )
+        task.worker_index = worker_index
+        task.attempts += 1
+        self._task_queues[task.worker_index].put((task_id, task.shm.name, task.layout))
+
+    def predict_classify(self, image_bytes: bytes) -> tuple[str, float]:
+        return self.predict_classify_batch([image_bytes])[0]
+
+    def predict_classify_batch(self, images: list[bytes]) -> list[tuple[str, float]]:
+        return self.submit_batch(images).result()
+
+    def _finish(self, task_id: int, predictions, error: str | None) -> None:
+        with self._lock:
+            task = self._pending.pop(task_id, None)
+        if task is None:
+            return
+        task.shm.close()
+        task.shm.unlink()
+        self.batches_run += 1
+        if not error and task.worker_index >= 0:
+            # worker ทำงานสำเร็จแล้ว เริ่มนับ backoff ใหม่
+            self._restart_counts[task.worker_index] = 0
+        if error:
+            task.future.set_exception(RuntimeError(error))
+        else:
+            task.future.set_result(predictions)
+
+    def _collect_results(self) -> None:
+        while not self._closed.is_set():
+            try:
+                task_id, predictions, error = self._result_queue.get(timeout=0.5)
+            except Exception:
+                continue
+            if task_id == "ready":
+                worker_index, imgsz = predictions, error
+                logger.info(f"YOLO worker {worker_index} ready for '{self.model_path}'.")
+                self.imgsz = imgsz
+                self._ready.set()
+                continue
+            self._finish(task_id, predictions, error)
+
+    def _supervise(self) -> None:
+        while not self._closed.wait(1.0):
+            for index, process in enumerate(self._processes):
+                if index in self._retired or process.is_alive() or self._closed.is_set():
+                    continue
+                count = self._restart_counts[index]
+                if self._restart_at[index] is None:
+                    if count >= self.max_restarts:
+                        self._retire_worker(index, process.exitcode)
+                        continue
+                    delay = min(_RESTART_BACKOFF_BASE * 2**count, _RESTART_BACKOFF_MAX)
+                    logger.warning(
+                        f"YOLO worker {index} exited with code {process.exitcode}, "
+                        f"restarting in {delay:.0f}s (attempt {count + 1}/{self.max_restarts})."
+                    )
+                    self._restart_at[index] = time.monotonic() + delay
+                if time.monotonic() < self._restart_at[index]:
+                    continue
+                self._restart_at[index] = None
+                self._restart_counts[index] += 1
+                self.restarts += 1
+                with self._lock:
+                    # สร้าง queue ใหม่ เพราะงานที่ค้างใน queue เก่าจะถูกส่งซ้ำด้านล่าง
+                    self._task_queues[index] = self._context.Queue()
+                    self._start_worker(index)
+                    orphaned = [
+                        (task_id, task)
+                        for task_id, task in self._pending.items()
+                        if task.worker_index == index
+                    ]
+                    for task_id, task in orphaned:
+                        task.worker_index = -1
+                        if task.attempts < _MAX_ATTEMPTS:
+                            self._dispatch(task_id, task)
+                for task_id, task in orphaned:
+                    if task.worker_index == -1:
+                        self._finish(task_id, None, f"YOLO worker {index} crashed.")
+
+    def _retire_worker(self, index: int, exitcode) -> None:
+        """ปลด worker ที่ตายซ้ำเกินจำนวนที่กำหนด งานของ worker นี้ย้ายไปตัวอื่น หรือ error ถ้าไม่เหลือ worker"""
+        logger.error(
+            f"YOLO worker {index} exited with code {exitcode} after {self.max_restarts} "
+            f"restart(s) without completing a batch, not restarting it again."
+        )
+        with self._lock:
+            self._retired.add(index)
+            if len(self._retired) == self.num_workers:
+                self._failure = (
+                    f"All YOLO workers for '{self.model_path}' keep crashing "
+                    f"(restart limit {self.max_restarts} reached), see the server log."
+                )
+            orphaned = [
+                (task_id, task)
+                for task_id, task in self._pending.items()
+                if self._failure or task.worker_index == index
+            ]
+            for task_id, task in orphaned:
+                task.worker_index = -1
+                if not self._failure and task.attempts < _MAX_ATTEMPTS:
+                    self._dispatch(task_id, task)
+        if self._failure:
+            logger.error(self._failure)
+        for task_id, task in orphaned:
+            if task.worker_index == -1:
+                self._finish(task_id, None, self._failure or f"YOLO worker {index} crashed.")
+
+    def stats(self) -> dict:
+        return {
+            "mode": "process",
+            "workers": self.num_workers,
+            "workers_alive": sum(p.is_alive() for p in self._processes),
+            "pending_batches": len(self._pending),
+            "pool_batches_run": self.batches_run,
+            "worker_restarts": self.restarts,
+            "workers_retired": len(self._retired),
+        }
+
+    def close(self) -> None:
+        self._closed.set()
+        for queue in self._task_queues:
+            queue.put(None)
+        for process in self._processes:
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+        with self._lock:
+            pending = list(self._pending)
+        for task_id in pending:
+            self._finish(task_id, None, "ProcessPoolPredictionService closed.")
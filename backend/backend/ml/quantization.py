@@ -0,0 +1,190 @@
+# app/ml/quantization.py
+import ast
+import hashlib
+import logging
+import os
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+from ultralytics import YOLO
+
+from .prediction import (
+    YoloPredictionService,
+    export_model,
+    model_fingerprint,
+    result_fingerprint,
+)
+
+INT8_MODES = ("static", "dynamic")
+IMAGE_EXTENSIONS = {".png", ".jpg", ".jpeg", ".gif", ".bmp"}
+
+
+def preprocess_classify(image: Image.Image, imgsz: int) -> np.ndarray:
+    """
+    เตรียมภาพแบบเดียวกับ classify_transforms ของ ultralytics
+    (ย่อด้านสั้นเป็น imgsz, crop กลางภาพ, สเกล 0-1, CHW) คืนค่า shape (1, 3, imgsz, imgsz)
+    """
+    image = image.convert("RGB")
+    width, height = image.size
+    scale = imgsz / min(width, height)
+    image = image.resize(
+        (max(imgsz, round(width * scale)), max(imgsz, round(height * scale))),
+        Image.BILINEAR,
+    )
+    width, height = image.size
+    left, top = (width - imgsz) // 2, (height - imgsz) // 2
+    image = image.crop((left, top, left + imgsz, top + imgsz))
+    array = np.asarray(image, dtype=np.float32) / 255.0
+    return array.transpose(2, 0, 1)[None]
+
+
+def _calibration_images(calibration_dir: str | None) -> list[Path]:
+    if not calibration_dir:
+        raise ValueError("Static INT8 quantization requires a calibration image folder.")
+    images = sorted(
+        p for p in Path(calibration_dir).rglob("*") if p.suffix.lower() in IMAGE_EXTENSIONS
+    )
+    if not images:
+        raise ValueError(f"No calibration images found in '{calibration_dir}'.")
+    return images
+
+
+def _calibration_digest(images: list[Path]) -> str:
+    # ใช้ชื่อและขนาดไฟล์ เมื่อชุดภาพ calibrate เปลี่ยนจะได้ไฟล์ int8 ใหม่
+    digest = hashlib.sha256()
+    for path in images:
+        digest.update(f"{path.name}:{path.stat().st_size};".encode())
+    return digest.hexdigest()[:8]
+
+
+def calibration_digest(calibration_dir: str | None) -> str:
+    """รหัสของชุดภาพ calibrate ใช้ตั้งชื่อไฟล์ INT8 static และแยก cache ผลการจำแนก"""
+    return _calibration_digest(_calibration_images(calibration_dir))
+
+
+def onnx_imgsz(onnx_path: str) -> int:
+    """อ่านขนาดภาพที่ใช้ตอน train จาก metadata ที่ ultralytics ฝังไว้ในไฟล์ ONNX"""
+    from onnxruntime import InferenceSession
+
+    metadata = InferenceSession(
+        onnx_path, providers=["CPUExecutionProvider"]
+    ).get_modelmeta().custom_metadata_map
+    imgsz = ast.literal_eval(metadata.get("imgsz", "224"))
+    return imgsz[0] if isinstance(imgsz, (list, tuple)) else int(imgsz)
+
+
+class ImageFolderCalibrationReader:
+    """ส่งภาพจากโฟลเดอร์ในเครื่องให้ onnxruntime ใช้หาช่วงค่า activation สำหรับ static INT8"""
+
+    def __init__(self, images: list[Path], input_name: str, imgsz: int):
+        self._inputs = (
+            {input_name: preprocess_classify(Image.open(path), imgsz)} for path in images
+        )
+
+    def get_next(self):
+        return next(self._inputs, None)
+
+
+def quantize_model(
+    model_path: str,
+    imgsz: int,
+    mode: str = "static",
+    calibration_dir: str | None = None,
+    export_dir: str | None = None,
+    fingerprint: str | None = None,
+) -> str:
+    """
+    สร้างโมเดล INT8 จาก .pt (ผ่าน ONNX ที่ export แล้ว) และ cache ไฟล์ไว้ใช้ซ้ำ
+    - static: quantize ทั้ง weight และ activation ต้องมีโฟลเดอร์ภาพสำหรับ calibrate
+    - dynamic: quantize เฉพาะ weight ไม่ต้อง calibrate
+    """
+    from onnxruntime import InferenceSession
+    from onnxruntime.quantization import (
+        CalibrationDataReader,
+        QuantFormat,
+        QuantType,
+        quantize_dynamic,
+        quantize_static,
+    )
+
+    if mode not in INT8_MODES:
+        raise ValueError(f"Unsupported INT8 mode '{mode}'. Choose one of {INT8_MODES}.")
+
+    logger = logging.getLogger(__name__)
+    fp32_path = export_model(model_path, "onnx", export_dir=export_dir, fingerprint=fingerprint)
+    base = os.path.splitext(fp32_path)[0]
+
+    if mode == "dynamic":
+        int8_path = f"{base}-int8-dynamic.onnx"
+        if not os.path.exists(int8_path):
+            logger.info(f"Quantizing '{fp32_path}' to dynamic INT8.")
+            quantize_dynamic(fp32_path, int8_path, weight_type=QuantType.QInt8)
+        return int8_path
+
+    images = _calibration_images(calibration_dir)
+    int8_path = f"{base}-int8-static-{_calibration_digest(images)}.onnx"
+    if not os.path.exists(int8_path):
+        logger.info(
+            f"Quantizing '{fp32_path}' to static INT8 using {len(images)} calibration images."
+        )
+        input_name = InferenceSession(
+            fp32_path, providers=["CPUExecutionProvider"]
+        ).get_inputs()[0].name
+
+        class _Reader(ImageFolderCalibrationReader, CalibrationDataReader):
+            pass
+
+        quantize_static(
+            fp32_path,
+            int8_path,
+            _Reader(images, input_name, imgsz),
+            quant_format=QuantFormat.QDQ,
+            activation_type=QuantType.QUInt8,
+            weight_type=QuantType.QInt8,
+            per_channel=True,
+        )
+    return int8_path
+
+
+class QuantizedYoloPredictionService(YoloPredictionService):
+    """
+    YoloPredictionService ที่รันโมเดล INT8 ผ่าน ONNX Runtime
+    แลกความแม่นยำเล็กน้อยกับ throughput บน CPU ที่สูงขึ้น
+    ไม่โหลดโมเดล torch: imgsz และชื่อคลาสอ่านจาก metadata ของไฟล์ ONNX
+    (โหลด .pt เฉพาะตอน export ครั้งแรกใน export_model)
+    """
+
+    def __init__(
+        self,
+        model_path: str,
+        mode: str = "static",
+        calibration_dir: str | None = None,
+        export_dir: str | None = None,
+    ):
+        self.model_path = model_path
+        self.engine = f"onnx-int8-{mode}"
+        self.fingerprint = model_fingerprint(model_path)
+        # ใช้ชื่อเดียวกับ YOLO_ENGINE เพื่อให้ cache ตรงกับของ ProcessPoolPredictionService
+        self.result_fingerprint = result_fingerprint(
+            self.fingerprint,
+            "onnx-int8-dynamic" if mode == "dynamic" else "onnx-int8",
+            calibration_dir,
+        )
+
+        fp32_path = export_model(
+            model_path, "onnx", export_dir=export_dir, fingerprint=self.fingerprint
+        )
+        self.imgsz = onnx_imgsz(fp32_path)
+        int8_path = quantize_model(
+            model_path,
+            self.imgsz,
+            mode=mode,
+            calibration_dir=calibration_dir,
+            export_dir=export_dir,
+            fingerprint=self.fingerprint,
+        )
+        self.model = YOLO(int8_path, task="classify")
+
+        logger = logging.getLogger(__name__)
+        logger.info(f"YOLO model '{model_path}' loaded successfully ({self.engine} engine).")
@@ -0,0 +1,189 @@
+# app/ml/result_cache.py
+import hashlib
+import threading
+from collections import OrderedDict
+
+from loguru import logger
+from sqlalchemy.dialects.sqlite import insert
+from sqlmodel import Session, delete, select
+
+from ..configs.database import engine
+from ..models import ClassificationCacheEntry
+
+# SQLite จำกัดจำนวนตัวแปรต่อ query จึงแบ่ง lookup เป็นชุด
+_SQLITE_CHUNK = 500
+
+
+def image_hash(image_bytes: bytes) -> str:
+    return hashlib.sha256(image_bytes).hexdigest()
+
+
+class ClassificationCache:
+    """
+    Cache ผลการจำแนกภาพ 2 ชั้น
+    - ชั้นแรก: LRU ในหน่วยความจำ (จำกัดจำนวนรายการ)
+    - ชั้นที่สอง: ตาราง SQLite (อยู่รอดข้ามการ restart)
+    key คือ SHA-256 ของภาพ + fingerprint ของโมเดลและ engine เมื่อไฟล์โมเดลหรือ engine เปลี่ยน รายการเก่าจะถูกลบทิ้ง
+    """
+
+    def __init__(
+        self,
+        model_key: str,
+        model_fingerprint: str,
+        max_entries: int = 10_000,
+        persistent: bool = True,
+    ):
+        self.model_key = model_key
+        self.model_fingerprint = model_fingerprint
+        self.max_entries = max_entries
+        self.persistent = persistent
+
+        self._memory: OrderedDict[str, tuple[str, float]] = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        if self.persistent:
+            self._invalidate_stale_entries()
+
+    def _invalidate_stale_entries(self) -> None:
+        with Session(engine) as session:
+            result = session.exec(
+                delete(ClassificationCacheEntry).where(
+                    ClassificationCacheEntry.model_key == self.model_key,
+                    ClassificationCacheEntry.model_fingerprint != self.model_fingerprint,
+                )
+            )
+            session.commit()
+        if result.rowcount:
+            logger.info(
+                f"Removed {result.rowcount} stale cache entries for '{self.model_key}' (model file or engine changed)."
+            )
+
+    def _remember(self, key: str, prediction: tuple[str, float]) -> None:
+        # ต้องถือ self._lock อยู่แล้วเมื่อเรียกฟังก์ชันนี้
+        self._memory[key] = prediction
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def get_many(self, keys: list[str]) -> dict[str, tuple[str, float]]:
+        # ภาพซ้ำใน request เดียวกันนับเป็น lookup เดียว
+        keys = list(dict.fromkeys(keys))
+        found: dict[str, tuple[str, float]] = {}
+        with self._lock:
+            for key in keys:
+                if key in self._memory:
+                    self._memory.move_to_end(key)
+                    found[key] = self._memory[key]
+            self.memory_hits += len(found)
+
+        missing = [key for key in keys if key not in found]
+        if self.persistent and missing:
+            disk_found = {}
+            with Session(engine) as session:
+                for i in range(0, len(missing), _SQLITE_CHUNK):
+                    rows = session.exec(
+                        select(ClassificationCacheEntry).where(
+                            ClassificationCacheEntry.model_key == self.model_key,
+                            ClassificationCacheEntry.model_fingerprint
+                            == self.model_fingerprint,
+                            ClassificationCacheEntry.image_hash.in_(
+                                missing[i : i + _SQLITE_CHUNK]
+                            ),
+                        )
+                    ).all()
+                    for row in rows:
+                        disk_found[row.image_hash] = (row.class_name, row.confidence)
+            with self._lock:
+                for key, prediction in disk_found.items():
+                    self._remember(key, prediction)
+                self.disk_hits += len(disk_found)
+            found.update(disk_found)
+
+        with self._lock:
+            self.misses += len([key for key in keys if key not in found])
+        return found
+
+    def put_many(self, predictions: dict[str, tuple[str, float]]) -> None:
+        if not predictions:
+            return
+        with self._lock:
+            for key, prediction in predictions.items():
+                self._remember(key, prediction)
+
+        if self.persistent:
+            rows = [
+                {
+                    "model_key": self.model_key,
+                    "image_hash": key,
+                    "model_fingerprint": self.model_fingerprint,
+                    "class_name": class_name,
+                    "confidence": confidence,
+                }
+                for key, (class_name, confidence) in predictions.items()
+            ]
+            statement = insert(ClassificationCacheEntry)
+            statement = statement.on_conflict_do_update(
+                index_elements=["model_key", "image_hash"],
+                set_={
+                    "model_fingerprint": statement.excluded.model_fingerprint,
+                    "class_name": statement.excluded.class_name,
+                    "confidence": statement.excluded.confidence,
+                },
+            )
+            with Session(engine) as session:
+                session.exec(statement, params=rows)
+                session.commit()
+
+    def stats(self) -> dict:
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        return {
+            "cache_memory_hits": self.memory_hits,
+            "cache_disk_hits": self.disk_hits,
+            "cache_misses": self.misses,
+            "cache_hit_rate": (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0,
+            "cache_memory_entries": len(self._memory),
+        }
+
+
+class CachedPredictionService:
+    """
+    ครอบ prediction service ด้วย ClassificationCache
+    ภาพที่เคยจำแนกแล้ว (ภาพเดียวกัน โมเดลเดียวกัน) จะไม่ถูกส่งเข้าโมเดลอีก
+    """
+
+    def __init__(self, service, cache: ClassificationCache):
+        self.service = service
+        self.cache = cache
+
+    def predict_classify(self, image_bytes: bytes) -> tuple[str, float]:
+        return self.predict_classify_batch([image_bytes])[0]
+
+    def predict_classify_batch(self, images: list[bytes]) -> list[tuple[str, float]]:
+        keys = [image_hash(image_bytes) for image_bytes in images]
+        cached = self.cache.get_many(keys)
+
+        # ส่งเฉพาะภาพที่ยังไม่มีใน cache (ภาพซ้ำใน request เดียวกันส่งครั้งเดียว)
+        pending = {
+            key: image_bytes
+            for key, image_bytes in zip(keys, images)
+            if key not in cached
+        }
+        if pending:
+            predictions = self.service.predict_classify_batch(list(pending.values()))
+            computed = dict(zip(pending.keys(), predictions))
+            self.cache.put_many(computed)
+            cached.update(computed)
+
+        return [cached[key] for key in keys]
+
+    def warm_up(self) -> None:
+        if hasattr(self.service, "warm_up"):
+            self.service.warm_up()
+
+    def stats(self) -> dict:
+        inner = self.service.stats() if hasattr(self.service, "stats") else {}
+        return {**inner, **self.cache.stats()}
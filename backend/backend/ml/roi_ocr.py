@@ -0,0 +1,161 @@
+# app/ml/roi_ocr.py
+import functools
+import json
+import os
+import re
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+from loguru import logger
+
+# ไฟล์ template ของแต่ละธนาคาร (<bank>.json) ตำแหน่งเป็นสัดส่วนของความกว้าง/สูงของภาพ
+# template ที่ยังไม่ได้ตรวจตำแหน่งกับสลิปจริง ("verified": false) จะไม่ถูกใช้ เว้นแต่ตั้ง OCR_TEMPLATE_UNVERIFIED=1
+DEFAULT_TEMPLATE_DIR = Path(__file__).with_name("slip_templates")
+
+
+@functools.lru_cache(maxsize=None)
+def load_templates(template_dir: str | None = None) -> dict[str, dict]:
+    """อ่าน template ทุกไฟล์ในโฟลเดอร์ คืนค่า dict ของ bank -> template (pattern ถูก compile ไว้แล้ว)"""
+    directory = Path(template_dir or os.getenv("OCR_TEMPLATE_DIR") or DEFAULT_TEMPLATE_DIR)
+    allow_unverified = os.getenv("OCR_TEMPLATE_UNVERIFIED", "0") == "1"
+    templates = {}
+    unverified = []
+    for path in sorted(directory.glob("*.json")):
+        with open(path, encoding="utf-8") as f:
+            template = json.load(f)
+        if not template.get("verified", False):
+            unverified.append(template["bank"])
+            if not allow_unverified:
+                continue
+        for field in template["fields"].values():
+            if "pattern" in field:
+                field["regex"] = re.compile(field["pattern"], re.IGNORECASE)
+        templates[template["bank"]] = template
+    if unverified:
+        action = "using them anyway" if allow_unverified else "skipped, set OCR_TEMPLATE_UNVERIFIED=1 to use them"
+        logger.warning(f"Slip templates not checked against real slips ({action}): {', '.join(unverified)}")
+    logger.info(f"Loaded {len(templates)} slip templates from '{directory}'.")
+    return templates
+
+
+def template_boxes(template: dict, shape: tuple[int, ...]) -> list[tuple[str, list[int]]]:
+    """แปลงตำแหน่งแบบสัดส่วนใน template เป็นกล่อง [x_min, x_max, y_min, y_max] (pixel) ตามรูปแบบของ EasyOCR"""
+    height, width = shape[:2]
+    boxes = []
+    for name, field in template["fields"].items():
+        x0, y0, x1, y1 = field["box"]
+        boxes.append(
+            (name, [round(x0 * width), round(x1 * width), round(y0 * height), round(y1 * height)])
+        )
+    return boxes
+
+
+def recognize_boxes(reader, gray: np.ndarray, boxes: list[list[int]]) -> list[str]:
+    """
+    อ่านข้อความเฉพาะในกล่องที่กำหนดด้วย recognizer อย่างเดียว (ไม่รัน text detector)
+    คืนค่าข้อความตามลำดับกล่องที่ส่งเข้ามา
+    """
+    results = reader.recognize(gray, horizontal_list=boxes, free_list=[], detail=1)
+    # EasyOCR อาจเรียงผลตามแนวตั้ง จึงจับคู่กลับด้วยมุมซ้ายบนของกล่อง
+    by_corner = {tuple(int(v) for v in box[0]): text for box, text, _ in results}
+    return [by_corner.get((max(0, box[0]), max(0, box[2])), "") for box in boxes]
+
+
+def fields_from_texts(template: dict, texts: dict[str, str]) -> dict | None:
+    """
+    ดึงค่าแต่ละ field จากข้อความที่อ่านได้
+    คืนค่า None (ให้ OCR ทั้งภาพแทน) ถ้า field ใดไม่ตรง pattern หรือ field ที่จำเป็นอ่านไม่ได้
+    กล่องที่วางผิดตำแหน่งจึงไม่ได้ค่าที่ดูถูกต้องแต่ผิดช่อง
+    """
+    fields = dict(template.get("constants", {}))
+    for name, field in template["fields"].items():
+        text = texts.get(name, "").strip()
+        if "regex" in field:
+            match = field["regex"].search(text)
+            if not match:
+                return None
+            value = match.group(1) if match.groups() else match.group()
+        else:
+            value = text
+        if not value:
+            if field.get("required"):
+                return None
+            continue
+        fields[name] = value.strip()
+    return fields
+
+
+def read_slip_with_template(reader, gray: np.ndarray, template: dict) -> tuple[dict | None, str, float]:
+    """
+    OCR เฉพาะบริเวณใน template ของธนาคาร
+    คืนค่า (field ที่อ่านได้ หรือ None ถ้าต้อง OCR ทั้งภาพแทน, ข้อความดิบ, เวลาที่ใช้)
+    """
+    start = time.perf_counter()
+    boxes = template_boxes(template, gray.shape)
+    texts = recognize_boxes(reader, gray, [box for _, box in boxes])
+    texts_by_field = {name: text for (name, _), text in zip(boxes, texts)}
+    fields = fields_from_texts(template, texts_by_field)
+    raw_text = " ".join(text for text in texts if text)
+    return fields, raw_text, time.perf_counter() - start
+
+
+class TemplateLatencyStats:
+    """เก็บเวลา OCR ต่อสลิปแยกตามธนาคาร เทียบระหว่าง OCR ทั้งภาพกับ OCR เฉพาะบริเวณ (template)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._banks: dict[str, dict] = {}
+
+    def _bank(self, bank: str) -> dict:
+        return self._banks.setdefault(
+            bank,
+            {
+                "full_slips": 0,
+                "full_seconds": 0.0,
+                "template_slips": 0,
+                "template_seconds": 0.0,
+                "template_fallbacks": 0,
+                "fallback_seconds": 0.0,
+            },
+        )
+
+    def record_full(self, bank: str, seconds: float) -> None:
+        with self._lock:
+            entry = self._bank(bank)
+            entry["full_slips"] += 1
+            entry["full_seconds"] += seconds
+
+    def record_template(self, bank: str, seconds: float, fallback: bool = False) -> None:
+        with self._lock:
+            entry = self._bank(bank)
+            if fallback:
+                # เวลาที่เสียไปกับ template ที่อ่านไม่สำเร็จ (ต้อง OCR ทั้งภาพซ้ำ)
+                entry["template_fallbacks"] += 1
+                entry["fallback_seconds"] += seconds
+                return
+            entry["template_slips"] += 1
+            entry["template_seconds"] += seconds
+
+    def stats(self) -> dict:
+        with self._lock:
+            result = {}
+            for bank, entry in self._banks.items():
+                full_avg = entry["full_seconds"] / entry["full_slips"] if entry["full_slips"] else None
+                template_avg = (
+                    entry["template_seconds"] / entry["template_slips"] if entry["template_slips"] else None
+                )
+                saved = None
+                if full_avg is not None and template_avg is not None:
+                    saved = (full_avg - template_avg) * entry["template_slips"] - entry["fallback_seconds"]
+                result[bank] = {
+                    **entry,
+                    "full_avg_seconds": full_avg,
+                    "template_avg_seconds": template_avg,
+                    "seconds_saved": saved,
+                }
+            return result
+
+
+template_latency = TemplateLatencyStats()
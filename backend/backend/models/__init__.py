@@ -1,2 +1,7 @@
 # /models/__init__.py
-from .hero import Hero
\ No newline at end of file
+from .hero import Hero
+from .classification_cache import ClassificationCacheEntry
+from .ocr_cache import OcrCacheEntry
+from .ocr_job import OcrJob, OcrJobResult
+from .ocr_text import OcrText
+from .stored_object import StoredObject
\ No newline at end of file
@@ -0,0 +1,13 @@
+# /models/classification_cache.py
+
+from sqlmodel import Field, SQLModel
+
+
+class ClassificationCacheEntry(SQLModel, table=True):
+    """ผลการจำแนกภาพที่เคยคำนวณแล้ว อ้างอิงด้วย SHA-256 ของภาพและ fingerprint ของโมเดล"""
+
+    model_key: str = Field(primary_key=True)
+    image_hash: str = Field(primary_key=True)
+    model_fingerprint: str = Field(index=True)
+    class_name: str
+    confidence: float
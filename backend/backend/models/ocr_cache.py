@@ -0,0 +1,18 @@
+# /models/ocr_cache.py
+
+from sqlmodel import Field, SQLModel
+
+
+class OcrCacheEntry(SQLModel, table=True):
+    """ผล QR / OCR / การแยกข้อมูลของภาพสลิปที่เคยประมวลผลแล้ว อ้างอิงด้วย SHA-256 ของภาพ"""
+
+    image_hash: str = Field(primary_key=True)
+    # no_qr = ไม่มี QR (ข้าม), qr_only = ใช้ข้อมูลจาก QR อย่างเดียว, template = OCR เฉพาะบริเวณ, ocr = OCR ทั้งภาพ
+    source: str
+    qr_text: str | None = None
+    ocr_text: str | None = None
+    # row ที่แยกได้ (JSON ไม่รวมชื่อไฟล์) None = OCR ไม่ได้ข้อความ
+    row_json: str | None = None
+    parser_version: str = Field(index=True)
+    # รุ่นของ detector ที่หา QR (None = รายการที่บันทึกก่อนมีการเก็บรุ่น)
+    detector_version: str | None = None
@@ -0,0 +1,38 @@
+# /models/ocr_job.py
+
+from datetime import datetime
+
+from sqlmodel import Field, SQLModel
+
+
+class OcrJob(SQLModel, table=True):
+    """งาน OCR แบบ background (สถานะถูกเก็บใน SQLite งานที่ยังไม่เสร็จจะถูกรันต่อเมื่อ restart)"""
+
+    job_id: str = Field(primary_key=True)
+    case_id: str = Field(index=True)
+    evidence_id: int
+    firebase_url: str
+    export_format: str = "xlsx"
+    # queued | running | completed | failed
+    status: str = Field(default="queued", index=True)
+    # queued | downloading | ocr | exporting | uploading | done
+    stage: str = "queued"
+    total: int = 0
+    processed: int = 0
+    skipped: int = 0
+    attempts: int = 0
+    message: str | None = None
+    excel_url: str | None = None
+    error: str | None = None
+    created_at: datetime
+    started_at: datetime | None = None
+    finished_at: datetime | None = None
+
+
+class OcrJobResult(SQLModel, table=True):
+    """ผลของสลิปแต่ละใบในงาน OCR (id ใช้เป็นลำดับสำหรับ stream ต่อจากจุดเดิม)"""
+
+    id: int | None = Field(default=None, primary_key=True)
+    job_id: str = Field(index=True)
+    image_hash: str
+    row_json: str
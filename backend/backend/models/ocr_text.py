@@ -0,0 +1,22 @@
+# /models/ocr_text.py
+
+from datetime import datetime
+
+from sqlalchemy import UniqueConstraint
+from sqlmodel import Field, SQLModel
+
+
+class OcrText(SQLModel, table=True):
+    """ข้อความ OCR ดิบของสลิปแต่ละใบ แยกตามคดี (เพิ่มอย่างเดียว ใช้แยกข้อมูลใหม่เมื่อ parser เปลี่ยน)"""
+
+    __table_args__ = (UniqueConstraint("case_id", "image_hash", "filename"),)
+
+    id: int | None = Field(default=None, primary_key=True)
+    case_id: str = Field(index=True)
+    # SHA-256 ของภาพ
+    image_hash: str
+    filename: str
+    text: str
+    # ข้อความใน QR Code ของสลิป (ใช้ทับค่าธนาคาร / เลขอ้างอิงเมื่อแยกข้อมูลใหม่)
+    qr_text: str | None = None
+    created_at: datetime
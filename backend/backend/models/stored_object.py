@@ -0,0 +1,20 @@
+# /models/stored_object.py
+
+from datetime import datetime
+
+from sqlmodel import Field, SQLModel
+
+
+class StoredObject(SQLModel, table=True):
+    """ไฟล์ที่เก็บใน object storage แล้ว อ้างอิงด้วย SHA-256 ของเนื้อหา (ไฟล์เดียวกันเก็บและอัปโหลดครั้งเดียว)"""
+
+    # firebase | local
+    backend: str = Field(primary_key=True)
+    content_hash: str = Field(primary_key=True)
+    key: str
+    url: str
+    size: int
+    content_type: str
+    # ชื่อไฟล์ของการอัปโหลดครั้งแรก
+    filename: str
+    created_at: datetime
@@ -1,6 +1,6 @@
 from fastapi import APIRouter
 from . import cases, evidences, auths, heroes, crawler, illegal_images
-from . import cases, evidences, auths, heroes, crawler, ocr
+from . import cases, evidences, auths, heroes, crawler, ocr, ml_models
 
 router = APIRouter(prefix="/v1")
 router.include_router(cases.router)
@@ -10,3 +10,4 @@ router.include_router(heroes.router)
 router.include_router(crawler.router)
 router.include_router(ocr.router)
 router.include_router(illegal_images.router)
+router.include_router(ml_models.router)
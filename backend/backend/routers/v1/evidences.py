@@ -1,6 +1,5 @@
 from fastapi import APIRouter
-import io
-import zipfile
+import asyncio
 from typing import List
 import os
 from pathlib import Path
@@ -13,7 +12,10 @@ import os
 
 from ...configs.registry import models
 
-from ...configs.firebase import upload_file_to_storage
+from ...configs.storage import object_storage
+from ...configs.executor import inference_executor
+from ...utils.zip_ingest import ZipImageReader, iter_batches, open_upload
+from ...utils.zip_writer import SpooledZipWriter, iter_zip
 from datetime import datetime
 from .cases import cases_db, Case
 
@@ -68,7 +70,6 @@ def read_evidences_by_case(case_id: str) -> List[Evidence]:
 @router.post(
     "/upload/{case_id}",
     summary="Upload ZIP, classify, and return the Firebase URL of slips-only ZIP",
-    response_model=UploadSlipsResponse, # <-- ระบุ Model สำหรับ Response
     response_model=UploadSlipsResponse,  # <-- ระบุ Model สำหรับ Response
     tags=["Classification"],
 )
@@ -105,56 +106,50 @@ async def upload_and_get_url(
             detail="Invalid file type. Please upload a ZIP file.",
         )
 
-    zip_contents = await file.read()
-    slip_images_data = []
+    upload = open_upload(file)
+    slips_zip = SpooledZipWriter()
 
-    # 3. วนลูปในไฟล์ ZIP เพื่อประมวลผลรูปภาพ
     try:
-        with zipfile.ZipFile(io.BytesIO(zip_contents)) as thezip:
-            for filename in thezip.namelist():
-                image_extensions = (".png", ".jpg", ".jpeg")
-                if filename.lower().endswith(
-                    image_extensions
-                ) and not filename.startswith("__MACOSX"):
-                    image_bytes = thezip.read(filename)
-
-                    # 4. จำแนกประเภท
-                    classification = slip_classifier.predict_classify(image_bytes)
-                    logger.info(f"Classified '{filename}' as '{classification}'")
-
-                    # 5. หากเป็น 'Slip' ให้เก็บข้อมูลไว้
+        # 3. อ่านภาพใน ZIP ทีละชุด (ไม่โหลดทั้ง ZIP เข้าหน่วยความจำ)
+        with ZipImageReader(upload, (".png", ".jpg", ".jpeg")) as reader:
+            # ชุดแรกตอบ 503 ทันทีถ้าคิวเต็ม ชุดถัดไปรอคิวแทน (ไม่ทิ้งภาพที่จำแนกไปแล้วครึ่งทาง)
+            run_batch = inference_executor.run
+            async for image_entries in iter_batches(reader):
+                # 4. จำแนกประเภททีละชุดใน inference executor (ไม่ block event loop)
+                predictions = await run_batch(
+                    slip_classifier.predict_classify_batch,
+                    [image_bytes for _, image_bytes in image_entries],
+                )
+                run_batch = inference_executor.run_when_available
+
+                for (filename, image_bytes), (classification, confidence) in zip(
+                    image_entries, predictions
+                ):
+                    logger.info(
+                        f"Classified '{filename}' as '{classification}' with confidence {confidence:.3f}"
+                    )
+
+                    # 5. หากเป็น 'Slip' ให้เขียนลง ZIP ผลลัพธ์ทันที
                     if classification == "Slip":
                         filename_in_zip = os.path.join("Slip", os.path.basename(filename))
-                        slip_images_data.append({'filename': filename_in_zip, 'data': image_bytes})
-                        slip_images_data.append(
-                            {"filename": filename, "data": image_bytes}
-                        )
+                        await asyncio.to_thread(slips_zip.add, filename_in_zip, image_bytes)
 
-    except zipfile.BadZipFile:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="The uploaded file is not a valid ZIP file.",
-        )
+        # 6. ตรวจสอบว่ามีสลิปหรือไม่
+        if not slips_zip.count:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="No slips were found in the uploaded ZIP file.",
+            )
 
-    # 6. ตรวจสอบว่ามีสลิปหรือไม่
-    if not slip_images_data:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="No slips were found in the uploaded ZIP file.",
+        # 7. อัปโหลด ZIP ที่มีเฉพาะสลิปไปยัง storage (ZIP ที่เนื้อหาเหมือนเดิมจะได้ URL เดิม)
+        date_str = datetime.utcnow().strftime("%Y%m%d_%H%M%S")
+        new_zip_filename = f"uploads/slips_only_{date_str}_{file.filename}"
+        firebase_url = await object_storage.put(
+            await asyncio.to_thread(slips_zip.finish), new_zip_filename, "application/zip"
         )
+    finally:
+        slips_zip.close()
 
-    # 7. สร้างไฟล์ ZIP ใหม่ในหน่วยความจำ
-    in_memory_zip = io.BytesIO()
-    with zipfile.ZipFile(in_memory_zip, "w", zipfile.ZIP_DEFLATED) as new_zip:
-        for item in slip_images_data:
-            new_zip.writestr(item["filename"], item["data"])
-
-    # 8. อัปโหลด ZIP ที่มีเฉพาะสลิปไปยัง Firebase Storage
-    date_str = datetime.utcnow().strftime("%Y%m%d_%H%M%S")
-    new_zip_filename = f"uploads/slips_only_{date_str}_{file.filename}"
-    firebase_url = await upload_file_to_storage(
-        in_memory_zip.getvalue(), new_zip_filename, "application/zip"
-    )
     evidence = Evidence(
         filename=file.filename,
         case_title=case.title,
@@ -170,7 +165,7 @@ async def upload_and_get_url(
     # 9. ส่งคืน URL ของ Firebase ในรูปแบบ JSON
     return UploadSlipsResponse(
         message="Slips have been processed and uploaded successfully.",
-        firebase_url=firebase_url,,
+        firebase_url=firebase_url,
         case_id=case_id,
         evidence_id=evidence_id,
         evidence_type="slip"
@@ -250,40 +245,32 @@ async def download_category_zip(category: str, filenames: List[str]):
             Path("temp"),
         ]
 
-        # สร้าง ZIP file ใน memory
-        zip_buffer = io.BytesIO()
-
-        with zipfile.ZipFile(zip_buffer, "w", zipfile.ZIP_DEFLATED) as zip_file:
-            files_added = 0
-
-            for filename in filenames:
-                # ค้นหาไฟล์ในไดเรกทอรีต่างๆ
-                file_path = None
-                for directory in search_directories:
-                    potential_path = directory / filename
-                    if potential_path.exists() and potential_path.is_file():
-                        file_path = potential_path
-                        break
-
-                if file_path:
-                    # เพิ่มไฟล์ลงใน ZIP
-                    zip_file.write(file_path, filename)
-                    files_added += 1
-                    logger.info(f"Added {filename} to ZIP from {file_path}")
-                else:
-                    logger.warning(f"File {filename} not found in any directory")
-
-            if files_added == 0:
-                raise HTTPException(
-                    status_code=status.HTTP_404_NOT_FOUND,
-                    detail="No files found for the specified category",
-                )
-
-        zip_buffer.seek(0)
+        # หาไฟล์ทั้งหมดก่อน เพื่อให้ตอบ 404 ได้ก่อนเริ่มส่ง ZIP
+        members = []
+        for filename in filenames:
+            # ค้นหาไฟล์ในไดเรกทอรีต่างๆ
+            file_path = None
+            for directory in search_directories:
+                potential_path = directory / filename
+                if potential_path.exists() and potential_path.is_file():
+                    file_path = potential_path
+                    break
+
+            if file_path:
+                members.append((filename, file_path))
+                logger.info(f"Adding {filename} to ZIP from {file_path}")
+            else:
+                logger.warning(f"File {filename} not found in any directory")
+
+        if not members:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="No files found for the specified category",
+            )
 
-        # ส่ง ZIP file กลับ
+        # ส่ง ZIP file กลับแบบ stream (เขียนทีละไฟล์ ไม่ประกอบทั้ง ZIP ใน memory)
         return StreamingResponse(
-            io.BytesIO(zip_buffer.read()),
+            iter_zip(members),
             media_type="application/zip",
             headers={
                 "Content-Disposition": f"attachment; filename={category}_images.zip"
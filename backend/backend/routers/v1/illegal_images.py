@@ -2,12 +2,22 @@ from fastapi import APIRouter, File, UploadFile, HTTPException, status
 from fastapi.responses import StreamingResponse
 from loguru import logger
 from pydantic import BaseModel
-import io
-import zipfile
+import asyncio
+import time
+from contextlib import nullcontext
 from typing import List, Dict
 
 from ...configs.registry import models
-from ...configs.firebase import upload_file_to_storage
+from ...configs.storage import object_storage
+from ...configs.executor import inference_executor
+from ...utils.zip_ingest import (
+    MAX_MEMBER_BYTES,
+    MAX_UPLOAD_BYTES,
+    ZipImageReader,
+    iter_batches,
+    open_upload,
+)
+from ...utils.zip_writer import SpooledZipWriter
 from datetime import datetime
 
 router = APIRouter(prefix="/illegal-images", tags=["illegal-images"])
@@ -29,6 +39,26 @@ class IllegalImagesSeparationResponse(BaseModel):
     illegal_zip_url: str | None = None
     classifications: List[ClassificationResult]
     processed_count: int | None = None  # จำนวนที่ประมวลผลแล้ว
+    timings: Dict[str, float] | None = None  # เวลาของแต่ละขั้นตอน (วินาที)
+
+
+async def upload_zip(
+    category: str, writer: SpooledZipWriter, source_name: str, timings: Dict[str, float]
+) -> str | None:
+    """ปิด ZIP ของภาพหนึ่งประเภท (ใน thread) แล้วอัปโหลด พร้อมจับเวลาแต่ละขั้นตอนลง timings"""
+    if not writer.count:
+        return None
+
+    start = time.perf_counter()
+    zip_file = await asyncio.to_thread(writer.finish)
+    timings[f"{category}_zip"] += time.perf_counter() - start
+
+    date_str = datetime.utcnow().strftime("%Y%m%d_%H%M%S")
+    zip_filename = f"{category}_images_{date_str}_{source_name.split('.')[0]}.zip"
+    start = time.perf_counter()
+    url = await object_storage.put(zip_file, zip_filename, "application/zip")
+    timings[f"{category}_upload"] = time.perf_counter() - start
+    return url
 
 
 # --- Endpoint สำหรับแยกภาพที่ผิดกฎหมาย ---
@@ -72,27 +102,42 @@ async def separate_illegal_images(
             detail="Invalid file type. Please upload a ZIP file or an image file (JPG, PNG, GIF, BMP).",
         )
 
-    file_contents = await file.read()
-    legal_images_data = []
-    illegal_images_data = []
+    request_start = time.perf_counter()
+    timings: Dict[str, float] = {"read": 0.0, "classify": 0.0, "legal_zip": 0.0, "illegal_zip": 0.0}
+
+    upload = open_upload(file, MAX_UPLOAD_BYTES if is_zip else MAX_MEMBER_BYTES)
+    # ภาพแต่ละประเภทถูกเขียนลง ZIP ของตัวเองทันทีที่จำแนกเสร็จ (ไม่ต้องเก็บภาพทั้งหมดไว้ในหน่วยความจำ)
+    zip_writers = {"legal": SpooledZipWriter(), "illegal": SpooledZipWriter()}
     classifications = []
 
-    # 3. ประมวลผลไฟล์
     try:
-        if is_zip:
-            # ประมวลผล ZIP file
-            with zipfile.ZipFile(io.BytesIO(file_contents)) as thezip:
-                for filename in thezip.namelist():
-                    image_extensions = (".png", ".jpg", ".jpeg", ".gif", ".bmp")
-                    if filename.lower().endswith(
-                        image_extensions
-                    ) and not filename.startswith("__MACOSX"):
-                        image_bytes = thezip.read(filename)
-
-                        # จำแนกประเภท
-                        classification, confidence = (
-                            illegal_image_classifier.predict_classify(image_bytes)
-                        )
+        # 3. อ่านและจำแนกภาพทีละชุด
+        try:
+            if is_zip:
+                images = ZipImageReader(upload, (".png", ".jpg", ".jpeg", ".gif", ".bmp"))
+            else:
+                # ไฟล์ภาพเดี่ยว
+                images = nullcontext([(file.filename, upload.read())])
+
+            with images as image_source:
+                # ชุดแรกตอบ 503 ทันทีถ้าคิวเต็ม ชุดถัดไปรอคิวแทน (ไม่ทิ้งภาพที่จำแนกไปแล้วครึ่งทาง)
+                run_batch = inference_executor.run
+                start = time.perf_counter()
+                async for image_entries in iter_batches(image_source):
+                    timings["read"] += time.perf_counter() - start
+
+                    # จำแนกประเภทใน inference executor เพื่อไม่ให้ block event loop
+                    start = time.perf_counter()
+                    predictions = await run_batch(
+                        illegal_image_classifier.predict_classify_batch,
+                        [image_bytes for _, image_bytes in image_entries],
+                    )
+                    run_batch = inference_executor.run_when_available
+                    timings["classify"] += time.perf_counter() - start
+
+                    for (filename, image_bytes), (classification, confidence) in zip(
+                        image_entries, predictions
+                    ):
                         logger.info(
                             f"Classified '{filename}' as '{classification}' with confidence {confidence:.3f}"
                         )
@@ -107,99 +152,49 @@ async def separate_illegal_images(
                         )
 
                         # แยกตามประเภท - other = ปกติ, อื่นๆ = ผิดกฎหมาย
-                        if classification.lower() == "other":
-                            legal_images_data.append(
-                                {"filename": filename, "data": image_bytes}
-                            )
-                        else:
-                            illegal_images_data.append(
-                                {"filename": filename, "data": image_bytes}
-                            )
-        else:
-            # ประมวลผลไฟล์ภาพเดี่ยว
-            classification, confidence = illegal_image_classifier.predict_classify(
-                file_contents
-            )
-            logger.info(
-                f"Classified '{file.filename}' as '{classification}' with confidence {confidence:.3f}"
-            )
+                        category = "legal" if classification.lower() == "other" else "illegal"
+                        start = time.perf_counter()
+                        await asyncio.to_thread(zip_writers[category].add, filename, image_bytes)
+                        timings[f"{category}_zip"] += time.perf_counter() - start
 
-            # เก็บผลการจำแนก
-            classifications.append(
-                ClassificationResult(
-                    filename=file.filename,
-                    classification=classification,
-                    confidence=confidence,
-                )
-            )
+                    start = time.perf_counter()
 
-            # แยกตามประเภท - other = ปกติ, อื่นๆ = ผิดกฎหมาย
-            if classification.lower() == "other":
-                legal_images_data.append(
-                    {"filename": file.filename, "data": file_contents}
-                )
-            else:
-                illegal_images_data.append(
-                    {"filename": file.filename, "data": file_contents}
-                )
-
-    except zipfile.BadZipFile:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="The uploaded file is not a valid ZIP file.",
-        )
-    except Exception as e:
-        logger.error(f"Error processing file: {str(e)}")
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Error processing file: {str(e)}",
-        )
-
-    # 4. สร้างและอัปโหลดไฟล์ ZIP สำหรับภาพปกติ
-    legal_zip_url = None
-    if legal_images_data:
-        legal_zip_buffer = io.BytesIO()
-        with zipfile.ZipFile(legal_zip_buffer, "w", zipfile.ZIP_DEFLATED) as legal_zip:
-            for item in legal_images_data:
-                legal_zip.writestr(item["filename"], item["data"])
-
-        date_str = datetime.utcnow().strftime("%Y%m%d_%H%M%S")
-        legal_zip_filename = (
-            f"legal_images_{date_str}_{file.filename.split('.')[0]}.zip"
-        )
-        legal_zip_url = await upload_file_to_storage(
-            legal_zip_buffer.getvalue(), legal_zip_filename, "application/zip"
-        )
+        except HTTPException:
+            raise
+        except Exception as e:
+            logger.error(f"Error processing file: {str(e)}")
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Error processing file: {str(e)}",
+            )
 
-    # 5. สร้างและอัปโหลดไฟล์ ZIP สำหรับภาพผิดกฎหมาย
-    illegal_zip_url = None
-    if illegal_images_data:
-        illegal_zip_buffer = io.BytesIO()
-        with zipfile.ZipFile(
-            illegal_zip_buffer, "w", zipfile.ZIP_DEFLATED
-        ) as illegal_zip:
-            for item in illegal_images_data:
-                illegal_zip.writestr(item["filename"], item["data"])
-
-        date_str = datetime.utcnow().strftime("%Y%m%d_%H%M%S")
-        illegal_zip_filename = (
-            f"illegal_images_{date_str}_{file.filename.split('.')[0]}.zip"
-        )
-        illegal_zip_url = await upload_file_to_storage(
-            illegal_zip_buffer.getvalue(), illegal_zip_filename, "application/zip"
+        # 4. ปิดและอัปโหลด ZIP ของภาพปกติและภาพผิดกฎหมายพร้อมกัน (ใช้เวลาเท่ากับฝั่งที่ช้ากว่า)
+        start = time.perf_counter()
+        legal_zip_url, illegal_zip_url = await asyncio.gather(
+            upload_zip("legal", zip_writers["legal"], file.filename, timings),
+            upload_zip("illegal", zip_writers["illegal"], file.filename, timings),
         )
+        timings["output"] = time.perf_counter() - start
+    finally:
+        for writer in zip_writers.values():
+            writer.close()
 
-    # 6. ส่งคืนผลลัพธ์
-    total_images = len(legal_images_data) + len(illegal_images_data)
+    timings["total"] = time.perf_counter() - request_start
+    logger.info(
+        "Illegal image separation timings: "
+        + ", ".join(f"{stage}={seconds:.2f}s" for stage, seconds in timings.items())
+    )
 
+    # 5. ส่งคืนผลลัพธ์
     return IllegalImagesSeparationResponse(
         message="Images have been processed and separated successfully.",
-        total_images=total_images,
-        legal_images=len(legal_images_data),
-        illegal_images=len(illegal_images_data),
+        total_images=len(classifications),
+        legal_images=zip_writers["legal"].count,
+        illegal_images=zip_writers["illegal"].count,
         legal_zip_url=legal_zip_url,
         illegal_zip_url=illegal_zip_url,
         classifications=classifications,
+        timings={stage: round(seconds, 3) for stage, seconds in timings.items()},
     )
 
 
@@ -239,9 +234,9 @@ async def check_single_image(
 
     # 3. ประมวลผลภาพ
     try:
-        image_bytes = await file.read()
-        classification, confidence = illegal_image_classifier.predict_classify(
-            image_bytes
+        image_bytes = open_upload(file, MAX_MEMBER_BYTES).read()
+        classification, confidence = await inference_executor.run(
+            illegal_image_classifier.predict_classify, image_bytes
         )
         logger.info(
             f"Classified '{file.filename}' as '{classification}' with confidence {confidence:.3f}"
@@ -251,6 +246,8 @@ async def check_single_image(
             filename=file.filename, classification=classification, confidence=confidence
         )
 
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error processing image: {str(e)}")
         raise HTTPException(
@@ -0,0 +1,31 @@
+from fastapi import APIRouter
+
+from ...configs.executor import inference_executor
+from ...configs.ocr_reader import ocr_reader_stats
+from ...configs.registry import models
+from ...ml.ocr_cache import ocr_cache
+from ...ml.ocr_text_store import ocr_text_store
+from ...ml.roi_ocr import template_latency
+
+router = APIRouter(prefix="/ml-models", tags=["ml-models"])
+
+
+@router.get(
+    "/stats",
+    summary="Inference statistics",
+    description="Return runtime statistics (queue depth, batches, ...) for every loaded model.",
+)
+def read_model_stats() -> dict:
+    """
+    Endpoint to retrieve runtime statistics of the loaded models.
+    """
+    stats = {
+        name: service.stats() if hasattr(service, "stats") else {}
+        for name, service in models.items()
+    }
+    stats["inference_executor"] = inference_executor.stats()
+    stats["ocr_reader"] = ocr_reader_stats()
+    stats["ocr_templates"] = template_latency.stats()
+    stats["ocr_cache"] = ocr_cache.stats()
+    stats["ocr_text_store"] = ocr_text_store.stats()
+    return stats
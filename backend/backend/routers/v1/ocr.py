@@ -1,29 +1,37 @@
 #routes/v1/ocr.py
-from fastapi import APIRouter, File, UploadFile, HTTPException, status
+from fastapi import APIRouter, File, UploadFile, HTTPException, Header, status
 from fastapi.responses import StreamingResponse
 from loguru import logger
 from pydantic import BaseModel
-from pyzbar.pyzbar import decode
-from ...utils.read_save_ocr import has_qr_code, save_ocr_results,detect_bank,handle_gsb,handle_scb, handle_krungthai, handle_kbank, handle_bangkok, handle_unknown
-from ...configs.firebase import upload_file_to_storage
-import pandas as pd
+from ...utils.read_save_ocr import has_qr_code, create_excel_from_ocr, parse_slips, parse_slip_qr_only, parse_slip_template
+from ...utils.qr_payload import parse_slip_qr
+from ...utils.slip_image import QR_DETECTOR_VERSION, SlipImage
+from ...configs.storage import object_storage
+from ...configs.executor import inference_executor
+from ...configs.ocr_jobs import FINISHED_STATUSES, OcrJobProgress, ocr_jobs
+from ...configs.ocr_reader import ocr_readtext_batched, ocr_read_templates, ocr_workers
+from ...ml.batch_ocr import OCR_BATCH_SIZE
+from ...ml.roi_ocr import load_templates, template_latency
+from ...ml.ocr_cache import ocr_cache
+from ...ml.ocr_text_store import ocr_text_store
+from ...ml.result_cache import image_hash
+from ...utils.slip_parser import PARSER_VERSION
+from ...utils.ocr_export import EXPORT_FORMATS, export_rows, iter_file
+from ...utils.zip_ingest import ZipImageReader
+from ...models import OcrJob
 
 # Import or define evidence_db
 from ...routers.v1.evidences import evidence_db  # Adjust the import path as needed
 
-import requests
-import easyocr
+import asyncio
 import zipfile
 import io
 import os
-from PIL import Image
-import torch
 import datetime
-
-# --- ส่วนของการตั้งค่า (เหมือนเดิม) ---
-print(f"PyTorch version: {torch.__version__}")
-print(f"CUDA available: {torch.cuda.is_available()}")
-ocr_reader = easyocr.Reader(['th', 'en'], gpu=True)
+import json
+from contextlib import nullcontext
+from itertools import islice
+from typing import BinaryIO, Callable, Literal
 
 router = APIRouter(prefix="/ocr", tags=["ocr"])
 
@@ -31,6 +39,8 @@ class OcrRequest(BaseModel):
     firebase_url: str
     case_id: str
     evidence_id: int
+    # รูปแบบไฟล์ผลลัพธ์ที่อัปโหลด: xlsx / csv / parquet
+    export_format: Literal["xlsx", "csv", "parquet"] = "xlsx"
 
 class OcrResponse(BaseModel):
     message: str
@@ -51,26 +61,297 @@ class OcrResult(BaseModel):
     receiver_acc: str
     amount: str
     date: str
+    transaction_ref: str = "-"
     qr_code_text: str
+    image_hash: str = "-"
+
+class OcrJobCreated(BaseModel):
+    job_id: str
+    status: str
+    status_url: str
+    results_url: str
+
+class OcrJobStatus(BaseModel):
+    job_id: str
+    case_id: str
+    evidence_id: int
+    status: str
+    stage: str
+    total: int
+    processed: int
+    skipped: int
+    eta_seconds: float | None = None
+    attempts: int
+    message: str | None = None
+    excel_url: str | None = None
+    error: str | None = None
+    created_at: datetime.datetime
+    started_at: datetime.datetime | None = None
+    finished_at: datetime.datetime | None = None
 
 ocr_db: list[OcrResult] = []
+# (case_id, evidence_id, image_hash) ที่อยู่ใน ocr_db แล้ว กันการเพิ่มแถวซ้ำเมื่อประมวลผล evidence เดิมอีกครั้ง
+ocr_db_keys: set[tuple[str, int, str]] = set()
+
+# จำนวน batch ที่ decode ไว้ในหน่วยความจำพร้อมกัน (ภาพมากขึ้น = จัด bucket ได้เต็มขึ้น แต่ใช้ RAM มากขึ้น)
+OCR_WINDOW_BATCHES = 4
+
+def ocr_slip_window(
+    window: list[tuple[str, str, SlipImage | None, dict | None]], case_id: str
+) -> tuple[list[dict | None], list]:
+    """
+    OCR สลิปชุดหนึ่งแบบ batch แล้วแยกข้อมูลตามธนาคาร
+    window คือ list ของ (path ในไฟล์ ZIP, SHA-256 ของภาพ, ภาพ, ข้อมูล QR ถ้าใช้ QR อย่างเดียว)
+    คืนค่า (row ของแต่ละสลิปตามลำดับใน window หรือ None ถ้า OCR ไม่ได้ข้อความ, เวลาแต่ละ batch)
+    - สลิปที่ได้ข้อมูลจาก QR อย่างเดียว (qr_only ไม่เป็น None) ไม่ต้อง OCR
+    - OCR_TEMPLATE_MODE=1: สลิปที่ QR บอกธนาคารได้และมี template จะ OCR เฉพาะบริเวณของแต่ละ field
+      ถ้า field ใดไม่ตรง pattern หรืออ่าน field ที่จำเป็นไม่ได้ จะกลับไป OCR ทั้งภาพ
+    ผลของทุกสลิปถูกเก็บลง ocr_cache
+    """
+    pending = [i for i, (_, _, _, qr_only) in enumerate(window) if qr_only is None]
+    qr_banks = {}
+    template_fields = {}
+    template_texts = {}
+    if pending and os.getenv("OCR_TEMPLATE_MODE", "0") == "1":
+        templates = load_templates()
+        for i in pending:
+            qr_data = parse_slip_qr(window[i][2].qr_text)
+            if qr_data and qr_data.get("bank") in templates:
+                qr_banks[i] = (qr_data["bank"], qr_data)
+        template_results = ocr_read_templates(
+            [(window[i][2].gray, bank) for i, (bank, _) in qr_banks.items()]
+        )
+        for i, (fields, raw_text, seconds) in zip(qr_banks, template_results):
+            bank = qr_banks[i][0]
+            template_latency.record_template(bank, seconds, fallback=fields is None)
+            if fields is not None:
+                template_fields[i] = fields
+                template_texts[i] = raw_text
+        pending = [i for i in pending if i not in template_fields]
+
+    texts, timings = ocr_readtext_batched([window[i][2].ocr_image for i in pending]) if pending else ([], [])
+    ocr_texts = dict(zip(pending, texts))
+    # เวลา OCR ทั้งภาพเฉลี่ยต่อสลิปในชุดนี้ (ใช้เทียบกับ OCR แบบ template)
+    full_seconds = sum(t["seconds"] for t in timings) / len(pending) if pending else 0.0
+
+    rows: list[dict | None] = [None] * len(window)
+    cache_entries = {}
+    full_ocr = []
+    for index, (image_path, key, slip, qr_only) in enumerate(window):
+        image_name = os.path.basename(image_path)
+        if qr_only is not None:
+            rows[index] = parse_slip_qr_only(image_name, qr_only)
+            cache_entries[key] = cache_entry("qr_only", qr_only["qr_code_text"], None, rows[index])
+            continue
+        if index in template_fields:
+            bank, qr_data = qr_banks[index]
+            ocr_text_store.append(case_id, key, image_name, template_texts[index], slip.qr_text)
+            rows[index] = parse_slip_template(image_name, bank, template_fields[index], qr_data)
+            cache_entries[key] = cache_entry("template", slip.qr_text, template_texts[index], rows[index])
+            continue
+        ocr_text = ocr_texts[index]
+        if not ocr_text:
+            cache_entries[key] = cache_entry("ocr", slip.qr_text, ocr_text, None)
+            continue
+        ocr_text_store.append(case_id, key, image_name, ocr_text, slip.qr_text)
+        full_ocr.append((index, (image_name, ocr_text, slip.qr_text)))
+
+    # แยกข้อมูลตามธนาคารของทุกสลิปที่ OCR ทั้งภาพในครั้งเดียว โดยใช้ผล QR ที่อ่านไว้แล้ว
+    for (index, (_, ocr_text, qr_text)), row in zip(full_ocr, parse_slips([slip for _, slip in full_ocr])):
+        template_latency.record_full(row["bank"], full_seconds)
+        logger.debug(row)
+        rows[index] = row
+        cache_entries[window[index][1]] = cache_entry("ocr", qr_text, ocr_text, row)
+    ocr_cache.put_many(cache_entries)
+
+    for (_, key, _, _), row in zip(window, rows):
+        if row is not None:
+            row["image_hash"] = key
+
+    if qr_banks:
+        logger.info(f"Template OCR read {len(template_fields)}/{len(qr_banks)} slips without the text detector.")
+        for bank, entry in template_latency.stats().items():
+            if entry["seconds_saved"] is not None:
+                logger.info(
+                    f"Template OCR [{bank}]: {entry['template_avg_seconds']:.2f}s vs "
+                    f"{entry['full_avg_seconds']:.2f}s per slip, {entry['seconds_saved']:.1f}s saved in total."
+                )
+    return rows, timings
+
+def cache_entry(source: str, qr_text: str | None, ocr_text: str | None, row: dict | None) -> dict:
+    """รายการสำหรับ ocr_cache (row ไม่เก็บชื่อไฟล์ เพราะภาพเดียวกันอาจมีชื่อต่างกันในแต่ละ ZIP)"""
+    if row is not None:
+        row = {k: v for k, v in row.items() if k not in ("file", "image_hash")}
+    return {
+        "source": source,
+        "qr_text": qr_text,
+        "ocr_text": ocr_text,
+        "row": row,
+        "parser_version": PARSER_VERSION,
+        "detector_version": QR_DETECTOR_VERSION,
+    }
+
+def cache_entry_usable(entry: dict, qr_only_allowed: bool, template_allowed: bool) -> bool:
+    """
+    ผลใน cache ใช้ได้กับการตั้งค่าปัจจุบันหรือไม่
+    - no_qr ขึ้นกับ detector ที่ใช้ตอนนั้น จึงใช้ได้เฉพาะผลจาก detector รุ่นปัจจุบัน
+      (ภาพที่เจอ QR แล้ว detector รุ่นใหม่ก็อ่านได้ข้อมูลเดิม)
+    - qr_only / template ใช้ได้เฉพาะเมื่อยังเปิด OCR_QR_ONLY / OCR_TEMPLATE_MODE
+    """
+    source = entry["source"]
+    if source == "no_qr":
+        return entry.get("detector_version") == QR_DETECTOR_VERSION
+    if source == "qr_only":
+        return qr_only_allowed
+    if source == "template":
+        return template_allowed
+    return True
+
+def cached_slip_row(key: str, entry: dict, image_name: str, case_id: str) -> dict | None:
+    """
+    สร้าง row จากผลใน cache โดยไม่ต้อง decode / อ่าน QR / OCR ซ้ำ
+    ผลจาก parser รุ่นเก่าจะถูกแยกใหม่จากข้อความ OCR ที่เก็บไว้แล้วอัปเดต cache
+    """
+    if entry["ocr_text"]:
+        # บันทึกข้อความ OCR ให้คดีใหม่ด้วย
+        ocr_text_store.append(case_id, key, image_name, entry["ocr_text"], entry["qr_text"])
+    if entry["source"] == "ocr" and entry["ocr_text"] and entry["parser_version"] != PARSER_VERSION:
+        row = parse_slips([(image_name, entry["ocr_text"], entry["qr_text"])])[0]
+        ocr_cache.put_many({key: cache_entry("ocr", entry["qr_text"], entry["ocr_text"], row)})
+    elif entry["row"] is None:
+        return None
+    else:
+        row = {"file": image_name, **entry["row"]}
+    row["image_hash"] = key
+    return row
+
+def extract_slip_texts(
+    zip_contents: bytes | BinaryIO,
+    case_id: str,
+    on_rows: Callable[[list[dict]], None] | None = None,
+    on_progress: Callable[[int, int, int], None] | None = None,
+) -> tuple[list, int, int]:
+    """
+    อ่านรูปในโฟลเดอร์ Slip ของ ZIP, ข้ามรูปที่ไม่มี QR Code แล้วทำ OCR และแยกข้อมูลตามธนาคาร
+    แต่ละรูปถูก decode ครั้งเดียว (SlipImage) แล้วใช้ร่วมกันทั้งการอ่าน QR, OCR และ handler ของธนาคาร
+    OCR ทำทีละ batch ของภาพขนาดใกล้กัน (OCR_BATCH_SIZE) และกระจายไปหลาย process ได้ (OCR_MODE=process)
+    ภาพที่เคยประมวลผลแล้ว (SHA-256 ตรงกับใน ocr_cache) ใช้ผลเดิมโดยไม่ต้อง decode / อ่าน QR / OCR
+    ผลลัพธ์ยังคงเรียงตามลำดับไฟล์
+    on_rows(rows) ถูกเรียกทันทีที่สลิปชุดหนึ่งได้ผล (ผลจาก cache หรือหลัง OCR แต่ละ window)
+    on_progress(total, processed, skipped) ถูกเรียกหลังแต่ละชุดเพื่อรายงานความคืบหน้า
+    เป็นงาน CPU หนัก (pyzbar + EasyOCR) จึงต้องเรียกผ่าน inference executor
+    """
+    timings = []
+    skipped_count = 0
+    cache_hits = 0
+    # OCR_QR_ONLY=1: สลิปที่ QR ถอดได้ (ธนาคาร + เลขอ้างอิง / ปลายทางพร้อมเพย์) ไม่ต้อง OCR เลย
+    qr_only_allowed = os.getenv("OCR_QR_ONLY", "0") == "1"
+    template_allowed = os.getenv("OCR_TEMPLATE_MODE", "0") == "1"
+    # ใน OCR_MODE=process เตรียมภาพให้พอสำหรับทุก worker
+    window_size = OCR_BATCH_SIZE * OCR_WINDOW_BATCHES * ocr_workers()
+
+    # row ของแต่ละสลิปตามลำดับไฟล์ (None = ข้ามหรือ OCR ไม่ได้ข้อความ)
+    results: list[dict | None] = []
+    window_slots: list[int] = []
+    window = []
+    # จำนวนสลิปที่ได้ผลแล้ว (รวมสลิปที่ OCR ไม่ได้ข้อความ)
+    processed_count = 0
 
-def read_ocr_from_image_data(image_data: bytes) -> str:
-    """ใช้ OCR เพื่อแปลงข้อความจากข้อมูลภาพ (bytes) โดยตรง"""
-    result = ocr_reader.readtext(image_data, detail=0)
-    ocr_text = ' '.join(result)
-    return ocr_text
-
-def resize_image(image_data: bytes, max_size: int = 1600) -> bytes:
-    """ปรับขนาดรูปภาพถ้าขนาดใหญ่เกินไป โดยรักษาสัดส่วน"""
-    with Image.open(io.BytesIO(image_data)) as img:
-        if max(img.size) > max_size:
-            img.thumbnail((max_size, max_size))
-            buffer = io.BytesIO()
-            img_format = img.format if img.format in ['JPEG', 'PNG'] else 'JPEG'
-            img.save(buffer, format=img_format)
-            return buffer.getvalue()
-    return image_data
+    def report(rows: list[dict]):
+        if on_rows is not None and rows:
+            on_rows(rows)
+        if on_progress is not None:
+            on_progress(len(slip_images), processed_count, skipped_count)
+
+    def flush_window():
+        nonlocal processed_count
+        window_rows, window_timings = ocr_slip_window(window, case_id)
+        for slot, row in zip(window_slots, window_rows):
+            results[slot] = row
+        timings.extend(window_timings)
+        processed_count += len(window)
+        window.clear()
+        window_slots.clear()
+        report([row for row in window_rows if row is not None])
+
+    zip_buffer = io.BytesIO(zip_contents) if isinstance(zip_contents, bytes) else zip_contents
+    # ZipImageReader ตรวจขนาด / จำนวนไฟล์ / อัตราการบีบอัด และอ่านภาพทีละไฟล์เมื่อถึงคิว
+    with ZipImageReader(zip_buffer, ('.png', '.jpg', '.jpeg'), prefix='Slip/') as reader:
+        slip_images = reader.names
+        slip_entries = iter(reader)
+
+        logger.debug(slip_images)
+
+        if not slip_images:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No images found in the Slip folder.")
+        report([])
+
+        # อ่านและหา hash ทีละช่วง เพื่อถาม cache ครั้งเดียวต่อช่วง
+        while chunk := list(islice(slip_entries, window_size)):
+            keys = [image_hash(image_data) for _, image_data in chunk]
+            cached = ocr_cache.get_many(keys)
+            no_qr_entries = {}
+            cached_rows = []
+
+            for (image_path, image_data), key in zip(chunk, keys):
+                entry = cached.get(key)
+                if entry is not None and cache_entry_usable(entry, qr_only_allowed, template_allowed):
+                    cache_hits += 1
+                    if entry["source"] == "no_qr":
+                        logger.info(f"ข้ามรูปภาพที่ไม่มี QR code (cache): {image_path}")
+                        skipped_count += 1
+                        continue
+                    row = cached_slip_row(key, entry, os.path.basename(image_path), case_id)
+                    results.append(row)
+                    processed_count += 1
+                    if row is not None:
+                        cached_rows.append(row)
+                    continue
+
+                try:
+                    slip = SlipImage.from_bytes(image_data)
+                except ValueError:
+                    logger.warning(f"ข้ามรูปภาพที่อ่านไม่ได้: {image_path}")
+                    skipped_count += 1
+                    continue
+
+                # 1. ตรวจสอบ QR Code ก่อน
+                if not has_qr_code(slip):
+                    skipped_count += 1
+                    if slip.qr_error is not None:
+                        # อ่าน QR ไม่สำเร็จไม่ได้แปลว่าไม่มี QR จึงไม่ cache (ครั้งหน้าจะลองใหม่)
+                        logger.warning(f"ข้ามรูปภาพที่อ่าน QR code ไม่ได้ ({slip.qr_error}): {image_path}")
+                        continue
+                    logger.info(f"ข้ามรูปภาพที่ไม่มี QR code: {image_path}")
+                    no_qr_entries[key] = cache_entry("no_qr", None, None, None)
+                    continue  # ข้ามไปรูปถัดไป
+
+                # 2. ถ้ามี QR Code ค่อยเก็บไว้ทำ OCR เป็น batch (หรือใช้ข้อมูลจาก QR อย่างเดียวถ้าอนุญาต)
+                qr_data = parse_slip_qr(slip.qr_text) if qr_only_allowed else None
+                # สลิปที่ไม่ต้อง OCR ไม่ต้องเก็บภาพไว้ในหน่วยความจำ
+                window.append((image_path, key, None if qr_data else slip, qr_data))
+                window_slots.append(len(results))
+                results.append(None)
+                if len(window) >= window_size:
+                    flush_window()
+
+            ocr_cache.put_many(no_qr_entries)
+            report(cached_rows)
+
+        if window:
+            flush_window()
+
+    rows = [row for row in results if row is not None]
+    if cache_hits:
+        logger.info(f"OCR cache: {cache_hits}/{len(slip_images)} slips reused from earlier results.")
+    if timings:
+        ocr_seconds = sum(t["seconds"] for t in timings)
+        ocr_images = sum(t["images"] for t in timings)
+        logger.info(
+            f"OCR finished {ocr_images} slips in {len(timings)} batches, {ocr_seconds:.2f}s "
+            f"({ocr_seconds / ocr_images:.2f}s/slip)."
+        )
+    return rows, len(rows), skipped_count
 
 # --- Endpoint หลักที่ปรับปรุงตรรกะ ---
 @router.get("/",summary="List all OCR results", description="Retrieve a list of all OCR results.")
@@ -80,122 +361,69 @@ def read_ocr_results() -> list[OcrResult]:
     """
     return ocr_db
 
-@router.post(
-    "/process-ocr",
-    summary="Process OCR on images from Firebase URL",
-    response_model=OcrResponse,
-)
-async def process_ocr(request: OcrRequest):
+
+async def run_ocr_pipeline(
+    request: OcrRequest, progress: OcrJobProgress | None = None, zip_file: BinaryIO | None = None
+) -> OcrResponse:
     """
-    รับ URL ของไฟล์ ZIP, ดึงรูปภาพจากโฟลเดอร์ Slip,
-    ตรวจสอบ QR Code ก่อน ถ้ามีจึงประมวลผล OCR และส่งคืนผลลัพธ์
+    ดาวน์โหลด ZIP -> QR + OCR -> สร้างไฟล์ Excel -> อัปโหลด -> อัปเดต evidence
+    ใช้ร่วมกันระหว่าง /process-ocr (รอจนเสร็จ) และงาน background (/ocr/jobs)
+    progress (เฉพาะงาน background) ได้รับขั้นตอน ความคืบหน้า และผลของแต่ละสลิปทันทีที่พร้อม
+    zip_file: ZIP ที่ดาวน์โหลดไว้แล้ว (ผู้เรียกเป็นผู้ปิดไฟล์) ถ้าไม่ระบุจะดาวน์โหลดจาก firebase_url
     """
     if not request.firebase_url:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Firebase URL is required.")
+
+    if zip_file is None:
+        if progress is not None:
+            progress.stage("downloading")
+        # ดาวน์โหลดลงไฟล์ชั่วคราว (หรือเปิดจากดิสก์โดยตรงเมื่อใช้ local storage)
+        zip_file = await object_storage.open_url(str(request.firebase_url))
+        zip_context = zip_file
+    else:
+        zip_file.seek(0)
+        zip_context = nullcontext(zip_file)
     
-    try:
-        response = requests.get(str(request.firebase_url))
-        response.raise_for_status()
-        zip_contents = response.content
-    except requests.exceptions.RequestException as e:
-        raise HTTPException(status_code=404, detail=f"Could not download file: {e}")
-    
-    zip_contents = response.content
-    results = []
-    paths = []
-    results_filter = []
-    processed_count = int(0)
-    skipped_count = int(0)
+    on_rows = on_progress = None
+    if progress is not None:
+        progress.stage("ocr")
+        on_rows = lambda rows: progress.results(
+            [{"evidence_id": request.evidence_id, "case_id": request.case_id, **row} for row in rows]
+        )
+        on_progress = lambda total, processed, skipped: progress.progress(total, processed, skipped)
 
     try:
-        zip_buffer = io.BytesIO(zip_contents)
-        with zipfile.ZipFile(zip_buffer) as zip_file:
-            slip_images = [
-                f for f in zip_file.namelist() 
-                if f.startswith('Slip/') and f.lower().endswith(('.png', '.jpg', '.jpeg')) and not f.endswith('/')
-            ]
+        # QR + OCR เป็นงานหนัก ให้รันใน inference executor เพื่อไม่ให้ block request อื่น
+        with zip_context:
+            results_filter, processed_count, skipped_count = await inference_executor.run(
+                extract_slip_texts, zip_file, request.case_id, on_rows, on_progress
+            )
+        for row in results_filter:
+            db_key = (request.case_id, request.evidence_id, row["image_hash"])
+            if db_key in ocr_db_keys:
+                continue
+            ocr_db_keys.add(db_key)
+            ocr_db.append(OcrResult(
+                evidence_id=request.evidence_id, 
+                case_id=request.case_id,
+                **row
+            ))
+        if progress is not None:
+            progress.stage("exporting")
+        # เขียนไฟล์ทีละแถวลงไฟล์ชั่วคราว (ไม่ต้องสร้างทั้งไฟล์ในหน่วยความจำ)
+        extension, content_type = EXPORT_FORMATS[request.export_format]
+        export_file, _ = await asyncio.to_thread(export_rows, results_filter, request.export_format)
 
-            print(slip_images)
-
-            if not slip_images:
-                raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No images found in the Slip folder.")
-
-            for image_path in slip_images:
-                image_data = zip_file.read(image_path)
-                image_name = os.path.basename(image_path)
-
-                # 1. ตรวจสอบ QR Code ก่อน
-                if not has_qr_code(image_data):
-                    logger.info(f"ข้ามรูปภาพที่ไม่มี QR code: {image_path}")
-                    skipped_count += 1
-                    continue  # ข้ามไปรูปถัดไป
-
-                # 2. ถ้ามี QR Code ค่อยปรับขนาดและทำ OCR
-                resized_image_data = resize_image(image_data)
-                ocr_text = read_ocr_from_image_data(resized_image_data)
-                if ocr_text:
-                    processed_count += 1
-                    filename = os.path.splitext(os.path.basename(image_path))[0]
-                    save_ocr_results(request.case_id, ocr_text, filename)
-                    results.append({image_name: ocr_text})
-                    paths.append({image_name: image_path})
-
-        ## นำค่าจากresult detect_bank และแสดงผลตามbank 
-        i = 0 
-        for item in results:
-            for key, text in item.items():
-                bank_name = detect_bank(text)
-                filename = key
-                row = {
-                    "file": filename,
-                    "bank": bank_name,
-                    "sender_name": "-",
-                    "sender_bank": "-",
-                    "sender_acc": "-",
-                    "receiver_name": "-",
-                    "receiver_bank": "-",
-                    "receiver_acc": "-",
-                    "amount": "-",
-                    "date": "-",
-                    "qr_code_text": "-"
-                }
-                if bank_name == 'scb':
-                    data = handle_scb(text,paths[i][key])
-                elif bank_name == 'krungthai':
-                    data = handle_krungthai(text,paths[i][key])
-                elif bank_name == 'kbank':
-                    data = handle_kbank(text,paths[i][key])
-                elif bank_name == 'bangkok':
-                    data = handle_bangkok(text,paths[i][key])
-                elif bank_name == 'gsb':
-                    data = handle_gsb(text,paths[i][key])
-                else:
-                    handle_unknown(text,paths[i][key])
-                    data = {}
-                # อัปเดตข้อมูลใน row ถ้ามี data คืนมา
-                if data:
-                    row.update(data)
-                print(row)
-
-                i += 1
-                results_filter.append(row)
-                ocr_db.append(OcrResult(
-                    evidence_id=request.evidence_id, 
-                    case_id=request.case_id,  # Use the counter as OCR ID
-                    **row
-                ))
-        df = pd.DataFrame(results_filter)
-        output_buffer = io.BytesIO()
-        df.to_excel(output_buffer, index=False, engine='openpyxl')
-        output_buffer.seek(0)
-
-        # อัปโหลดไฟล์ไปยัง Firebase
-        export_filename = f"ocr_results_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
-        firebae_url = await upload_file_to_storage(
-            file_bytes=output_buffer.getvalue(),
-            destination_path=f"ocr_results/{export_filename}",
-            content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-        )
+        # อัปโหลดไฟล์ไปยัง storage (ไฟล์ที่เนื้อหาเหมือนเดิมจะได้ URL เดิมโดยไม่อัปโหลดซ้ำ)
+        if progress is not None:
+            progress.stage("uploading")
+        export_filename = f"ocr_results_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}.{extension}"
+        with export_file:
+            firebae_url = await object_storage.put(
+                export_file,
+                f"ocr_results/{export_filename}",
+                content_type,
+            )
         # อัปเดต evidence ด้วย excel_url
         evidence = next((e for e in evidence_db if e.evidence_id == request.evidence_id), None)
         if evidence:
@@ -203,7 +431,7 @@ async def process_ocr(request: OcrRequest):
             logger.info(f"Updated evidence {request.evidence_id} with excel_url: {firebae_url}")
         else:
             logger.warning(f"Evidence with ID {request.evidence_id} not found")
-        if not results:
+        if not results_filter:
             detail_message = "Could not process any images. All images might contain QR codes or be unreadable."
             raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=detail_message)
 
@@ -216,6 +444,171 @@ async def process_ocr(request: OcrRequest):
     
     except zipfile.BadZipFile:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid ZIP file format.")
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"OCR processing failed: {e}")
-        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"An error occurred while processing OCR: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"An error occurred while processing OCR: {str(e)}")
+
+async def run_ocr_job(job: OcrJob, progress: OcrJobProgress) -> tuple[str, str]:
+    """runner ของ ocr_jobs: รันงาน OCR ที่อยู่ในคิว แล้วคืน (ข้อความสรุป, excel_url)"""
+    request = OcrRequest(
+        firebase_url=job.firebase_url,
+        case_id=job.case_id,
+        evidence_id=job.evidence_id,
+        export_format=job.export_format,
+    )
+    # ดาวน์โหลดครั้งเดียวต่องาน ถ้างานถูกลองใหม่เพราะ executor เต็มจะใช้ไฟล์เดิม (ocr_jobs ปิดไฟล์เมื่องานจบ)
+    if progress.zip_file is None:
+        progress.stage("downloading")
+        progress.zip_file = await object_storage.open_url(str(job.firebase_url))
+    response = await run_ocr_pipeline(request, progress, progress.zip_file)
+    return response.message, response.excel_url
+
+@router.get("/export", summary="Export OCR results as Excel, CSV or Parquet")
+async def export_ocr_results(
+    case_id: str | None = None,
+    evidence_id: int | None = None,
+    format: Literal["xlsx", "csv", "parquet"] = "xlsx",
+):
+    """
+    ส่งออกผล OCR ทั้งหมด (หรือเฉพาะคดี / evidence) เป็นไฟล์ตาม format
+    แถวถูกเขียนทีละแถวลงไฟล์ชั่วคราวแล้ว stream กลับทีละช่วง จึงใช้หน่วยความจำคงที่แม้มีหลายแสนแถว
+    """
+    rows = (
+        result.model_dump(exclude={"evidence_id", "case_id"})
+        for result in list(ocr_db)
+        if (case_id is None or result.case_id == case_id)
+        and (evidence_id is None or result.evidence_id == evidence_id)
+    )
+    extension, content_type = EXPORT_FORMATS[format]
+    export_file, count = await asyncio.to_thread(export_rows, rows, format)
+    logger.info(f"Exported {count} OCR results as {format}.")
+    filename = f"ocr_results_{case_id or 'all'}_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}.{extension}"
+    return StreamingResponse(
+        iter_file(export_file),
+        media_type=content_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+@router.get("/cases/{case_id}/reparse", summary="Re-parse the stored OCR text of a case")
+async def reparse_case_ocr_texts(case_id: str, format: Literal["xlsx", "csv", "parquet"] = "xlsx"):
+    """
+    แยกข้อมูลสลิปทั้งคดีใหม่จากข้อความ OCR ที่เก็บไว้ (ไม่ต้อง OCR ซ้ำ) แล้วส่งกลับเป็นไฟล์ตาม format
+    ใช้เมื่อ parser ถูกปรับปรุง ข้อความถูกอ่านจาก ocr_text_store ทีละชุด
+    """
+    extension, content_type = EXPORT_FORMATS[format]
+    export_file = await asyncio.to_thread(create_excel_from_ocr, ocr_text_store.iter_texts(case_id), format)
+    filename = f"ocr_reparsed_{case_id}_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}.{extension}"
+    return StreamingResponse(
+        iter_file(export_file),
+        media_type=content_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+@router.post(
+    "/process-ocr",
+    summary="Process OCR on images from Firebase URL",
+    response_model=OcrResponse,
+)
+async def process_ocr(request: OcrRequest):
+    """
+    รับ URL ของไฟล์ ZIP, ดึงรูปภาพจากโฟลเดอร์ Slip,
+    ตรวจสอบ QR Code ก่อน ถ้ามีจึงประมวลผล OCR และส่งคืนผลลัพธ์
+    """
+    return await run_ocr_pipeline(request)
+
+# --- งาน OCR แบบ background ---
+@router.post(
+    "/jobs",
+    summary="Submit an OCR job",
+    response_model=OcrJobCreated,
+    status_code=status.HTTP_202_ACCEPTED,
+)
+async def submit_ocr_job(request: OcrRequest):
+    """
+    รับงาน OCR เข้าคิวแล้วคืน job id ทันที (ไม่ต้องรอ OCR เสร็จ)
+    ติดตามสถานะที่ status_url และรับผลของแต่ละสลิปทันทีที่พร้อมที่ results_url
+    """
+    if not request.firebase_url:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Firebase URL is required.")
+    job = await asyncio.to_thread(
+        ocr_jobs.submit, request.case_id, request.evidence_id, request.firebase_url, request.export_format
+    )
+    return OcrJobCreated(
+        job_id=job.job_id,
+        status=job.status,
+        status_url=f"/v1/ocr/jobs/{job.job_id}",
+        results_url=f"/v1/ocr/jobs/{job.job_id}/results",
+    )
+
+def job_status(job: OcrJob) -> OcrJobStatus:
+    return OcrJobStatus(
+        job_id=job.job_id,
+        case_id=job.case_id,
+        evidence_id=job.evidence_id,
+        status=job.status,
+        stage=job.stage,
+        total=job.total,
+        processed=job.processed,
+        skipped=job.skipped,
+        eta_seconds=ocr_jobs.eta_seconds(job),
+        attempts=job.attempts,
+        message=job.message,
+        excel_url=job.excel_url,
+        error=job.error,
+        created_at=job.created_at,
+        started_at=job.started_at,
+        finished_at=job.finished_at,
+    )
+
+@router.get("/jobs/{job_id}", summary="Get OCR job status", response_model=OcrJobStatus)
+async def get_ocr_job(job_id: str):
+    """สถานะของงาน: ขั้นตอนปัจจุบัน จำนวนสลิปที่ประมวลผล / ข้ามแล้ว และเวลาที่คาดว่าจะเหลือ"""
+    job = await asyncio.to_thread(ocr_jobs.get, job_id)
+    if job is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="OCR job not found.")
+    return job_status(job)
+
+@router.get("/jobs/{job_id}/results", summary="Stream OCR job results")
+async def stream_ocr_job_results(
+    job_id: str,
+    format: Literal["ndjson", "sse"] = "ndjson",
+    after: int = 0,
+    last_event_id: int | None = Header(default=None),
+):
+    """
+    ส่งผล OCR ของแต่ละสลิป (รูปแบบเดียวกับ OcrResult) ทันทีที่พร้อม แล้วปิดด้วยสถานะสุดท้ายของงาน
+    - format=ndjson: หนึ่งบรรทัดต่อหนึ่ง JSON {"type": "result" | "status", ...}
+    - format=sse: Server-Sent Events (event: result / status) ต่อจากจุดเดิมได้ด้วย Last-Event-ID
+    after / Last-Event-ID คือ id ของผลสุดท้ายที่ได้รับแล้ว
+    """
+    if await asyncio.to_thread(ocr_jobs.get, job_id) is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="OCR job not found.")
+    last_id = last_event_id if last_event_id is not None else after
+
+    def encode(kind: str, payload: dict, event_id: int | None = None) -> str:
+        if format == "sse":
+            data = json.dumps(payload, ensure_ascii=False, default=str)
+            return (f"id: {event_id}\n" if event_id is not None else "") + f"event: {kind}\ndata: {data}\n\n"
+        return json.dumps({"type": kind, "id": event_id, **payload}, ensure_ascii=False, default=str) + "\n"
+
+    async def events():
+        nonlocal last_id
+        while True:
+            # อ่านสถานะก่อนผล: ถ้างานจบแล้วและไม่มีผลใหม่ แปลว่าส่งผลครบแล้ว
+            job = await asyncio.to_thread(ocr_jobs.get, job_id)
+            rows = await asyncio.to_thread(ocr_jobs.results_after, job_id, last_id)
+            for row in rows:
+                last_id = row.id
+                yield encode("result", json.loads(row.row_json), row.id)
+            if rows:
+                continue
+            if job is None or job.status in FINISHED_STATUSES:
+                if job is not None:
+                    yield encode("status", job_status(job).model_dump())
+                return
+            await ocr_jobs.wait_for_update(job_id)
+
+    media_type = "text/event-stream" if format == "sse" else "application/x-ndjson"
+    return StreamingResponse(events(), media_type=media_type, headers={"Cache-Control": "no-cache"})
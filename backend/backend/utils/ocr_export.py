@@ -0,0 +1,137 @@
+# utils/ocr_export.py
+"""
+ส่งออกผล OCR เป็น Excel / CSV / Parquet แบบ streaming
+เขียนทีละแถวลง SpooledTemporaryFile (เก็บในหน่วยความจำถึง OCR_EXPORT_SPOOL_MB แล้วย้ายไปไฟล์ชั่วคราวบนดิสก์)
+จึงใช้หน่วยความจำคงที่ไม่ว่าจะส่งออกกี่แถว แล้วอัปโหลดหรือ stream ไฟล์นั้นต่อได้ทันที
+"""
+
+import csv
+import io
+import itertools
+import os
+import tempfile
+from typing import BinaryIO, Iterable, Iterator
+
+from dotenv import load_dotenv
+from fastapi import HTTPException, status
+from openpyxl import Workbook
+
+load_dotenv()
+
+# คอลัมน์ตามลำดับของ OcrResult (row ที่ไม่มีบาง field จะเป็นค่าว่าง)
+OCR_EXPORT_COLUMNS = (
+    "file",
+    "bank",
+    "sender_name",
+    "sender_bank",
+    "sender_acc",
+    "receiver_name",
+    "receiver_bank",
+    "receiver_acc",
+    "amount",
+    "date",
+    "transaction_ref",
+    "qr_code_text",
+    "image_hash",
+)
+
+# format -> (นามสกุลไฟล์, content type)
+EXPORT_FORMATS = {
+    "xlsx": ("xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+    "csv": ("csv", "text/csv; charset=utf-8"),
+    "parquet": ("parquet", "application/vnd.apache.parquet"),
+}
+
+# ขนาดที่เก็บในหน่วยความจำก่อนย้ายไปดิสก์ และจำนวนแถวต่อ row group ของ Parquet
+SPOOL_MAX_SIZE = int(os.getenv("OCR_EXPORT_SPOOL_MB", "16")) * 1024 * 1024
+PARQUET_ROW_GROUP = 10_000
+STREAM_CHUNK_SIZE = 1024 * 1024
+
+
+def _values(row: dict, columns: tuple[str, ...]) -> list[str]:
+    return ["" if row.get(column) is None else str(row.get(column)) for column in columns]
+
+
+def _write_xlsx(rows: Iterable[dict], columns: tuple[str, ...], output: BinaryIO) -> int:
+    # write_only: openpyxl เขียนแต่ละแถวลงไฟล์ชั่วคราวทันทีแทนการเก็บทั้ง sheet ไว้ในหน่วยความจำ
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet("ocr_results")
+    sheet.append(list(columns))
+    count = 0
+    for row in rows:
+        sheet.append(_values(row, columns))
+        count += 1
+    workbook.save(output)
+    return count
+
+
+def _write_csv(rows: Iterable[dict], columns: tuple[str, ...], output: BinaryIO) -> int:
+    # utf-8-sig ให้ Excel เปิดภาษาไทยได้ถูกต้อง
+    text = io.TextIOWrapper(output, encoding="utf-8-sig", newline="")
+    writer = csv.writer(text)
+    writer.writerow(columns)
+    count = 0
+    for row in rows:
+        writer.writerow(_values(row, columns))
+        count += 1
+    text.flush()
+    text.detach()
+    return count
+
+
+def _write_parquet(rows: Iterable[dict], columns: tuple[str, ...], output: BinaryIO) -> int:
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        # format ถูกต้องแต่เซิร์ฟเวอร์นี้ไม่ได้ติดตั้ง extra "parquet" (pyarrow)
+        raise HTTPException(
+            status_code=status.HTTP_501_NOT_IMPLEMENTED,
+            detail="Parquet export requires pyarrow, which is not installed on this server. Choose xlsx / csv.",
+        )
+
+    schema = pa.schema([(column, pa.string()) for column in columns])
+    count = 0
+    with pq.ParquetWriter(output, schema) as writer:
+        rows = iter(rows)
+        while batch := list(itertools.islice(rows, PARQUET_ROW_GROUP)):
+            values = [_values(row, columns) for row in batch]
+            writer.write_table(
+                pa.table({column: [row[i] for row in values] for i, column in enumerate(columns)}, schema=schema)
+            )
+            count += len(batch)
+    return count
+
+
+_WRITERS = {"xlsx": _write_xlsx, "csv": _write_csv, "parquet": _write_parquet}
+
+
+def export_rows(
+    rows: Iterable[dict], export_format: str = "xlsx", columns: tuple[str, ...] = OCR_EXPORT_COLUMNS
+) -> tuple[tempfile.SpooledTemporaryFile, int]:
+    """
+    เขียน rows (list หรือ generator) ลงไฟล์ชั่วคราวตาม export_format (xlsx / csv / parquet)
+    คืนค่า (ไฟล์ที่ seek กลับไปต้นไฟล์แล้ว, จำนวนแถว) ผู้เรียกต้องปิดไฟล์เองเมื่อใช้เสร็จ
+    """
+    if export_format not in _WRITERS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unsupported export format '{export_format}'. Use one of: {', '.join(_WRITERS)}.",
+        )
+    output = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+    try:
+        count = _WRITERS[export_format](rows, columns, output)
+    except BaseException:
+        output.close()
+        raise
+    output.seek(0)
+    return output, count
+
+
+def iter_file(file: BinaryIO, chunk_size: int = STREAM_CHUNK_SIZE) -> Iterator[bytes]:
+    """อ่านไฟล์ทีละช่วงสำหรับ StreamingResponse แล้วปิดไฟล์เมื่อส่งครบ"""
+    try:
+        while chunk := file.read(chunk_size):
+            yield chunk
+    finally:
+        file.close()
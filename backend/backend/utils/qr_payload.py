@@ -0,0 +1,135 @@
+# utils/qr_payload.py
+"""
+แยกข้อมูลจาก QR Code บนสลิปโอนเงินของธนาคารไทย (รูปแบบ TLV ตามมาตรฐาน EMVCo)
+- QR ตรวจสอบสลิป (slip verification): tag 00 = [00 API ID, 01 รหัสธนาคารผู้โอน, 02 เลขอ้างอิงรายการ],
+  tag 51 = ประเทศ (TH), tag 91 = CRC
+- PromptPay: tag 29 = บัญชีพร้อมเพย์ปลายทาง (เบอร์โทร / เลขบัตร / e-wallet), tag 30 = bill payment,
+  tag 54 = จำนวนเงิน, tag 63 = CRC
+"""
+
+# รหัสธนาคาร (ตาม ธปท.) -> (key ที่ใช้ใน detect_bank, ชื่อธนาคาร)
+BANK_CODES = {
+    "002": ("bangkok", "ธนาคารกรุงเทพ"),
+    "004": ("kbank", "ธนาคารกสิกรไทย"),
+    "006": ("krungthai", "ธนาคารกรุงไทย"),
+    "011": ("ttb", "ธนาคารทหารไทยธนชาต"),
+    "014": ("scb", "ธนาคารไทยพาณิชย์"),
+    "022": ("cimb", "ธนาคารซีไอเอ็มบี ไทย"),
+    "024": ("uob", "ธนาคารยูโอบี"),
+    "025": ("bay", "ธนาคารกรุงศรีอยุธยา"),
+    "030": ("gsb", "ธนาคารออมสิน"),
+    "033": ("ghb", "ธนาคารอาคารสงเคราะห์"),
+    "034": ("baac", "ธนาคารเพื่อการเกษตรและสหกรณ์การเกษตร"),
+    "065": ("ttb", "ธนาคารทหารไทยธนชาต"),
+    "066": ("ibank", "ธนาคารอิสลามแห่งประเทศไทย"),
+    "067": ("tisco", "ธนาคารทิสโก้"),
+    "069": ("kkp", "ธนาคารเกียรตินาคินภัทร"),
+    "071": ("tcrb", "ธนาคารไทยเครดิต"),
+    "073": ("lhb", "ธนาคารแลนด์ แอนด์ เฮ้าส์"),
+}
+
+PROMPTPAY_AID = "A000000677010111"
+PROMPTPAY_BILL_AID = "A000000677010112"
+
+
+def crc16_ccitt(data: str) -> str:
+    """CRC-16/CCITT-FALSE (poly 0x1021, init 0xFFFF) ที่ใช้ใน QR มาตรฐาน EMVCo คืนค่าเป็น hex 4 ตัว"""
+    crc = 0xFFFF
+    for byte in data.encode("utf-8"):
+        crc ^= byte << 8
+        for _ in range(8):
+            crc = ((crc << 1) ^ 0x1021) if crc & 0x8000 else crc << 1
+            crc &= 0xFFFF
+    return f"{crc:04X}"
+
+
+def parse_tlv(payload: str) -> dict[str, str]:
+    """แยก payload รูปแบบ tag(2) + length(2) + value ออกเป็น dict (ValueError ถ้ารูปแบบไม่ถูกต้อง)"""
+    fields = {}
+    pos = 0
+    while pos < len(payload):
+        tag, length = payload[pos : pos + 2], payload[pos + 2 : pos + 4]
+        if len(tag) < 2 or not length.isdigit():
+            raise ValueError(f"Invalid TLV at position {pos}.")
+        end = pos + 4 + int(length)
+        if end > len(payload):
+            raise ValueError(f"TLV tag {tag} overruns the payload.")
+        fields[tag] = payload[pos + 4 : end]
+        pos = end
+    return fields
+
+
+def _crc_matches(payload: str, crc_tag: str, fields: dict[str, str]) -> bool:
+    # CRC คำนวณจากข้อความทั้งหมดจนถึง tag + length ของ CRC (ตัว CRC อยู่ท้ายสุดเสมอ)
+    expected = fields.get(crc_tag)
+    return expected is not None and crc16_ccitt(payload[:-4]) == expected.upper()
+
+
+def _promptpay_target(value: str) -> str:
+    # เบอร์โทรถูกเก็บเป็น 0066 + เบอร์ไม่มีเลข 0 นำหน้า
+    if len(value) == 13 and value.startswith("0066"):
+        return "0" + value[4:]
+    return value
+
+
+def parse_slip_qr(payload: str | None) -> dict | None:
+    """
+    แยกข้อมูลจาก QR บนสลิปเป็น field เดียวกับ OcrResult
+    คืนค่า None ถ้าไม่ใช่ QR ที่รู้จัก หรือ CRC ไม่ถูกต้อง
+    """
+    if not payload:
+        return None
+    payload = payload.strip()
+    try:
+        fields = parse_tlv(payload)
+    except ValueError:
+        return None
+
+    # QR ตรวจสอบสลิปของธนาคาร
+    if "00" in fields and fields.get("51") == "TH" and "91" in fields:
+        if not _crc_matches(payload, "91", fields):
+            return None
+        try:
+            sub = parse_tlv(fields["00"])
+        except ValueError:
+            return None
+        bank_code = sub.get("01", "")
+        bank, bank_name = BANK_CODES.get(bank_code, ("unknown", "ไม่ทราบธนาคาร"))
+        return {
+            "qr_type": "slip_verification",
+            "bank": bank,
+            "bank_code": bank_code,
+            "sender_bank": bank_name,
+            "transaction_ref": sub.get("02", "-"),
+            "qr_code_text": payload,
+        }
+
+    # QR พร้อมเพย์ (EMVCo merchant-presented)
+    if fields.get("00") == "01" and ("29" in fields or "30" in fields) and "63" in fields:
+        if not _crc_matches(payload, "63", fields):
+            return None
+        try:
+            if "29" in fields:
+                account = parse_tlv(fields["29"])
+                if account.get("00") != PROMPTPAY_AID:
+                    return None
+                target = next((account[t] for t in ("01", "02", "03") if t in account), "-")
+                reference = "-"
+            else:
+                account = parse_tlv(fields["30"])
+                if account.get("00") != PROMPTPAY_BILL_AID:
+                    return None
+                target = account.get("01", "-")
+                reference = account.get("02", "-")
+        except ValueError:
+            return None
+        return {
+            "qr_type": "promptpay",
+            "receiver_bank": "พร้อมเพย์",
+            "receiver_acc": _promptpay_target(target),
+            "amount": fields.get("54", "-"),
+            "transaction_ref": reference,
+            "qr_code_text": payload,
+        }
+
+    return None
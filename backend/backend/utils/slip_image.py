@@ -0,0 +1,94 @@
+# utils/slip_image.py
+import os
+
+import cv2
+import numpy as np
+from dotenv import load_dotenv
+from pyzbar.pyzbar import ZBarSymbol, decode
+
+load_dotenv()
+
+# ขนาดด้านยาวสุดของภาพที่ส่งเข้า OCR (ภาพสลิปจากมือถือมักใหญ่เกินจำเป็น)
+OCR_MAX_SIZE = 1600
+# ขนาดด้านยาวสุดของภาพในรอบแรกของการหา QR Code (0 = อ่านจากภาพความละเอียดเต็มอย่างเดียว)
+QR_FAST_MAX_SIZE = int(os.getenv("QR_FAST_MAX_SIZE", "800"))
+# เพิ่มค่านี้เมื่อแก้วิธีหา QR Code ผล "ไม่มี QR" ที่ cache ไว้จาก detector รุ่นเก่าจะถูกตรวจใหม่
+QR_DETECTOR_VERSION = "2"
+
+
+def detect_qr_codes(gray: np.ndarray, fast_max_size: int = QR_FAST_MAX_SIZE) -> list:
+    """
+    หา QR Code ในภาพขาวดำ
+    - อ่านเฉพาะ QRCODE (ไม่ต้องลอง barcode ชนิดอื่นทุกชนิดเหมือน decode ปกติ)
+    - ลองจากภาพที่ย่อให้ด้านยาวไม่เกิน fast_max_size ก่อน (QR บนสลิปมีขนาดใหญ่พอ)
+      ถ้าไม่พบจึงอ่านจากภาพความละเอียดเต็ม จึงไม่พลาด QR ขนาดเล็ก
+    ตำแหน่ง (rect / polygon) ของผลจากภาพที่ย่อเป็นพิกัดของภาพที่ย่อ ระบบใช้เฉพาะ data
+    """
+    symbols = [ZBarSymbol.QRCODE]
+    height, width = gray.shape[:2]
+    if fast_max_size and max(height, width) > fast_max_size:
+        scale = fast_max_size / max(height, width)
+        small = cv2.resize(
+            gray,
+            (max(1, round(width * scale)), max(1, round(height * scale))),
+            interpolation=cv2.INTER_AREA,
+        )
+        codes = decode(small, symbols=symbols)
+        if codes:
+            return codes
+    return decode(gray, symbols=symbols)
+
+
+class SlipImage:
+    """
+    ภาพสลิปที่ decode เพียงครั้งเดียว แล้วใช้ร่วมกันทุกขั้นตอน
+    - gray: ภาพขาวดำความละเอียดเต็ม สำหรับอ่าน QR Code
+    - ocr_image: ภาพสี RGB ที่ย่อให้ด้านยาวไม่เกิน max_size สำหรับ EasyOCR
+    - qr_codes: ผลอ่าน QR Code จาก detect_qr_codes (อ่านครั้งแรกที่เรียกใช้ แล้วใช้ซ้ำทั้งตอนคัดสลิปและตอนอ่านข้อมูลใน QR)
+    - qr_error: exception ถ้าอ่าน QR ไม่สำเร็จ (เช่นไม่มี libzbar) ซึ่ง qr_codes จะว่างแต่ไม่ได้แปลว่าภาพไม่มี QR
+    """
+
+    def __init__(self, image: np.ndarray, max_size: int = OCR_MAX_SIZE):
+        # image เป็นภาพสี BGR แบบที่ cv2.imdecode คืนมา
+        self.gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+
+        height, width = image.shape[:2]
+        scale = max_size / max(height, width)
+        if scale < 1:
+            image = cv2.resize(
+                image,
+                (max(1, round(width * scale)), max(1, round(height * scale))),
+                interpolation=cv2.INTER_AREA,
+            )
+        # EasyOCR แปลง bytes เป็น RGB ก่อนตรวจหาข้อความ จึงเก็บเป็น RGB ให้ได้ผลเหมือนเดิม
+        self.ocr_image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+        self._qr_codes = None
+        self.qr_error: Exception | None = None
+
+    @classmethod
+    def from_bytes(cls, image_data: bytes, max_size: int = OCR_MAX_SIZE) -> "SlipImage":
+        image = cv2.imdecode(np.frombuffer(image_data, np.uint8), cv2.IMREAD_COLOR)
+        if image is None:
+            raise ValueError("Cannot decode image data.")
+        return cls(image, max_size=max_size)
+
+    @property
+    def qr_codes(self) -> list:
+        if self._qr_codes is None:
+            try:
+                self._qr_codes = detect_qr_codes(self.gray)
+            except Exception as e:
+                self.qr_error = e
+                self._qr_codes = []
+        return self._qr_codes
+
+    @property
+    def has_qr_code(self) -> bool:
+        return len(self.qr_codes) > 0
+
+    @property
+    def qr_text(self) -> str | None:
+        """ข้อความใน QR Code แรก (ถ้ามี)"""
+        if not self.qr_codes:
+            return None
+        return self.qr_codes[0].data.decode("utf-8", errors="replace")
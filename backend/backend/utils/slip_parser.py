@@ -0,0 +1,247 @@
+# utils/slip_parser.py
+"""
+แยกข้อมูลจากข้อความ OCR ของสลิปแต่ละธนาคาร
+- regex ทั้งหมด compile ครั้งเดียวตอน import
+- ระบุธนาคารและเลือก parser ด้วยตาราง (_BANK_RULES, BANK_PARSERS)
+- คำระบุธนาคารและคำที่ใช้ตัดช่วงข้อความถูกหาตำแหน่งในการสแกนรอบเดียว (KEYWORD_SCANNER)
+  สแกนเฉพาะเมื่อคำแรกของข้อความไม่บอกธนาคาร หรือ parser ต้องตัดช่วงข้อความ (regex ของ field ค้นทั้งข้อความตามเดิม)
+- parser เป็น pure function คืนค่า SlipRecord ไม่มีการ print
+ให้ผลเหมือน handle_* เดิมที่เก็บไว้ใน bench_slip_parser_legacy.py (ยกเว้น qr_code_text ซึ่งไม่ได้มาจากข้อความ)
+"""
+
+import re
+from dataclasses import dataclass, fields
+from typing import Callable, Iterable
+
+from .keyword_scanner import KeywordHits, KeywordScanner
+
+# เพิ่มค่านี้เมื่อแก้ parser ผลที่ cache ไว้จาก parser รุ่นเก่าจะถูกแยกใหม่จากข้อความ OCR ที่เก็บไว้ (ไม่ต้อง OCR ซ้ำ)
+PARSER_VERSION = "1"
+
+_THAI = r"\u0E00-\u0E7F"
+_TITLES = r"น\.ส\.|นางสาว|นาย|นาง"
+_TITLE = rf"(?:{_TITLES})"
+_AMOUNT = re.compile(r"จำนวนเงิน\s*(\d{1,3}(?:,\d{3})*(?:\.\d{2})?)")
+
+
+@dataclass(slots=True)
+class SlipRecord:
+    """ข้อมูลที่แยกได้จากสลิปหนึ่งใบ (ค่า "-" = ไม่ได้แยก เช่น ธนาคารที่ไม่รู้จัก)"""
+
+    bank: str
+    sender_name: str = "-"
+    sender_bank: str = "-"
+    sender_acc: str = "-"
+    receiver_name: str = "-"
+    receiver_bank: str = "-"
+    receiver_acc: str = "-"
+    amount: str = "-"
+    date: str = "-"
+
+    def as_dict(self) -> dict:
+        return {field.name: getattr(self, field.name) for field in fields(self)}
+
+
+def _group(pattern: re.Pattern, text: str, default: str, group: int = 1, strip: bool = False) -> str:
+    match = pattern.search(text)
+    if not match:
+        return default
+    value = match.group(group)
+    return value.strip() if strip else value
+
+
+# --- SCB ---
+_SCB_DATE = re.compile(r"โอนเงินสำเร็จ(.*?)รหัสอ้างอิง", re.DOTALL)
+_SCB_SENDER_NAME = re.compile(rf"จาก\s*([{_THAI}]+\s[{_THAI}]+\s?[{_THAI}]+)")
+_SCB_SENDER_ACC = re.compile(r"((?:x{1,3}[\s-]?){1,2}\d{3,4}-?\d?)")
+_SCB_RECEIVER_NAME = re.compile(rf"ไปยัง\s*((?:[นสย]\.?\s*)?(?:[{_THAI}\.]+(?:\s+[{_THAI}]+)*))")
+_SCB_RECEIVER_ACC = re.compile(r"ไปยัง.*?((?:x{1,3}[\s-]?){1,2}\d{3,4}-?\d?)")
+
+
+def parse_scb(text: str, lower: str) -> SlipRecord:
+    return SlipRecord(
+        bank="scb",
+        sender_name=_group(_SCB_SENDER_NAME, text, "ไม่พบชื่อผู้โอน"),
+        sender_bank="ไทยพาณิชย์",
+        sender_acc=_group(_SCB_SENDER_ACC, lower, "ไม่พบเลขบัญชี"),
+        receiver_name=_group(_SCB_RECEIVER_NAME, text, "ไม่พบชื่อผู้รับ", strip=True),
+        receiver_bank="ไม่ระบุ",  # SCB slip มักไม่มีชื่อธนาคารผู้รับ
+        receiver_acc=_group(_SCB_RECEIVER_ACC, lower, "ไม่พบเลขบัญชีผู้รับ"),
+        amount=_group(_AMOUNT, text, "ไม่พบจำนวนเงิน"),
+        date=_group(_SCB_DATE, text, "ไม่พบวันที่", strip=True),
+    )
+
+
+# --- กรุงไทย ---
+_KTB_DATE = re.compile(r"วันที่ทำรายการ\s+(\d{1,2}\s[ก-ฮ]{1,5}\.[ก-ฮ]{1,5}\.\s\d{4}\s\d{2}:\d{2})", re.DOTALL)
+_KTB_SENDER_NAME = re.compile(rf"จาก\s*((?:[นสย]\.?\s*)?(?:[{_THAI}\.]+))")
+_KTB_SENDER_BANK = re.compile(rf"จาก\s+[{_THAI}\s.]+?\s+([{_THAI}]+)")
+_KTB_ACC = re.compile(r"(?:x{1,3}[\s-]?){1,2}\d{3,4}-?\d?")
+_KTB_RECEIVER_NAME = re.compile(rf"ไปยัง\s*({_TITLE}?\s*[{_THAI}]+(?:\s[{_THAI}]+)?)")
+_KTB_RECEIVER_BANK = re.compile(
+    rf"ไปยัง\s+[{_THAI}\s.]+?\s+([{_THAI}]+)?\s+([{_THAI}]+)?\s+([{_THAI}]+)"
+)
+
+
+def parse_krungthai(text: str, lower: str) -> SlipRecord:
+    hits = KEYWORD_SCANNER.scan(text, lower)
+    sender_segment = hits.segment(text, "จาก", "ไปยัง")
+    receiver_segment = hits.segment(text, "ไปยัง", "จำนวน")
+    return SlipRecord(
+        bank="krungthai",
+        sender_name=_group(_KTB_SENDER_NAME, sender_segment, "ไม่พบชื่อผู้โอน", strip=True),
+        sender_bank=_group(_KTB_SENDER_BANK, sender_segment, "ไม่พบชื่อธนาคารผู้โอน"),
+        sender_acc=_group(_KTB_ACC, sender_segment.lower(), "ไม่พบเลขบัญชี", group=0),
+        receiver_name=_group(_KTB_RECEIVER_NAME, receiver_segment, "ไม่พบชื่อผู้รับ", strip=True),
+        receiver_bank=_group(_KTB_RECEIVER_BANK, receiver_segment, "ไม่พบชื่อธนาคารผู้รับ", group=3),
+        receiver_acc=_group(_KTB_ACC, receiver_segment.lower(), "ไม่พบเลขบัญชี", group=0),
+        amount=_group(_AMOUNT, text, "ไม่พบจำนวนเงิน"),
+        date=_group(_KTB_DATE, text, "ไม่พบวันที่", strip=True),
+    )
+
+
+# --- ออมสิน ---
+_GSB_SENDER_NAME = re.compile(rf"จาก\s+([นาย|นาง|น.ส.|นางสาว]*[{_THAI}\s]+?)\s+ธนาคารออมสิน")
+_GSB_DATE = re.compile(
+    r"รหัสอ้างอิง:\s+(\d{10,20}[^\w\d]?\d{5,20})\s+(\d{1,2}[ก-ฮ]{1,5}\.[ก-ฮ]{1,5}\.\s\d{4}\s\d{2}:\d{2})",
+    re.DOTALL,
+)
+_GSB_SENDER_ACC = re.compile(r"ธนาคารออมสิน\s+(\d{4}x{4,}[\d]+)")
+_GSB_RECEIVER_NAME = re.compile(
+    rf"ถึง\s+([นาย|นาง|น\.ส\.|นางสาว]*[{_THAI}\s.]+?)\s+(?:เติมเงิน)?\s*(?:พร้อมเพย์|พร้อมจ่าย)"
+)
+_GSB_RECEIVER_BANK = re.compile(r"(เติมเงิน)?\s*(พร้อมเพย์|พร้อมจ่าย)")
+_GSB_RECEIVER_ACC = re.compile(r"(?:พร้อมเพย์|พร้อมจ่าย)[\s\w]*?(\d{4}x{4,}[\d]+)")
+
+
+def parse_gsb(text: str, lower: str) -> SlipRecord:
+    return SlipRecord(
+        bank="gsb",
+        sender_name=_group(_GSB_SENDER_NAME, text, "ไม่พบชื่อผู้โอน", strip=True),
+        sender_bank="ธนาคารออมสิน",
+        sender_acc=_group(_GSB_SENDER_ACC, text, "ไม่พบเลขบัญชีผู้โอน"),
+        receiver_name=_group(_GSB_RECEIVER_NAME, text, "ไม่พบชื่อผู้รับ", strip=True),
+        receiver_bank=_group(_GSB_RECEIVER_BANK, text, "ไม่พบช่องทางผู้รับ", group=0, strip=True),
+        receiver_acc=_group(_GSB_RECEIVER_ACC, text, "ไม่พบเลขบัญชีผู้รับ"),
+        amount=_group(_AMOUNT, text, "ไม่พบจำนวนเงิน"),
+        date=_group(_GSB_DATE, text, "ไม่พบวันที่", group=2, strip=True),
+    )
+
+
+# --- กสิกรไทย ---
+_KBANK_NAME = re.compile(rf"{_TITLE}\s*[{_THAI}]+\s[{_THAI}\.]+")
+_KBANK_DATE = re.compile(r"โอนเงินสำเร็จ(.*?น.)", re.DOTALL)
+_KBANK_ACC = re.compile(r"(?:x{1,3}[\s\-]?){1,3}\d{3,4}-?(?:\d|x)?")
+_KBANK_AMOUNT = re.compile(r"จำนวน:\s*([\d,]+\.\d{2})")
+
+
+def parse_kbank(text: str, lower: str) -> SlipRecord:
+    # ชื่อ/เลขบัญชีแรกเป็นของผู้โอน ตัวที่สองเป็นของผู้รับ
+    names = _KBANK_NAME.findall(text)
+    accounts = _KBANK_ACC.findall(lower)
+    return SlipRecord(
+        bank="kbank",
+        sender_name=names[0] if names else "ไม่พบชื่อผู้โอน",
+        sender_bank="ธนาคารกสิกรไทย",
+        sender_acc=accounts[0] if accounts else "ไม่พบเลขบัญชีผู้โอน",
+        receiver_name=names[1] if len(names) > 1 else "ไม่พบชื่อผู้รับ",
+        receiver_bank="ธ.กสิกรไทย" if text.count("ธ.กสิกรไทย") > 1 else "ไม่พบชื่อธนาคารผู้รับ",
+        receiver_acc=accounts[1] if len(accounts) > 1 else "ไม่พบเลขบัญชีผู้รับ",
+        amount=_group(_KBANK_AMOUNT, text, "ไม่พบจำนวนเงิน"),
+        date=_group(_KBANK_DATE, text, "ไม่พบวันที่", strip=True),
+    )
+
+
+# --- กรุงเทพ ---
+_BBL_SENDER_NAME = re.compile(rf"จาก\s+({_TITLES})\s*([{_THAI}]+)")
+_BBL_DATE = re.compile(r"รายการสำเร็จ(.*?)จำนวนเงิน", re.DOTALL)
+_BBL_SENDER_ACC = re.compile(r"จาก.*?(\d{3}-\d(?:[\s\-]?[x\d]{3,6}))")
+_BBL_RECEIVER_NAME = re.compile(rf"ไปที่.*?({_TITLES})?\s*([{_THAI}\s]+?)\s+\d{{3}}")
+_BBL_RECEIVER_ACC = re.compile(r"จาก.*?(\d{3}-\d(?:[\s\-]?[x]{1,3}){0,2}[\s\-]?\d{2,4})")
+_BBL_RECEIVER_BANK = re.compile(rf"ไปที่.*?(ธนาคาร[{_THAI}]+)")
+
+
+def parse_bangkok(text: str, lower: str) -> SlipRecord:
+    sender = _BBL_SENDER_NAME.search(text)
+    receiver = _BBL_RECEIVER_NAME.search(text)
+    receiver_bank = _group(_BBL_RECEIVER_BANK, text, "")
+    if not receiver_bank:
+        receiver_bank = "พร้อมเพย์" if "พร้อมเพย์" in text else "ไม่พบชื่อธนาคารผู้รับ"
+    return SlipRecord(
+        bank="bangkok",
+        sender_name=f"{sender.group(1)} {sender.group(2)}" if sender else "ไม่พบชื่อผู้โอน",
+        sender_bank="กรุงเทพ",
+        sender_acc=_group(_BBL_SENDER_ACC, lower, "ไม่พบเลขบัญชี"),
+        receiver_name=(
+            f"{receiver.group(1)} {receiver.group(2).strip()}" if receiver else "ไม่พบชื่อผู้รับ"
+        ),
+        receiver_bank=receiver_bank,
+        receiver_acc=_group(_BBL_RECEIVER_ACC, lower, "ไม่พบเลขบัญชีผู้รับ"),
+        amount=_group(_AMOUNT, text, "ไม่พบจำนวนเงิน"),
+        date=_group(_BBL_DATE, text, "ไม่พบวันที่", strip=True),
+    )
+
+
+BANK_PARSERS: dict[str, Callable[[str, str], SlipRecord]] = {
+    "scb": parse_scb,
+    "krungthai": parse_krungthai,
+    "kbank": parse_kbank,
+    "bangkok": parse_bangkok,
+    "gsb": parse_gsb,
+}
+
+# กฎระบุธนาคาร ตรวจตามลำดับ: (ธนาคาร, คำแรกของข้อความ, คำที่ต้องมีในข้อความ, (คำที่ต้องมี, regex ที่ตรวจต่อ))
+# (regex เดิมของ kbank ต้องมีคำว่า กสิกรไทย อยู่แล้วจึงไม่ต้องตรวจแยก)
+_BANK_RULES: tuple[tuple[str, str | None, tuple[str, ...], tuple[str, re.Pattern] | None], ...] = (
+    ("scb", "scb", (), None),
+    ("krungthai", "krungthai", (), None),
+    ("gsb", None, ("ธนาคารออมสิน",), ("gsb", re.compile(r"\bgsb\b"))),
+    ("kbank", None, ("กสิกรไทย", "kbank", "k+", "ake"), None),
+    ("bangkok", "bangkok", (), None),
+)
+
+# คำที่ parser ใช้ตัดช่วงข้อความ (hits.segment)
+SEGMENT_ANCHORS = ("จาก", "ไปยัง", "จำนวน")
+
+# คำในชุดนี้ไม่ซ้อนกันเอง (kbank / k+ ที่ขึ้นต้นเหมือนกันเป็นธนาคารเดียวกัน) จึงสแกนแบบไม่ overlap ได้
+KEYWORD_SCANNER = KeywordScanner(
+    SEGMENT_ANCHORS
+    + tuple(keyword for _, _, keywords, _ in _BANK_RULES for keyword in keywords)
+    + tuple(check[0] for _, _, _, check in _BANK_RULES if check),
+    overlapping=False,
+)
+
+
+def detect_bank(text: str, lower: str | None = None, hits: KeywordHits | None = None) -> str:
+    """ระบุธนาคารจากข้อความ OCR (ผลเหมือน detect_bank เดิม)"""
+    lower = text.lower() if lower is None else lower
+    words = lower.split(maxsplit=1)
+    first_word = words[0] if words else None
+    for bank, first, keywords, check in _BANK_RULES:
+        if first is not None and first_word == first:
+            return bank
+        if hits is None and (keywords or check):
+            # สแกนเมื่อถึงกฎแรกที่ต้องใช้คำในข้อความ (ข้อความที่ขึ้นต้นด้วยชื่อธนาคารไม่ต้องสแกน)
+            hits = KEYWORD_SCANNER.scan(text, lower)
+        if any(keyword in hits for keyword in keywords):
+            return bank
+        if check is not None and check[0] in hits and check[1].search(lower):
+            return bank
+    return "unknown"
+
+
+def parse_text(text: str, bank: str | None = None) -> SlipRecord:
+    """แยกข้อมูลสลิปหนึ่งใบ bank=None จะระบุธนาคารจากข้อความ"""
+    lower = text.lower()
+    bank = bank or detect_bank(text, lower)
+    parser = BANK_PARSERS.get(bank)
+    if parser is None:
+        return SlipRecord(bank=bank)
+    return parser(text, lower)
+
+
+def parse_many(texts: Iterable[str], banks: Iterable[str | None] | None = None) -> list[SlipRecord]:
+    """แยกข้อมูลสลิปหลายใบในครั้งเดียว (banks ระบุธนาคารของแต่ละใบได้ เช่น จาก QR)"""
+    texts = list(texts)
+    banks = list(banks) if banks is not None else [None] * len(texts)
+    return [parse_text(text, bank) for text, bank in zip(texts, banks)]
@@ -0,0 +1,153 @@
+# utils/zip_ingest.py
+"""
+อ่านไฟล์ ZIP ที่ผู้ใช้ส่งมาแบบทีละไฟล์ พร้อมจำกัดขนาดและกัน zip bomb
+- ไฟล์ที่อัปโหลดถูก spool ลงดิสก์อยู่แล้ว (UploadFile ของ Starlette) จึงเปิดเป็น ZIP ได้ตรงๆ โดยไม่ต้อง read() ทั้งไฟล์
+- ก่อนอ่านตรวจจำนวนไฟล์ ขนาดที่ประกาศไว้ และอัตราการบีบอัดของแต่ละไฟล์
+- ระหว่างอ่านนับขนาดจริง ถ้าไม่ตรงกับที่ประกาศไว้หรือเกินขีดจำกัดจะหยุดทันที
+- ภาพถูกคืนทีละไฟล์ (หรือทีละชุดด้วย iter_batches) เพื่อส่งเข้าโมเดลโดยไม่ต้องเก็บทั้ง ZIP ไว้ในหน่วยความจำ
+"""
+
+import asyncio
+import os
+import zipfile
+import zlib
+from itertools import islice
+from typing import AsyncIterator, BinaryIO, Iterator
+
+from dotenv import load_dotenv
+from fastapi import HTTPException, UploadFile, status
+
+load_dotenv()
+
+_MB = 1024 * 1024
+# ขีดจำกัดต่อ request
+MAX_UPLOAD_BYTES = int(os.getenv("INGEST_MAX_UPLOAD_MB", "2048")) * _MB
+MAX_MEMBERS = int(os.getenv("INGEST_MAX_MEMBERS", "20000"))
+MAX_MEMBER_BYTES = int(os.getenv("INGEST_MAX_MEMBER_MB", "50")) * _MB
+MAX_TOTAL_BYTES = int(os.getenv("INGEST_MAX_TOTAL_MB", "8192")) * _MB
+# ขนาดจริง / ขนาดที่บีบอัด ของไฟล์หนึ่ง (ภาพ JPEG / PNG ปกติแทบไม่ถึง 2)
+MAX_COMPRESSION_RATIO = float(os.getenv("INGEST_MAX_COMPRESSION_RATIO", "100"))
+# ไฟล์เล็กกว่านี้ไม่ตรวจอัตราการบีบอัด (ไฟล์เล็กๆ บีบอัดได้มากเป็นเรื่องปกติ)
+_RATIO_MIN_BYTES = _MB
+# จำนวนภาพต่อชุดที่ส่งเข้า classifier
+INGEST_BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", "32"))
+_READ_CHUNK = _MB
+
+
+def _too_large(detail: str) -> HTTPException:
+    return HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=detail)
+
+
+def _invalid(detail: str) -> HTTPException:
+    return HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=detail)
+
+
+def open_upload(file: UploadFile, max_bytes: int = MAX_UPLOAD_BYTES) -> BinaryIO:
+    """คืนไฟล์ที่อัปโหลด (spool อยู่บนดิสก์แล้ว) ที่ seek ไปต้นไฟล์ หลังตรวจว่าไม่เกิน max_bytes"""
+    upload = file.file
+    size = file.size
+    if size is None:
+        upload.seek(0, os.SEEK_END)
+        size = upload.tell()
+    if size > max_bytes:
+        raise _too_large(f"The uploaded file is larger than {max_bytes // _MB} MB.")
+    upload.seek(0)
+    return upload
+
+
+class ZipImageReader:
+    """
+    เปิด ZIP แล้วเลือกไฟล์ภาพ (ตามนามสกุล และโฟลเดอร์ prefix ถ้าระบุ) โดยไม่อ่านเนื้อหา
+    names คือรายชื่อภาพตามลำดับใน ZIP, วนลูป reader เพื่อได้ (ชื่อไฟล์, bytes) ทีละภาพ
+    ZIP ที่เสียหรือผิดปกติ -> HTTPException 400, เกินขีดจำกัด -> 413
+    """
+
+    def __init__(
+        self,
+        source: BinaryIO,
+        extensions: tuple[str, ...],
+        prefix: str = "",
+        max_members: int = MAX_MEMBERS,
+        max_member_bytes: int = MAX_MEMBER_BYTES,
+        max_total_bytes: int = MAX_TOTAL_BYTES,
+        max_ratio: float = MAX_COMPRESSION_RATIO,
+    ):
+        self.max_member_bytes = max_member_bytes
+        self.max_total_bytes = max_total_bytes
+        self.max_ratio = max_ratio
+        try:
+            self._zip = zipfile.ZipFile(source)
+        except zipfile.BadZipFile:
+            raise _invalid("The uploaded file is not a valid ZIP file.")
+
+        infos = self._zip.infolist()
+        if len(infos) > max_members:
+            self._zip.close()
+            raise _too_large(f"The ZIP file contains more than {max_members} files.")
+        self.members = [
+            info
+            for info in infos
+            if not info.is_dir()
+            and info.filename.startswith(prefix)
+            and not info.filename.startswith("__MACOSX")
+            and info.filename.lower().endswith(extensions)
+        ]
+        try:
+            for info in self.members:
+                self._check_declared(info)
+        except HTTPException:
+            self._zip.close()
+            raise
+        self.names = [info.filename for info in self.members]
+        self.total_bytes = 0
+
+    def _check_declared(self, info: zipfile.ZipInfo) -> None:
+        if info.file_size > self.max_member_bytes:
+            raise _too_large(
+                f"'{info.filename}' is larger than {self.max_member_bytes // _MB} MB."
+            )
+        if info.file_size >= _RATIO_MIN_BYTES and info.file_size > info.compress_size * self.max_ratio:
+            raise _invalid(f"'{info.filename}' has a suspicious compression ratio.")
+
+    def _read(self, info: zipfile.ZipInfo) -> bytes:
+        # อ่านไม่เกินขนาดที่ประกาศไว้ + 1 ไบต์ ไฟล์ที่ประกาศขนาดไม่ตรงความจริงจึงถูกจับได้โดยไม่ต้องคลายทั้งไฟล์
+        limit = min(info.file_size, self.max_member_bytes) + 1
+        chunks = []
+        size = 0
+        try:
+            with self._zip.open(info) as member:
+                while size < limit and (chunk := member.read(min(_READ_CHUNK, limit - size))):
+                    chunks.append(chunk)
+                    size += len(chunk)
+        except (zipfile.BadZipFile, EOFError, zlib.error) as e:
+            raise _invalid(f"'{info.filename}' is corrupt: {e}")
+        if size != info.file_size:
+            raise _invalid(f"'{info.filename}' does not match its declared size.")
+        self.total_bytes += size
+        if self.total_bytes > self.max_total_bytes:
+            raise _too_large(
+                f"The ZIP file expands to more than {self.max_total_bytes // _MB} MB of images."
+            )
+        return b"".join(chunks)
+
+    def __iter__(self) -> Iterator[tuple[str, bytes]]:
+        for info in self.members:
+            yield info.filename, self._read(info)
+
+    def close(self) -> None:
+        self._zip.close()
+
+    def __enter__(self) -> "ZipImageReader":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+async def iter_batches(
+    images: Iterator[tuple[str, bytes]], batch_size: int = INGEST_BATCH_SIZE
+) -> AsyncIterator[list[tuple[str, bytes]]]:
+    """อ่านภาพทีละชุดใน thread (การคลาย ZIP ไม่ block event loop)"""
+    images = iter(images)
+    while batch := await asyncio.to_thread(lambda: list(islice(images, batch_size))):
+        yield batch
@@ -0,0 +1,127 @@
+# utils/zip_writer.py
+"""
+สร้างไฟล์ ZIP ผลลัพธ์แบบเขียนทีละไฟล์ (ไม่ประกอบทั้ง archive ใน BytesIO)
+- ไฟล์ที่บีบอัดมาแล้ว (JPEG, PNG, ...) เก็บแบบ ZIP_STORED เพราะ deflate ซ้ำแทบไม่ได้ขนาดลดแต่เสีย CPU
+- เขียนลง SpooledTemporaryFile (build_zip_file) หรือ stream เป็นช่วงๆ ตรงไปที่ response (iter_zip)
+- ทุกไฟล์ใช้วันเวลาคงที่ ZIP ที่มีเนื้อหาเหมือนกันจึงได้ bytes เหมือนกัน (object_storage ไม่ต้องอัปโหลดซ้ำ)
+"""
+
+import os
+import shutil
+import tempfile
+import zipfile
+from pathlib import Path
+from typing import BinaryIO, Iterable, Iterator
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# นามสกุลของไฟล์ที่บีบอัดอยู่แล้ว (ไฟล์อื่น เช่น BMP / TIFF / ข้อความ ยังใช้ ZIP_DEFLATED)
+STORED_EXTENSIONS = frozenset(
+    {".jpg", ".jpeg", ".png", ".gif", ".webp", ".heic", ".mp4", ".zip", ".gz", ".xlsx", ".parquet"}
+)
+ZIP_DATE_TIME = (1980, 1, 1, 0, 0, 0)
+# ขนาด archive ที่เก็บในหน่วยความจำก่อนย้ายไปไฟล์ชั่วคราวบนดิสก์
+SPOOL_MAX_SIZE = int(os.getenv("ZIP_SPOOL_MB", "32")) * 1024 * 1024
+STREAM_CHUNK_SIZE = 1024 * 1024
+
+# แต่ละไฟล์ใน archive คือ (ชื่อใน ZIP, ข้อมูล bytes หรือ path ของไฟล์บนดิสก์)
+ZipMember = tuple[str, bytes | str | Path]
+
+
+def member_info(name: str, size: int) -> zipfile.ZipInfo:
+    info = zipfile.ZipInfo(name, date_time=ZIP_DATE_TIME)
+    info.compress_type = (
+        zipfile.ZIP_STORED if Path(name).suffix.lower() in STORED_EXTENSIONS else zipfile.ZIP_DEFLATED
+    )
+    info.external_attr = 0o644 << 16
+    info.file_size = size
+    return info
+
+
+def _write_member(zip_file: zipfile.ZipFile, name: str, source: bytes | str | Path) -> None:
+    if isinstance(source, (bytes, bytearray)):
+        zip_file.writestr(member_info(name, len(source)), source)
+        return
+    # ไฟล์บนดิสก์: คัดลอกทีละช่วง ไม่ต้องอ่านทั้งไฟล์เข้าหน่วยความจำ
+    with open(source, "rb") as src, zip_file.open(member_info(name, os.path.getsize(source)), "w") as dst:
+        shutil.copyfileobj(src, dst, STREAM_CHUNK_SIZE)
+
+
+def write_zip(members: Iterable[ZipMember], output: BinaryIO) -> int:
+    """เขียน members (list หรือ generator) ลง output ทีละไฟล์ คืนจำนวนไฟล์ใน archive"""
+    count = 0
+    with zipfile.ZipFile(output, "w") as zip_file:
+        for name, source in members:
+            _write_member(zip_file, name, source)
+            count += 1
+    return count
+
+
+class SpooledZipWriter:
+    """ZIP บนไฟล์ชั่วคราวที่เพิ่มไฟล์ได้ทีละไฟล์ระหว่างประมวลผล (ไม่ต้องเก็บภาพทั้งหมดไว้ก่อนสร้าง)"""
+
+    def __init__(self):
+        self.file = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+        self._zip = zipfile.ZipFile(self.file, "w")
+        self.count = 0
+
+    def add(self, name: str, source: bytes | str | Path) -> None:
+        _write_member(self._zip, name, source)
+        self.count += 1
+
+    def finish(self) -> BinaryIO:
+        """ปิด archive แล้วคืนไฟล์ที่ seek กลับไปต้นไฟล์แล้ว (ไฟล์ถูกปิดเมื่อเรียก close)"""
+        self._zip.close()
+        self.file.seek(0)
+        return self.file
+
+    def close(self) -> None:
+        self._zip.close()
+        self.file.close()
+
+
+def build_zip_file(members: Iterable[ZipMember]) -> BinaryIO:
+    """สร้าง ZIP ลงไฟล์ชั่วคราว แล้วคืนไฟล์ที่ seek กลับไปต้นไฟล์แล้ว (ผู้เรียกต้องปิดไฟล์เอง)"""
+    writer = SpooledZipWriter()
+    try:
+        for name, source in members:
+            writer.add(name, source)
+        return writer.finish()
+    except BaseException:
+        writer.close()
+        raise
+
+
+class _StreamBuffer:
+    """ปลายทางที่ seek ไม่ได้สำหรับ ZipFile (zipfile จะเขียน data descriptor แทนการย้อนกลับไปแก้ header)"""
+
+    def __init__(self):
+        self._chunks: list[bytes] = []
+        self.size = 0
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        self.size += len(data)
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def pop(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        self.size = 0
+        return data
+
+
+def iter_zip(members: Iterable[ZipMember], chunk_size: int = STREAM_CHUNK_SIZE) -> Iterator[bytes]:
+    """สร้าง ZIP แล้วคืนเป็นช่วงๆ ระหว่างเขียน สำหรับ StreamingResponse (หน่วยความจำไม่เกินราวหนึ่งไฟล์ใน archive)"""
+    buffer = _StreamBuffer()
+    with zipfile.ZipFile(buffer, "w") as zip_file:
+        for name, source in members:
+            _write_member(zip_file, name, source)
+            if buffer.size >= chunk_size:
+                yield buffer.pop()
+    yield buffer.pop()
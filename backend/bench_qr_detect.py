@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+⏱️ เปรียบเทียบการหา QR Code บนสลิประหว่างแบบเดิม (pyzbar decode ทุกชนิด barcode บนภาพความละเอียดเต็ม)
+กับ detect_qr_codes (เฉพาะ QRCODE, ลองภาพที่ย่อก่อนแล้วค่อยใช้ภาพเต็ม)
+รายงานเวลา และ precision / recall โดยถือผลของแบบเดิมเป็นคำตอบ เพื่อยืนยันว่าไม่มีสลิปหลุดจากการคัด
+รันคำสั่ง: python bench_qr_detect.py <โฟลเดอร์ภาพ หรือไฟล์ ZIP> [--fast-max-size 800] [--repeat 3]
+"""
+
+import argparse
+import time
+import zipfile
+from pathlib import Path
+
+import cv2
+import numpy as np
+from pyzbar.pyzbar import decode
+
+from backend.utils.slip_image import QR_FAST_MAX_SIZE, detect_qr_codes
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg")
+
+
+def load_images(path: str) -> list[tuple[str, bytes]]:
+    if zipfile.is_zipfile(path):
+        with zipfile.ZipFile(path) as zip_file:
+            names = [n for n in zip_file.namelist() if n.lower().endswith(IMAGE_EXTENSIONS)]
+            return [(name, zip_file.read(name)) for name in names]
+    return [
+        (str(p), p.read_bytes())
+        for p in sorted(Path(path).rglob("*"))
+        if p.suffix.lower() in IMAGE_EXTENSIONS
+    ]
+
+
+def legacy_detect(gray: np.ndarray) -> list:
+    """แบบเดิมของ has_qr_code: decode ทุกชนิด barcode บนภาพความละเอียดเต็ม"""
+    return decode(gray)
+
+
+def qr_payload(codes: list) -> str | None:
+    qr_codes = [code for code in codes if code.type == "QRCODE"]
+    return qr_codes[0].data.decode("utf-8", errors="replace") if qr_codes else None
+
+
+def timed(detect, grays: list[np.ndarray], repeat: int) -> tuple[float, list]:
+    best = float("inf")
+    results = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        results = [detect(gray) for gray in grays]
+        best = min(best, time.perf_counter() - start)
+    return best, results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("path", help="โฟลเดอร์ภาพสลิป หรือไฟล์ ZIP")
+    parser.add_argument("--fast-max-size", type=int, default=QR_FAST_MAX_SIZE, help="ด้านยาวสุดของภาพในรอบแรก (0 = ไม่ย่อ)")
+    parser.add_argument("--repeat", type=int, default=3, help="จำนวนรอบ (ใช้เวลาที่ดีที่สุด)")
+    args = parser.parse_args()
+
+    names, grays = [], []
+    for name, data in load_images(args.path):
+        image = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_GRAYSCALE)
+        if image is None:
+            print(f"⚠️ Skipping unreadable image: {name}")
+            continue
+        names.append(name)
+        grays.append(image)
+    if not grays:
+        raise SystemExit("❌ No images found.")
+
+    legacy_s, legacy_codes = timed(legacy_detect, grays, args.repeat)
+    tuned_s, tuned_codes = timed(lambda gray: detect_qr_codes(gray, args.fast_max_size), grays, args.repeat)
+
+    tp = fp = fn = tn = 0
+    missed, extra, non_qr_only, payload_diffs = [], [], [], []
+    for name, old, new in zip(names, legacy_codes, tuned_codes):
+        expected, found = bool(old), bool(new)
+        if expected and found:
+            tp += 1
+            if qr_payload(old) != qr_payload(new):
+                payload_diffs.append((name, qr_payload(old), qr_payload(new)))
+        elif expected:
+            fn += 1
+            # แบบเดิมนับ barcode ชนิดอื่นเป็น "มี QR" ด้วย แยกออกมาให้เห็นว่าไม่ใช่ QR ที่หลุด
+            if all(code.type != "QRCODE" for code in old):
+                non_qr_only.append((name, sorted({code.type for code in old})))
+            else:
+                missed.append(name)
+        elif found:
+            fp += 1
+            extra.append(name)
+        else:
+            tn += 1
+
+    precision = tp / (tp + fp) if tp + fp else 1.0
+    recall = tp / (tp + fn) if tp + fn else 1.0
+    qr_recall = tp / (tp + len(missed)) if tp + len(missed) else 1.0
+
+    print(f"🚀 {len(grays)} images from {args.path} (fast pass max size: {args.fast_max_size or 'off'})")
+    print(f"{'detector':<10}{'seconds':>10}{'ms/image':>10}{'with QR':>10}")
+    print(f"{'legacy':<10}{legacy_s:>10.3f}{legacy_s * 1000 / len(grays):>10.2f}{tp + fn:>10}")
+    print(f"{'tuned':<10}{tuned_s:>10.3f}{tuned_s * 1000 / len(grays):>10.2f}{tp + fp:>10}")
+    print(f"speed-up: {legacy_s / max(tuned_s, 1e-9):.2f}x")
+    print(f"precision {precision:.4f}  recall {recall:.4f}  (QR-only recall {qr_recall:.4f})  TP {tp} FP {fp} FN {fn} TN {tn}")
+    for name in missed:
+        print(f"❌ QR missed: {name}")
+    for name, types in non_qr_only:
+        print(f"ℹ️ Non-QR barcode only (no longer counted as a slip): {name} {types}")
+    for name in extra:
+        print(f"➕ QR found only by the tuned detector: {name}")
+    for name, old, new in payload_diffs:
+        print(f"⚠️ Payload differs: {name} legacy={old!r} tuned={new!r}")
+    if not missed and not payload_diffs:
+        print("✅ No slips with a QR code were lost and all payloads match.")
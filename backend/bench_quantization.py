@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+⚖️ เปรียบเทียบความแม่นยำและความเร็วของ YOLO classifier แบบ FP32 กับ INT8
+โฟลเดอร์ภาพต้องจัดเป็น <ชื่อคลาส>/<ภาพ> (ใช้ชื่อโฟลเดอร์เป็น label)
+รันคำสั่ง: python bench_quantization.py <โฟลเดอร์ภาพ> --model backend/ml/bestYOLOslipClassified1.pt \
+    --calibration-dir <โฟลเดอร์ภาพ calibrate>
+"""
+
+import argparse
+import statistics
+import time
+from pathlib import Path
+
+from backend.ml.prediction import INT8_ENGINES, create_prediction_service
+from bench_yolo_engines import IMAGE_EXTENSIONS, percentile
+
+
+def load_labelled_images(image_dir: str) -> list[tuple[str, bytes]]:
+    return [
+        (path.parent.name, path.read_bytes())
+        for path in sorted(Path(image_dir).rglob("*"))
+        if path.suffix.lower() in IMAGE_EXTENSIONS
+    ]
+
+
+def run_engine(service, images: list[bytes], batch_size: int) -> tuple[list, list[float], float]:
+    # warm-up หนึ่งรอบเพื่อไม่ให้นับเวลาเริ่มต้นของ runtime
+    service.predict_classify_batch(images[:batch_size])
+
+    predictions = []
+    latencies = []
+    total_start = time.perf_counter()
+    for i in range(0, len(images), batch_size):
+        batch = images[i : i + batch_size]
+        start = time.perf_counter()
+        predictions.extend(service.predict_classify_batch(batch))
+        latencies.append((time.perf_counter() - start) * 1000 / len(batch))
+    return predictions, latencies, time.perf_counter() - total_start
+
+
+def compare(
+    model_path: str,
+    engine: str,
+    samples: list[tuple[str, bytes]],
+    calibration_dir: str | None,
+    batch_size: int,
+) -> dict:
+    labels = [label for label, _ in samples]
+    images = [image_bytes for _, image_bytes in samples]
+
+    results = {}
+    for name in ("torch", engine):
+        service = create_prediction_service(model_path, engine=name, calibration_dir=calibration_dir)
+        predictions, latencies, total_time = run_engine(service, images, batch_size)
+        results[name] = {
+            "predictions": predictions,
+            "accuracy": sum(p[0] == l for p, l in zip(predictions, labels)) / len(labels),
+            "p50_ms": statistics.median(latencies),
+            "p99_ms": percentile(latencies, 99),
+            "images_per_s": len(images) / total_time,
+        }
+
+    fp32, int8 = results["torch"]["predictions"], results[engine]["predictions"]
+    # เทียบ confidence เฉพาะภาพที่ทั้งสองโมเดลตอบคลาสเดียวกัน
+    drift = [abs(a[1] - b[1]) for a, b in zip(fp32, int8) if a[0] == b[0]]
+    return {
+        "fp32": results["torch"],
+        "int8": results[engine],
+        "top1_agreement": sum(a[0] == b[0] for a, b in zip(fp32, int8)) / len(fp32),
+        "mean_conf_drift": statistics.fmean(drift) if drift else 0.0,
+        "max_conf_drift": max(drift, default=0.0),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("image_dir")
+    parser.add_argument("--model", default="backend/ml/bestYOLOslipClassified1.pt")
+    parser.add_argument("--engine", choices=INT8_ENGINES, default="onnx-int8")
+    parser.add_argument(
+        "--calibration-dir", help="โฟลเดอร์ภาพสำหรับ static INT8 (ไม่ควรเป็นชุดเดียวกับที่ใช้วัดผล)"
+    )
+    parser.add_argument("--batch-size", type=int, default=1)
+    args = parser.parse_args()
+
+    samples = load_labelled_images(args.image_dir)
+    if not samples:
+        raise SystemExit(f"❌ No images found in '{args.image_dir}'")
+
+    print(f"🚀 {args.model}: {len(samples)} images, {args.engine}, batch size {args.batch_size}")
+    r = compare(args.model, args.engine, samples, args.calibration_dir, args.batch_size)
+    print(f"{'':<8}{'accuracy':>10}{'p50 ms':>10}{'p99 ms':>10}{'img/s':>10}")
+    for name in ("fp32", "int8"):
+        row = r[name]
+        print(
+            f"{name:<8}{row['accuracy']:>10.3f}{row['p50_ms']:>10.2f}"
+            f"{row['p99_ms']:>10.2f}{row['images_per_s']:>10.1f}"
+        )
+    print(f"top-1 agreement: {r['top1_agreement']:.3f}")
+    print(f"confidence drift: mean {r['mean_conf_drift']:.4f}, max {r['max_conf_drift']:.4f}")
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+⏱️ เปรียบเทียบความเร็วการแยกข้อมูลสลิปจากข้อความ OCR ระหว่าง handler เดิม (bench_slip_parser_legacy.handle_*)
+กับ parser ที่ compile ไว้แล้ว (utils/slip_parser.py) และตรวจว่าผลลัพธ์ตรงกัน
+รันคำสั่ง: python bench_slip_parser.py [โฟลเดอร์ข้อความ OCR เช่น ocr_results] --count 5000
+ถ้าไม่ระบุโฟลเดอร์ (หรือไม่มีไฟล์ .txt) จะใช้ข้อความตัวอย่างในไฟล์นี้
+"""
+
+import argparse
+import contextlib
+import itertools
+import os
+import time
+from pathlib import Path
+
+import bench_slip_parser_legacy as legacy_handlers
+from backend.utils.slip_parser import detect_bank, parse_many
+
+# ข้อความตัวอย่างในรูปแบบเดียวกับผล EasyOCR (คำคั่นด้วยช่องว่าง)
+SAMPLE_TEXTS = [
+    "SCB โอนเงินสำเร็จ 12 ม.ค. 2568 - 14:32 รหัสอ้างอิง: 202501121432abc จาก นาย สมชาย ใจดี xxx-xxx123-4 "
+    "ไปยัง น.ส. สมหญิง รักไทย xxx-x-x5678-x จำนวนเงิน 1,250.00",
+    "Krungthai กรุงไทย โอนเงินสำเร็จ จาก นาย สมชาย ใจดี กรุงไทย XXX-X-XX123-4 ไปยัง นางสาว สมหญิง รักไทย "
+    "ไทยพาณิชย์ XXX-X-XX567-8 จำนวนเงิน 500.00 บาท ค่าธรรมเนียม 0.00 บาท "
+    "วันที่ทำรายการ 3 ก.พ. 2568 09:15",
+    "ธนาคารออมสิน GSB โอนเงินสำเร็จ จาก นาย สมชาย ใจดี ธนาคารออมสิน 0201xxxx1234 ถึง นางสาว สมหญิง รักไทย "
+    "พร้อมเพย์ 0812xxxx5678 จำนวนเงิน 3,000.00 รหัสอ้างอิง: 2025021509152345 12345678 "
+    "15ก.พ. 2568 09:15",
+    "โอนเงินสำเร็จ 20 มี.ค. 68 18:05 น. นาย สมชาย ใจดี. ธ.กสิกรไทย xxx-x-x1234-x นางสาว สมหญิง รักไทย. "
+    "ธ.กสิกรไทย xxx-x-x5678-x เลขที่รายการ: 015079180512BTF05521 จำนวน: 750.00 บาท ค่าธรรมเนียม: 0.00 บาท",
+    "Bangkok Bank รายการสำเร็จ 1 เม.ย. 2568 10:20 จำนวนเงิน 2,400.00 THB จาก นาย สมชาย "
+    "ธนาคารกรุงเทพ 123-4-xx567-8 ไปที่ นางสาว สมหญิง รักไทย 014 ธนาคารไทยพาณิชย์ xxx-x-x9012-x",
+    "ใบเสร็จรับเงิน ร้านค้า ตัวอย่าง ยอดรวม 120.00 บาท",
+]
+
+
+class _NoQrImage:
+    """ภาพแทนสำหรับ handler เดิม (วัดเฉพาะการแยกข้อความ ไม่ decode QR)"""
+
+    qr_text = None
+
+
+def load_corpus(directory: str | None) -> list[str]:
+    if directory:
+        texts = [path.read_text(encoding="utf-8") for path in sorted(Path(directory).rglob("*.txt"))]
+        if texts:
+            return texts
+        print(f"⚠️ No .txt files in '{directory}', using the built-in samples.")
+    return SAMPLE_TEXTS
+
+
+def legacy_parse(texts: list[str]) -> list[dict]:
+    image = _NoQrImage()
+    results = []
+    for text in texts:
+        bank = legacy_handlers.detect_bank(text)
+        handler = legacy_handlers.BANK_HANDLERS.get(bank)
+        data = handler(text, image) if handler else legacy_handlers.handle_unknown(text, image)
+        results.append({"bank": bank, **(data or {})})
+    return results
+
+
+def compiled_parse(texts: list[str]) -> list[dict]:
+    return [record.as_dict() for record in parse_many(texts)]
+
+
+def mismatches(legacy: list[dict], compiled: list[dict]) -> list[tuple[int, str, str, str]]:
+    found = []
+    for index, (old, new) in enumerate(zip(legacy, compiled)):
+        for key, value in old.items():
+            if key == "qr_code_text":
+                continue
+            if new.get(key) != value:
+                found.append((index, key, value, new.get(key)))
+    return found
+
+
+def timed(parse, texts: list[str], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        parse(texts)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("corpus", nargs="?", help="โฟลเดอร์ที่มีไฟล์ข้อความ OCR (.txt)")
+    parser.add_argument("--count", type=int, default=5000, help="จำนวนสลิป (วนใช้ข้อความซ้ำ)")
+    parser.add_argument("--repeat", type=int, default=3, help="จำนวนรอบ (ใช้เวลาที่ดีที่สุด)")
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.corpus)
+    texts = list(itertools.islice(itertools.cycle(corpus), args.count))
+    banks = {}
+    for text in corpus:
+        bank = detect_bank(text)
+        banks[bank] = banks.get(bank, 0) + 1
+    print(f"🚀 {len(texts)} slips ({len(corpus)} unique texts, banks: {banks})")
+
+    # handler เดิม print หลายบรรทัดต่อสลิป ส่งออกไปที่ devnull (ยังนับเวลาเขียนอยู่)
+    with open(os.devnull, "w", encoding="utf-8") as devnull, contextlib.redirect_stdout(devnull):
+        diffs = mismatches(legacy_parse(corpus), compiled_parse(corpus))
+        legacy_s = timed(legacy_parse, texts, args.repeat)
+    compiled_s = timed(compiled_parse, texts, args.repeat)
+
+    print(f"{'parser':<10}{'seconds':>10}{'slips/s':>12}")
+    print(f"{'legacy':<10}{legacy_s:>10.3f}{len(texts) / legacy_s:>12.0f}")
+    print(f"{'compiled':<10}{compiled_s:>10.3f}{len(texts) / compiled_s:>12.0f}")
+    print(f"speed-up: {legacy_s / max(compiled_s, 1e-9):.2f}x")
+    if diffs:
+        print(f"❌ {len(diffs)} field mismatches:")
+        for index, key, old, new in diffs[:20]:
+            print(f"  text {index} {key}: legacy={old!r} compiled={new!r}")
+    else:
+        print("✅ Compiled parser output matches the legacy handlers.")
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+⏱️ เปรียบเทียบเวลาเตรียมภาพสลิปก่อน OCR ระหว่างแบบเดิม (decode ซ้ำหลายรอบ) กับ SlipImage (decode ครั้งเดียว)
+รันคำสั่ง: python bench_slip_pipeline.py <ไฟล์ ZIP ที่มีโฟลเดอร์ Slip/> --count 300 [--ocr]
+"""
+
+import argparse
+import io
+import itertools
+import time
+import zipfile
+
+from PIL import Image
+from pyzbar.pyzbar import decode
+
+from backend.utils.slip_image import SlipImage
+
+
+def legacy_prepare(image_data: bytes):
+    """ขั้นตอนเดิม: decode เพื่ออ่าน QR, decode อีกรอบเพื่อย่อแล้ว encode กลับเป็น bytes ให้ EasyOCR decode ซ้ำ"""
+    has_qr = len(decode(Image.open(io.BytesIO(image_data)))) > 0
+    with Image.open(io.BytesIO(image_data)) as img:
+        if max(img.size) > 1600:
+            img.thumbnail((1600, 1600))
+            buffer = io.BytesIO()
+            img.save(buffer, format=img.format if img.format in ["JPEG", "PNG"] else "JPEG")
+            image_data = buffer.getvalue()
+    return has_qr, image_data
+
+
+def slip_image_prepare(image_data: bytes):
+    slip = SlipImage.from_bytes(image_data)
+    return slip.has_qr_code, slip.ocr_image
+
+
+def run(name: str, prepare, images: list[bytes], reader) -> dict:
+    prepare_time = 0.0
+    ocr_time = 0.0
+    with_qr = 0
+    for image_data in images:
+        start = time.perf_counter()
+        has_qr, ocr_input = prepare(image_data)
+        prepare_time += time.perf_counter() - start
+        if has_qr:
+            with_qr += 1
+            if reader is not None:
+                start = time.perf_counter()
+                reader.readtext(ocr_input, detail=0)
+                ocr_time += time.perf_counter() - start
+    return {"name": name, "prepare_s": prepare_time, "ocr_s": ocr_time, "with_qr": with_qr}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("zip_path")
+    parser.add_argument("--count", type=int, default=300, help="จำนวนสลิป (วนใช้ภาพซ้ำถ้าใน ZIP มีน้อยกว่า)")
+    parser.add_argument("--ocr", action="store_true", help="รวมเวลา EasyOCR ด้วย (ช้า)")
+    args = parser.parse_args()
+
+    with zipfile.ZipFile(args.zip_path) as zip_file:
+        names = [
+            f for f in zip_file.namelist()
+            if f.startswith("Slip/") and f.lower().endswith((".png", ".jpg", ".jpeg"))
+        ]
+        if not names:
+            raise SystemExit("❌ No images found in the Slip folder.")
+        images = [zip_file.read(name) for name in itertools.islice(itertools.cycle(names), args.count)]
+
+    reader = None
+    if args.ocr:
+        import easyocr
+
+        reader = easyocr.Reader(["th", "en"], gpu=False)
+
+    print(f"🚀 {args.zip_path}: {len(images)} slips ({len(names)} unique)")
+    print(f"{'pipeline':<12}{'prepare s':>12}{'ms/slip':>10}{'ocr s':>10}{'with QR':>10}")
+    results = [
+        run("legacy", legacy_prepare, images, reader),
+        run("slip-image", slip_image_prepare, images, reader),
+    ]
+    for r in results:
+        print(
+            f"{r['name']:<12}{r['prepare_s']:>12.2f}{r['prepare_s'] * 1000 / len(images):>10.1f}"
+            f"{r['ocr_s']:>10.2f}{r['with_qr']:>10}"
+        )
+    print(f"prepare speed-up: {results[0]['prepare_s'] / max(results[1]['prepare_s'], 1e-9):.2f}x")
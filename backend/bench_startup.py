@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+⏱️ วัดเวลา cold import ของ backend.main (แต่ละรอบรันใน process ใหม่) และเวลาโหลด EasyOCR ครั้งแรก
+รันคำสั่ง: python bench_startup.py --runs 5 [--top 15] [--ocr]
+"""
+
+import argparse
+import statistics
+import subprocess
+import sys
+
+IMPORT_SNIPPET = """
+import time
+start = time.perf_counter()
+import backend.main
+print(time.perf_counter() - start)
+"""
+
+OCR_SNIPPET = """
+import time
+from backend.configs.ocr_reader import get_ocr_reader
+start = time.perf_counter()
+get_ocr_reader()
+print(time.perf_counter() - start)
+"""
+
+
+def run_snippet(snippet: str) -> float:
+    output = subprocess.run(
+        [sys.executable, "-c", snippet], capture_output=True, text=True, check=True
+    ).stdout
+    return float(output.strip().splitlines()[-1])
+
+
+def slowest_imports(top: int) -> list[tuple[float, str]]:
+    """ใช้ python -X importtime หา module ที่ import นานที่สุด (เวลาสะสมรวม module ย่อย)"""
+    stderr = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import backend.main"],
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stderr
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:") :].split("|")
+        rows.append((int(cumulative) / 1e6, name.strip()))
+    return sorted(rows, reverse=True)[:top]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=0, help="แสดง module ที่ import นานที่สุด N อันดับ")
+    parser.add_argument("--ocr", action="store_true", help="วัดเวลาโหลด EasyOCR reader ครั้งแรกด้วย")
+    args = parser.parse_args()
+
+    times = [run_snippet(IMPORT_SNIPPET) for _ in range(args.runs)]
+    print(
+        f"🚀 import backend.main: median {statistics.median(times):.2f}s, "
+        f"min {min(times):.2f}s, max {max(times):.2f}s ({args.runs} runs)"
+    )
+
+    if args.top:
+        print(f"{'cumulative s':>14}  module")
+        for seconds, name in slowest_imports(args.top):
+            print(f"{seconds:>14.3f}  {name}")
+
+    if args.ocr:
+        print(f"🔤 first get_ocr_reader(): {run_snippet(OCR_SNIPPET):.2f}s")
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+⏱️ เปรียบเทียบ latency ของ YOLO classifier ระหว่าง engine torch / onnx / openvino
+รันคำสั่ง: python bench_yolo_engines.py <โฟลเดอร์ภาพ> --model backend/ml/bestYOLOslipClassified1.pt
+"""
+
+import argparse
+import statistics
+import time
+from pathlib import Path
+
+from backend.ml.prediction import SUPPORTED_ENGINES, YoloPredictionService
+
+IMAGE_EXTENSIONS = {".png", ".jpg", ".jpeg", ".gif", ".bmp"}
+
+
+def percentile(values: list[float], pct: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, round(pct / 100 * (len(ordered) - 1)))
+    return ordered[index]
+
+
+def bench_engine(
+    model_path: str, engine: str, images: list[bytes], batch_size: int, repeats: int
+) -> dict:
+    load_start = time.perf_counter()
+    service = YoloPredictionService(model_path, engine=engine)
+    load_time = time.perf_counter() - load_start
+
+    # warm-up หนึ่งรอบเพื่อไม่ให้นับเวลาเริ่มต้นของ runtime
+    service.predict_classify_batch(images[:batch_size])
+
+    latencies = []
+    total_start = time.perf_counter()
+    for _ in range(repeats):
+        for i in range(0, len(images), batch_size):
+            batch = images[i : i + batch_size]
+            start = time.perf_counter()
+            service.predict_classify_batch(batch)
+            latencies.append((time.perf_counter() - start) * 1000 / len(batch))
+    total_time = time.perf_counter() - total_start
+
+    return {
+        "engine": engine,
+        "load_s": load_time,
+        "p50_ms": statistics.median(latencies),
+        "p99_ms": percentile(latencies, 99),
+        "images_per_s": len(images) * repeats / total_time,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("image_dir")
+    parser.add_argument("--model", default="backend/ml/bestYOLOslipClassified1.pt")
+    parser.add_argument(
+        "--engine", action="append", choices=SUPPORTED_ENGINES, help="ค่าเริ่มต้น: ทุก engine"
+    )
+    parser.add_argument("--batch-size", type=int, default=1)
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    images = [
+        p.read_bytes()
+        for p in sorted(Path(args.image_dir).rglob("*"))
+        if p.suffix.lower() in IMAGE_EXTENSIONS
+    ]
+    print(f"🚀 {args.model}: {len(images)} images, batch size {args.batch_size}")
+    print(f"{'engine':<10}{'load s':>10}{'p50 ms':>10}{'p99 ms':>10}{'img/s':>10}")
+    for engine in args.engine or SUPPORTED_ENGINES:
+        r = bench_engine(args.model, engine, images, args.batch_size, args.repeats)
+        print(
+            f"{r['engine']:<10}{r['load_s']:>10.2f}{r['p50_ms']:>10.2f}"
+            f"{r['p99_ms']:>10.2f}{r['images_per_s']:>10.1f}"
+        )
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+🔍 ทดสอบว่า engine ONNX / OpenVINO ให้ผลเหมือนกับ PyTorch
+รันคำสั่ง: python test_engine_parity.py <โฟลเดอร์ภาพ> --engine onnx
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+from backend.ml.prediction import YoloPredictionService
+
+IMAGE_EXTENSIONS = {".png", ".jpg", ".jpeg", ".gif", ".bmp"}
+
+
+def load_images(image_dir: str) -> list[tuple[str, bytes]]:
+    paths = sorted(
+        p for p in Path(image_dir).rglob("*") if p.suffix.lower() in IMAGE_EXTENSIONS
+    )
+    return [(str(p), p.read_bytes()) for p in paths]
+
+
+def check_engine_parity(
+    model_path: str, engine: str, images: list[tuple[str, bytes]], tolerance: float
+) -> bool:
+    """เปรียบเทียบชื่อคลาสและ confidence ของ torch กับ engine ที่เลือกทีละภาพ"""
+    reference = YoloPredictionService(model_path, engine="torch")
+    candidate = YoloPredictionService(model_path, engine=engine)
+
+    if dict(reference.model.names) != dict(candidate.model.names):
+        print(f"❌ Class names differ: {reference.model.names} != {candidate.model.names}")
+        return False
+
+    image_bytes = [data for _, data in images]
+    expected = reference.predict_classify_batch(image_bytes)
+    actual = candidate.predict_classify_batch(image_bytes)
+
+    mismatches = 0
+    for (name, _), (exp_class, exp_conf), (act_class, act_conf) in zip(
+        images, expected, actual
+    ):
+        if exp_class != act_class or abs(exp_conf - act_conf) > tolerance:
+            mismatches += 1
+            print(
+                f"❌ {name}: torch=({exp_class}, {exp_conf:.4f}) "
+                f"{engine}=({act_class}, {act_conf:.4f})"
+            )
+
+    print(f"📋 {model_path}: {len(images) - mismatches}/{len(images)} images match")
+    return mismatches == 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("image_dir", help="โฟลเดอร์ภาพที่ใช้ทดสอบ")
+    parser.add_argument("--engine", choices=["onnx", "openvino"], default="onnx")
+    parser.add_argument(
+        "--model",
+        action="append",
+        help="ไฟล์ .pt (ระบุได้หลายครั้ง, ค่าเริ่มต้นคือโมเดลทั้งสองตัวใน backend/ml)",
+    )
+    parser.add_argument("--tolerance", type=float, default=1e-3)
+    args = parser.parse_args()
+
+    model_paths = args.model or [
+        "backend/ml/bestYOLOslipClassified1.pt",
+        "backend/ml/bestYOLOillegalImageClassified4.pt",
+    ]
+    images = load_images(args.image_dir)
+    if not images:
+        print(f"❌ No images found in {args.image_dir}")
+        sys.exit(1)
+
+    print(f"🚀 Parity test: torch vs {args.engine} on {len(images)} images")
+    print("=" * 50)
+    ok = all(
+        check_engine_parity(path, args.engine, images, args.tolerance)
+        for path in model_paths
+    )
+    print("\n🎉 All models match!" if ok else "\n❌ Parity test failed")
+    sys.exit(0 if ok else 1)